@@ -0,0 +1,190 @@
+# amd_smi.py
+"""
+AMD GPU enumeration and live metrics
+
+Two sources, in order of preference:
+
+    amdsmi    - Python bindings shipped with ROCm 6+; queried in-process from
+                the metrics sampler thread, like NVML
+    rocm-smi  - the CLI's --json output; enumerated once at startup and
+                sampled by a background probe (see metric_probes)
+
+The rocm-smi parsers are pure functions over the decoded JSON so they can be
+checked against recorded output (tests/fixtures/rocm_smi_*.json). Key names
+differ between ROCm releases ("Card series" vs "Card Series", edge vs
+junction temperature on MI300, average vs current socket power), so fields
+are looked up by prefix, case-insensitively, in order of preference.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+ROCM_SMI_ENUMERATE = [
+    'rocm-smi', '--showproductname', '--showmeminfo', 'vram', '--showuniqueid', '--showdriverversion', '--json'
+]
+ROCM_SMI_METRICS = [
+    'rocm-smi', '--showuse', '--showmemuse', '--showtemp', '--showpower', '--showmeminfo', 'vram', '--json'
+]
+
+NAME_FIELDS = ('card series', 'card model', 'device name')
+TEMPERATURE_FIELDS = ('temperature (sensor edge)', 'temperature (sensor junction)')
+POWER_FIELDS = ('average graphics package power', 'current socket graphics package power')
+
+
+def loads(text: str) -> Dict:
+    """Decode rocm-smi --json output (some releases print warnings before the JSON)"""
+    start = text.find('{')
+    if start < 0:
+        raise ValueError("no JSON object in rocm-smi output")
+    return json.loads(text[start:])
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None  # "N/A" and missing sensors
+
+
+def _field(card: Dict, *prefixes: str) -> Optional[str]:
+    """First present value whose key starts with one of the prefixes (in order)"""
+    lowered = {key.lower(): value for key, value in card.items()}
+    for prefix in prefixes:
+        for key, value in lowered.items():
+            if key.startswith(prefix) and value not in (None, '', 'N/A'):
+                return str(value)
+    return None
+
+
+def card_keys(data: Dict) -> List[str]:
+    """'card0', 'card1', ... in numeric order (skips the 'system' section)"""
+    cards = [key for key in data if key.startswith('card') and key[4:].isdigit()]
+    return sorted(cards, key=lambda key: int(key[4:]))
+
+
+def parse_devices(data: Dict) -> List[Dict]:
+    """
+    GPUs from `rocm-smi --showproductname --showmeminfo vram --showuniqueid --json`
+
+    Returns:
+        One dict per card with card, name, total_memory (bytes), uuid and
+        driver_version
+    """
+    driver = _field(data.get('system', {}), 'driver version')
+    devices = []
+    for position, key in enumerate(card_keys(data)):
+        card = data[key]
+        devices.append({
+            'card': key,
+            'name': _field(card, *NAME_FIELDS) or f"AMD GPU {position}",
+            'total_memory': int(_number(_field(card, 'vram total memory')) or 0),
+            'uuid': _field(card, 'unique id'),
+            'driver_version': driver
+        })
+    return devices
+
+
+def parse_metrics(data: Dict) -> List[Dict]:
+    """
+    Live metrics from `rocm-smi --showuse --showmemuse --showtemp --showpower --showmeminfo vram --json`
+
+    Returns:
+        One dict per card with gpu_utilization, memory_utilization (%),
+        memory_used (bytes, None if only the percentage is reported),
+        temperature (C) and power_usage (W); missing sensors read as 0
+    """
+    metrics = []
+    for key in card_keys(data):
+        card = data[key]
+        used = _number(_field(card, 'vram total used memory'))
+        total = _number(_field(card, 'vram total memory'))
+        memory_percent = _number(_field(card, 'gpu memory use', 'gpu memory allocated'))
+        if memory_percent is None and used is not None and total:
+            memory_percent = used / total * 100
+        metrics.append({
+            'card': key,
+            'gpu_utilization': _number(_field(card, 'gpu use')) or 0.0,
+            'memory_utilization': memory_percent or 0.0,
+            'memory_used': int(used) if used is not None else None,
+            'temperature': _number(_field(card, *TEMPERATURE_FIELDS)) or 0.0,
+            'power_usage': _number(_field(card, *POWER_FIELDS)) or 0.0
+        })
+    return metrics
+
+
+class AmdSmiBackend:
+    """In-process AMD metrics through the amdsmi bindings (ROCm 6+)"""
+
+    def __init__(self, amdsmi, handles: List):
+        self.amdsmi = amdsmi
+        self.handles = handles
+
+    @classmethod
+    def create(cls) -> Optional['AmdSmiBackend']:
+        """Backend for the local GPUs, or None if amdsmi is missing or finds none"""
+        try:
+            import amdsmi
+        except ImportError:
+            return None
+        try:
+            amdsmi.amdsmi_init()
+            handles = amdsmi.amdsmi_get_processor_handles()
+        except Exception:
+            return None
+        if not handles:
+            amdsmi.amdsmi_shut_down()
+            return None
+        return cls(amdsmi, handles)
+
+    def devices(self) -> List[Dict]:
+        """Same shape as parse_devices"""
+        smi = self.amdsmi
+        devices = []
+        for position, handle in enumerate(self.handles):
+            asic = smi.amdsmi_get_gpu_asic_info(handle)
+            try:
+                uuid = smi.amdsmi_get_gpu_device_uuid(handle)
+            except smi.AmdSmiException:
+                uuid = None
+            try:
+                driver = smi.amdsmi_get_gpu_driver_info(handle).get('driver_version')
+            except smi.AmdSmiException:
+                driver = None
+            devices.append({
+                'card': f"card{position}",
+                'name': asic.get('market_name') or f"AMD GPU {position}",
+                'total_memory': smi.amdsmi_get_gpu_memory_total(handle, smi.AmdSmiMemoryType.VRAM),
+                'uuid': uuid,
+                'driver_version': driver
+            })
+        return devices
+
+    def sample(self, position: int) -> Dict:
+        """Same shape as one parse_metrics entry"""
+        smi = self.amdsmi
+        handle = self.handles[position]
+        total = smi.amdsmi_get_gpu_memory_total(handle, smi.AmdSmiMemoryType.VRAM)
+        used = smi.amdsmi_get_gpu_memory_usage(handle, smi.AmdSmiMemoryType.VRAM)
+        try:
+            temperature = smi.amdsmi_get_temp_metric(
+                handle, smi.AmdSmiTemperatureType.EDGE, smi.AmdSmiTemperatureMetric.CURRENT
+            )
+        except smi.AmdSmiException:
+            temperature = smi.amdsmi_get_temp_metric(
+                handle, smi.AmdSmiTemperatureType.HOTSPOT, smi.AmdSmiTemperatureMetric.CURRENT
+            )
+        power = smi.amdsmi_get_power_info(handle)
+        return {
+            'card': f"card{position}",
+            'gpu_utilization': _number(smi.amdsmi_get_gpu_activity(handle).get('gfx_activity')) or 0.0,
+            'memory_utilization': used / total * 100 if total else 0.0,
+            'memory_used': used,
+            'temperature': _number(temperature) or 0.0,
+            'power_usage': _number(power.get('average_socket_power')) or _number(power.get('current_socket_power')) or 0.0
+        }
+
+    def shutdown(self):
+        try:
+            self.amdsmi.amdsmi_shut_down()
+        except Exception:
+            pass
@@ -45,6 +45,8 @@ def build_executable():
         '--onefile',
         '--console',  # Show console for logging (change to --windowed for release)
         '--add-data=templates:templates',
+        '--add-data=python_worker_template.py:.',  # Launched as a script by the prefork pool
+        '--add-data=native_shim:native_shim',  # sitecustomize injected into native Python jobs
         '--additional-hooks-dir=.',  # Use our custom hooks to override torch
         # Essential hidden imports only
         '--hidden-import=uvicorn',
@@ -92,6 +92,8 @@ def build_executable():
     # Continue with other options
     cmd.extend([
         '--add-data=templates;templates',
+        '--add-data=python_worker_template.py;.',  # Launched as a script by the prefork pool
+        '--add-data=native_shim;native_shim',  # sitecustomize injected into native Python jobs
         '--additional-hooks-dir=.',  # Use our custom hooks to override torch
         
         # Hidden imports
@@ -0,0 +1,312 @@
+# cgroup_limits.py
+"""
+cgroup v2 resource control for native jobs
+
+RLIMIT_AS breaks CUDA and JIT runtimes (they reserve huge virtual address
+ranges) and RLIMIT_CPU counts CPU seconds rather than bounding CPU share.
+When the agent runs in a delegated cgroup v2 hierarchy, each native job is
+instead placed in its own cgroup:
+
+    <agent cgroup>/agent         - the agent itself (cgroup v2 only allows
+                                   processes in leaf cgroups)
+    <agent cgroup>/jobs/<job_id> - one cgroup per job with memory.max,
+                                   cpu.max, pids.max, io.max and cpuset.cpus
+
+After the job, peak memory and CPU usage are read back from the cgroup and
+the whole process tree can be killed at once with cgroup.kill.
+
+If cgroups are not delegated (v1/hybrid hosts, units without systemd
+Delegate=yes, macOS) the executor keeps using rlimits.
+"""
+
+import asyncio
+import os
+import signal
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+
+from job_workspace import is_valid_job_id
+
+CGROUP_MOUNT = Path("/sys/fs/cgroup")
+CONTROLLERS = ('cpu', 'cpuset', 'memory', 'io', 'pids')
+CPU_PERIOD_US = 100000
+
+
+@dataclass
+class CgroupLimits:
+    """Limits applied to one job cgroup (0 = unlimited)"""
+    memory_bytes: int = 0
+    cpu_cores: float = 0
+    pids_max: int = 0
+    io_read_bps: int = 0
+    io_write_bps: int = 0
+    cpus: List[int] = field(default_factory=list)  # cpuset pinning
+
+
+def _read(path: Path) -> str:
+    return path.read_text().strip()
+
+
+def _write(path: Path, value: str):
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def _block_device(path: Path) -> Optional[str]:
+    """MAJ:MIN of the whole disk backing path (io.max rejects partitions)"""
+    try:
+        st_dev = os.stat(path).st_dev
+        dev = f"{os.major(st_dev)}:{os.minor(st_dev)}"
+        sys_dev = Path("/sys/dev/block") / dev
+        if not sys_dev.exists():
+            return None  # tmpfs, overlay and other virtual filesystems
+        if (sys_dev / "partition").exists():
+            dev = _read(sys_dev.resolve().parent / "dev")
+        return dev
+    except OSError:
+        return None
+
+
+class JobCgroup:
+    """cgroup of a single running job"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    @property
+    def procs_file(self) -> str:
+        """File a process writes its pid to in order to join the cgroup"""
+        return str(self.path / "cgroup.procs")
+
+    def enter(self):
+        """Move the calling process into the cgroup (used in the child before exec)"""
+        _write(Path(self.procs_file), str(os.getpid()))
+
+    def stats(self) -> Dict:
+        """Peak memory, CPU usage and throttling/OOM counters"""
+        stats: Dict = {}
+        try:
+            peak = self.path / "memory.peak"  # Linux 5.19+
+            stats['memory_peak'] = int(_read(peak if peak.exists() else self.path / "memory.current"))
+            for line in _read(self.path / "cpu.stat").splitlines():
+                key, value = line.split()
+                if key in ('usage_usec', 'user_usec', 'system_usec', 'nr_throttled', 'throttled_usec'):
+                    stats[f"cpu_{key}" if not key.startswith('nr_') else key] = int(value)
+            events = self.path / "memory.events"
+            if events.exists():
+                for line in _read(events).splitlines():
+                    key, value = line.split()
+                    if key == 'oom_kill':
+                        stats['oom_kills'] = int(value)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not read cgroup stats from {self.path}: {e}")
+        return stats
+
+    def kill(self):
+        """Kill every process in the cgroup (including ones the job spawned)"""
+        kill_file = self.path / "cgroup.kill"  # Linux 5.14+
+        try:
+            if kill_file.exists():
+                _write(kill_file, "1")
+                return
+            for pid in _read(self.path / "cgroup.procs").split():
+                try:
+                    os.kill(int(pid), signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        except OSError as e:
+            logger.debug(f"cgroup kill failed for {self.path}: {e}")
+
+    def remove(self):
+        """Delete the cgroup once its processes are gone"""
+        for _ in range(50):
+            try:
+                self.path.rmdir()
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                # Busy until the last process has been reaped
+                time.sleep(0.1)
+        logger.warning(f"Could not remove cgroup {self.path}")
+
+
+class CgroupManager:
+    """Creates per-job cgroups under the agent's delegated cgroup v2 subtree"""
+
+    def __init__(self,
+                 base_dir: Optional[Path] = None,
+                 pids_max: int = 1024,
+                 io_read_bps: int = 0,
+                 io_write_bps: int = 0):
+        """
+        Initialize cgroup manager
+
+        Args:
+            base_dir: Delegated cgroup directory (default: the agent's own cgroup)
+            pids_max: Maximum processes/threads per job
+            io_read_bps: Read bandwidth limit on the work dir's disk (0 = unlimited)
+            io_write_bps: Write bandwidth limit on the work dir's disk (0 = unlimited)
+        """
+        self.pids_max = pids_max
+        self.io_read_bps = io_read_bps
+        self.io_write_bps = io_write_bps
+        self.available = False
+        self.controllers: List[str] = []
+        self.jobs_root: Optional[Path] = None
+        self._core_jobs: Dict[int, int] = {}  # cpu -> jobs pinned to it
+        self._job_cores: Dict[str, List[int]] = {}
+
+        try:
+            self.cpus = sorted(os.sched_getaffinity(0))
+        except AttributeError:
+            self.cpus = list(range(os.cpu_count() or 1))
+
+        try:
+            if base_dir:
+                self._setup(Path(base_dir))  # Chosen by the operator: trusted as delegated
+            else:
+                own = self._own_cgroup()
+                if not self._delegated(own):
+                    raise RuntimeError(f"{own} is not a delegated cgroup (set NATIVE_CGROUP_DIR to use it anyway)")
+                self._setup(own)
+        except Exception as e:
+            logger.info(f"cgroup v2 not delegated to the agent ({e}) - native jobs use rlimits")
+
+    @staticmethod
+    def _own_cgroup() -> Path:
+        """The agent's cgroup on a unified (v2) hierarchy"""
+        for line in Path("/proc/self/cgroup").read_text().splitlines():
+            hierarchy, _controllers, path = line.split(':', 2)
+            if hierarchy == '0':
+                return CGROUP_MOUNT / path.lstrip('/')
+        raise RuntimeError("no cgroup v2 hierarchy")
+
+    @staticmethod
+    def _delegated(path: Path) -> bool:
+        """
+        Whether path was handed to the agent to manage
+
+        os.access() cannot tell: it is always true for root, whose cgroup is
+        usually a slice shared with other services. systemd marks delegated
+        cgroups with a delegate xattr (v251+) and, for Delegate=yes units with
+        a User=, chowns the cgroup to that user.
+        """
+        for attr in ('trusted.delegate', 'user.delegate'):
+            try:
+                if os.getxattr(path, attr) == b'1':
+                    return True
+            except (AttributeError, OSError):
+                pass
+        try:
+            uid = os.geteuid()
+            return uid != 0 and path.stat().st_uid == uid and (path / "cgroup.subtree_control").stat().st_uid == uid
+        except OSError:
+            return False
+
+    def _setup(self, base: Path):
+        controllers_file = base / "cgroup.controllers"
+        if not controllers_file.exists():
+            raise RuntimeError("not a cgroup v2 directory")
+        if not os.access(base / "cgroup.subtree_control", os.W_OK):
+            raise RuntimeError(f"{base} is not writable")
+
+        available = _read(controllers_file).split()
+        self.controllers = [c for c in CONTROLLERS if c in available]
+
+        # Processes may only live in leaf cgroups once controllers are enabled
+        # for children, so move the agent (and its helpers) into a leaf first
+        procs = _read(base / "cgroup.procs").split()
+        if procs:
+            agent_leaf = base / "agent"
+            agent_leaf.mkdir(exist_ok=True)
+            for pid in procs:
+                try:
+                    _write(agent_leaf / "cgroup.procs", pid)
+                except OSError:
+                    pass  # Exited, or not ours to move
+
+        enable = ' '.join(f"+{c}" for c in self.controllers)
+        _write(base / "cgroup.subtree_control", enable)
+        self.jobs_root = base / "jobs"
+        self.jobs_root.mkdir(exist_ok=True)
+        _write(self.jobs_root / "cgroup.subtree_control", enable)
+
+        missing = [c for c in CONTROLLERS if c not in self.controllers]
+        self.available = True
+        logger.info(
+            f"Native jobs isolated with cgroup v2 under {self.jobs_root}"
+            + (f" (controllers not delegated: {', '.join(missing)})" if missing else "")
+        )
+
+    def assign_cores(self, job_id: str, count: int) -> List[int]:
+        """Pick the least loaded cores for a job (shared only when all are busy)"""
+        count = max(1, min(count, len(self.cpus)))
+        cores = sorted(self.cpus, key=lambda c: (self._core_jobs.get(c, 0), c))[:count]
+        for core in cores:
+            self._core_jobs[core] = self._core_jobs.get(core, 0) + 1
+        self._job_cores[job_id] = cores
+        return sorted(cores)
+
+    def release_cores(self, job_id: str):
+        for core in self._job_cores.pop(job_id, []):
+            remaining = self._core_jobs.get(core, 1) - 1
+            if remaining > 0:
+                self._core_jobs[core] = remaining
+            else:
+                self._core_jobs.pop(core, None)
+
+    async def create(self, job_id: str, limits: CgroupLimits, io_path: Optional[Path] = None) -> Optional[JobCgroup]:
+        """
+        Create a cgroup for a job
+
+        Args:
+            job_id: Job identifier (cgroup name)
+            limits: Limits to apply
+            io_path: Path whose backing disk io.max applies to (the job workspace)
+
+        Returns:
+            JobCgroup, or None if cgroups are unavailable (caller uses rlimits)
+        """
+        if not self.available:
+            return None
+        if not is_valid_job_id(job_id):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+
+        path = self.jobs_root / job_id
+        try:
+            path.mkdir(exist_ok=True)
+            if 'memory' in self.controllers and limits.memory_bytes:
+                _write(path / "memory.max", str(limits.memory_bytes))
+                _write(path / "memory.swap.max", "0")
+            if 'cpu' in self.controllers and limits.cpu_cores:
+                _write(path / "cpu.max", f"{int(limits.cpu_cores * CPU_PERIOD_US)} {CPU_PERIOD_US}")
+            if 'pids' in self.controllers and limits.pids_max:
+                _write(path / "pids.max", str(limits.pids_max))
+            if 'cpuset' in self.controllers and limits.cpus:
+                _write(path / "cpuset.cpus", ','.join(str(c) for c in limits.cpus))
+            if 'io' in self.controllers and (limits.io_read_bps or limits.io_write_bps) and io_path:
+                device = _block_device(io_path)
+                if device:
+                    rbps = limits.io_read_bps or 'max'
+                    wbps = limits.io_write_bps or 'max'
+                    _write(path / "io.max", f"{device} rbps={rbps} wbps={wbps}")
+            return JobCgroup(path)
+        except OSError as e:
+            logger.warning(f"Could not create cgroup for job {job_id}, using rlimits: {e}")
+            await asyncio.to_thread(JobCgroup(path).remove)  # May wait up to 5s for the cgroup to empty
+            return None
+
+    def limits_for(self, job_id: str, memory_limit_mb: int, cpu_limit: int) -> CgroupLimits:
+        """Limits for a native job, including its cpuset assignment"""
+        return CgroupLimits(
+            memory_bytes=memory_limit_mb * 1024 * 1024,
+            cpu_cores=cpu_limit,
+            pids_max=self.pids_max,
+            io_read_bps=self.io_read_bps,
+            io_write_bps=self.io_write_bps,
+            cpus=self.assign_cores(job_id, cpu_limit) if 'cpuset' in self.controllers else []
+        )
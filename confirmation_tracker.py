@@ -0,0 +1,227 @@
+# confirmation_tracker.py
+"""
+Transaction confirmation tracking for the wallet
+
+Every in-flight signature is registered with one ConfirmationTracker and
+awaited through a future. Two sources resolve those futures:
+
+    signatureSubscribe  - one PubSub connection multiplexes a subscription
+                          per pending signature; the node pushes the result
+                          as soon as the transaction reaches the commitment
+    getSignatureStatuses - one batched call per 256 pending signatures, as a
+                          fallback while the connection is down and as a
+                          safety net for transactions that landed before
+                          their subscription was registered
+
+RPC traffic therefore grows with batches, not with the number of payments
+waiting, and confirmation arrives within roughly one block time.
+"""
+
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+from solana.rpc.commitment import Confirmed
+from loguru import logger
+
+MAX_STATUS_BATCH = 256  # getSignatureStatuses limit per call
+CONFIRMED_STATUSES = (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized)
+RESUBSCRIBE_MAX_SECONDS = 60
+
+
+class ConfirmationTracker:
+    """Resolves one future per pending signature from PubSub pushes and batched status polls"""
+
+    def __init__(self,
+                 client,
+                 ws_url: str,
+                 poll_interval: float = 2.0,
+                 live_poll_interval: float = 15.0):
+        """
+        Initialize tracker
+
+        Args:
+            client: solana AsyncClient used for getSignatureStatuses
+            ws_url: PubSub endpoint for signatureSubscribe
+            poll_interval: Seconds between status polls while PubSub is down
+            live_poll_interval: Seconds between safety-net polls while PubSub is up
+        """
+        self.client = client
+        self.ws_url = ws_url
+        self.poll_interval = poll_interval
+        self.live_poll_interval = live_poll_interval
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, int] = {}  # signature -> callers currently in wait()
+        self._new: asyncio.Queue = asyncio.Queue()  # Signatures to subscribe on the live connection
+        self._has_pending = asyncio.Event()
+        self._live = False
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {'confirmed': 0, 'failed': 0, 'timed_out': 0, 'pushed': 0, 'polled': 0, 'status_calls': 0}
+
+    def _start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._subscription_loop(), name="confirmation-pubsub"),
+                asyncio.create_task(self._poll_loop(), name="confirmation-poll")
+            ]
+
+    async def stop(self):
+        """Stop background tasks; pending waits resolve as not confirmed"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        for signature in list(self._pending):
+            self._resolve(signature, False, None)
+
+    async def wait(self, signature: str, timeout: float = 60.0) -> bool:
+        """
+        Wait until a transaction is confirmed
+
+        Args:
+            signature: Transaction signature (base58)
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            True if confirmed, False if it failed on chain or timed out
+        """
+        self._start()
+        future = self._pending.get(signature)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[signature] = future
+            self._new.put_nowait(signature)
+            self._has_pending.set()
+        self._waiters[signature] = self._waiters.get(signature, 0) + 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats['timed_out'] += 1
+            logger.warning(f"Transaction confirmation timeout: {signature}")
+            # Stop tracking only when no other caller is still waiting on the same signature
+            if self._waiters[signature] == 1 and self._pending.get(signature) is future and not future.done():
+                future.cancel()
+                self._forget(signature)
+            return False
+        finally:
+            remaining = self._waiters[signature] - 1
+            if remaining > 0:
+                self._waiters[signature] = remaining
+            else:
+                del self._waiters[signature]
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _forget(self, signature: str):
+        self._pending.pop(signature, None)
+        if not self._pending:
+            self._has_pending.clear()
+
+    def _resolve(self, signature: str, confirmed: bool, source: Optional[str]):
+        future = self._pending.get(signature)
+        if future is None:
+            return
+        self._forget(signature)
+        if future.done():
+            return
+        future.set_result(confirmed)
+        if source:
+            self.stats[source] += 1
+            self.stats['confirmed' if confirmed else 'failed'] += 1
+            if confirmed:
+                logger.info(f"Transaction confirmed: {signature}")
+            else:
+                logger.warning(f"Transaction failed: {signature}")
+
+    async def _poll_loop(self):
+        """Batched getSignatureStatuses over everything still pending"""
+        while True:
+            await self._has_pending.wait()
+            await asyncio.sleep(self.live_poll_interval if self._live else self.poll_interval)
+            signatures = list(self._pending)
+            for start in range(0, len(signatures), MAX_STATUS_BATCH):
+                try:
+                    await self._poll_batch(signatures[start:start + MAX_STATUS_BATCH])
+                except Exception as e:
+                    logger.warning(f"Error checking confirmations: {e}")
+
+    async def _poll_batch(self, signatures: List[str]):
+        self.stats['status_calls'] += 1
+        response = await self.client.get_signature_statuses(
+            [Signature.from_string(signature) for signature in signatures]
+        )
+        for signature, status in zip(signatures, response.value or []):
+            if status is None:
+                continue  # Not seen by the node yet
+            if status.err is not None:
+                self._resolve(signature, False, 'polled')
+            elif status.confirmation_status in CONFIRMED_STATUSES:
+                self._resolve(signature, True, 'polled')
+
+    async def _subscription_loop(self):
+        """Hold a PubSub connection while anything is pending; polling covers the gaps"""
+        backoff = 1
+        while True:
+            await self._has_pending.wait()
+            try:
+                await self._subscribe_pending()
+                backoff = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Signature subscription unavailable ({self.ws_url}): {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RESUBSCRIBE_MAX_SECONDS)
+            finally:
+                self._live = False
+
+    async def _subscribe_pending(self):
+        """Subscribe every pending signature on one connection until nothing is pending"""
+        from solana.rpc.websocket_api import connect
+
+        async with connect(self.ws_url) as websocket:
+            # The connection starts with everything pending; drop queued duplicates
+            while not self._new.empty():
+                self._new.get_nowait()
+            awaiting_id: Deque[str] = deque()  # Subscribe requests answered in order
+            subscriptions: Dict[int, str] = {}
+
+            async def subscribe(signature: str):
+                awaiting_id.append(signature)
+                await websocket.signature_subscribe(Signature.from_string(signature), commitment=Confirmed)
+
+            for signature in list(self._pending):
+                await subscribe(signature)
+            self._live = True
+
+            async def send_new():
+                while True:
+                    signature = await self._new.get()
+                    if signature in self._pending:
+                        await subscribe(signature)
+
+            sender = asyncio.create_task(send_new())
+            try:
+                async for messages in websocket:
+                    for message in messages:
+                        subscription = getattr(message, 'subscription', None)
+                        if subscription is None:
+                            # Subscribe response: result is the subscription id
+                            if awaiting_id and isinstance(getattr(message, 'result', None), int):
+                                subscriptions[message.result] = awaiting_id.popleft()
+                            continue
+                        signature = subscriptions.pop(subscription, None)
+                        value = getattr(getattr(message, 'result', None), 'value', None)
+                        if signature and value is not None:
+                            self._resolve(signature, getattr(value, 'err', None) is None, 'pushed')
+                    if not self._pending:
+                        return  # Idle: close the connection until the next payment
+            finally:
+                sender.cancel()
@@ -0,0 +1,338 @@
+# container_pool.py
+"""
+Warm container pool for repeated images
+
+Creating, starting and removing a container adds seconds to every job,
+which dominates short inference jobs. The pool keeps idle containers per
+(image, GPU) that just sleep, and runs job commands inside them with
+docker exec.
+
+Each pooled container bind-mounts its own slot directory at /input (ro)
+and /output, and gets tmpfs mounts at /tmp and /var/tmp. For a job, inputs
+are hardlinked into the slot, the command is exec'd, and outputs are moved
+into the job's workspace. Between jobs the slot is wiped, stray processes
+are killed and the tmpfs mounts are cleared. A job that wrote anywhere else
+in the container filesystem (home directories, installed packages, caches)
+shows up in `docker diff`, and such a container is never reused. Any
+container that fails, times out, cannot be reset or has reached its reuse
+limit is destroyed instead of returned to the pool.
+
+Images with an ENTRYPOINT are not pooled, since exec would bypass it.
+"""
+
+import asyncio
+import shutil
+import stat
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from loguru import logger
+
+from job_logs import JobLogStream
+from job_workspace import link_tree, remove_tree
+
+POOL_LABEL = 'node3.warm_pool'
+DEFAULT_POOL_DIR = Path("/tmp/node3_warm_pool")
+RESET_SCRIPT = "kill -9 -1 2>/dev/null; rm -rf /tmp/* /tmp/.[!.]* /var/tmp/* 2>/dev/null; true"
+
+
+@dataclass
+class WarmContainer:
+    """An idle container and its host-side slot directory"""
+    container: object
+    key: Tuple[str, int]  # (image, gpu_id)
+    slot_dir: Path
+    uses: int = 0
+    baseline: FrozenSet[Tuple[str, int]] = frozenset()  # `docker diff` right after start
+
+    @property
+    def input_dir(self) -> Path:
+        return self.slot_dir / "input"
+
+    @property
+    def output_dir(self) -> Path:
+        return self.slot_dir / "output"
+
+
+def _rootfs_changes(container) -> FrozenSet[Tuple[str, int]]:
+    """Paths changed in the container's writable layer as (path, kind) pairs"""
+    return frozenset((change['Path'], change['Kind']) for change in container.diff() or [])
+
+
+def _empty_dir(path: Path):
+    """Remove everything inside a directory but keep the directory"""
+    path.mkdir(parents=True, exist_ok=True)
+    path.chmod(path.stat().st_mode | stat.S_IRWXU)  # May have been copied from a read-only source
+    for child in path.iterdir():
+        if child.is_dir() and not child.is_symlink():
+            remove_tree(child)
+        else:
+            child.unlink(missing_ok=True)
+
+
+def _move_contents(src: Path, dst: Path):
+    """Move everything inside src into dst"""
+    dst.mkdir(parents=True, exist_ok=True)
+    for child in src.iterdir():
+        shutil.move(str(child), str(dst / child.name))
+
+
+class WarmContainerPool:
+    """Pool of pre-created idle containers keyed by (image, GPU)"""
+
+    def __init__(self,
+                 docker_manager,
+                 pool_size: int = 1,
+                 max_uses: int = 50,
+                 pool_dir: Optional[Path] = None):
+        """
+        Initialize warm pool
+
+        Args:
+            docker_manager: DockerManager owning the Docker client
+            pool_size: Idle containers kept per (image, GPU)
+            max_uses: Jobs a container may run before it is replaced
+            pool_dir: Host directory for per-container slot directories
+        """
+        self.docker_manager = docker_manager
+        self.pool_size = max(1, pool_size)
+        self.max_uses = max(1, max_uses)
+        self.pool_dir = Path(pool_dir) if pool_dir else DEFAULT_POOL_DIR
+        self._idle: Dict[Tuple[str, int], List[WarmContainer]] = {}
+        self._filling: Dict[Tuple[str, int], asyncio.Task] = {}
+        self._poolable: Dict[str, bool] = {}  # image -> has no ENTRYPOINT
+        self.hits = 0
+        self.misses = 0
+
+        self._remove_stale()
+
+    @property
+    def client(self):
+        return self.docker_manager.client
+
+    def _remove_stale(self):
+        """Remove pool containers left behind by a previous agent run"""
+        try:
+            stale = self.client.containers.list(all=True, filters={'label': POOL_LABEL})
+            for container in stale:
+                container.remove(force=True)
+            if stale:
+                logger.info(f"Removed {len(stale)} stale warm pool container(s)")
+        except Exception as e:
+            logger.debug(f"Could not clean stale warm pool containers: {e}")
+        remove_tree(self.pool_dir)
+
+    async def _is_poolable(self, image: str) -> bool:
+        if image not in self._poolable:
+            try:
+                img = await asyncio.to_thread(self.client.images.get, image)
+                entrypoint = img.attrs.get('Config', {}).get('Entrypoint')
+                self._poolable[image] = not entrypoint
+                if entrypoint:
+                    logger.info(f"Image {image} has an ENTRYPOINT - not using warm pool")
+            except Exception as e:
+                logger.debug(f"Could not inspect {image} for warm pool: {e}")
+                return False
+        return self._poolable[image]
+
+    async def _create(self, key: Tuple[str, int]) -> Optional[WarmContainer]:
+        """Create and start an idle container for (image, gpu_id)"""
+        image, gpu_id = key
+        slot_dir = self.pool_dir / uuid.uuid4().hex[:12]
+        warm = WarmContainer(container=None, key=key, slot_dir=slot_dir)
+        warm.input_dir.mkdir(parents=True, exist_ok=True)
+        warm.output_dir.mkdir(parents=True, exist_ok=True)
+
+        runtime_config = self.docker_manager._get_runtime_config(gpu_id)
+        try:
+            warm.container = await asyncio.to_thread(
+                self.client.containers.run,
+                image=image,
+                entrypoint=['sleep', '2147483647'],
+                environment=runtime_config.get('environment', {}),
+                device_requests=runtime_config.get('device_requests', []),
+                volumes={
+                    str(warm.input_dir): {'bind': '/input', 'mode': 'ro'},
+                    str(warm.output_dir): {'bind': '/output', 'mode': 'rw'}
+                },
+                tmpfs={'/tmp': '', '/var/tmp': ''},  # Scratch space that does not show up in diff()
+                labels={POOL_LABEL: 'true'},
+                detach=True,
+                runtime=runtime_config.get('runtime'),
+                **self.docker_manager.container_limits()
+            )
+            await asyncio.to_thread(warm.container.reload)
+            if warm.container.status != 'running':
+                raise RuntimeError(f"container status is {warm.container.status}")
+            warm.baseline = await asyncio.to_thread(_rootfs_changes, warm.container)
+            logger.debug(f"Warm container {warm.container.id[:12]} ready for {image} on GPU {gpu_id}")
+            return warm
+        except Exception as e:
+            logger.warning(f"Could not create warm container for {image}: {e}")
+            await self._discard(warm)
+            self._poolable[image] = False
+            return None
+
+    async def _discard(self, warm: WarmContainer):
+        """Destroy a container and its slot directory"""
+        if warm.container is not None:
+            try:
+                await asyncio.to_thread(warm.container.remove, force=True)
+            except Exception as e:
+                logger.debug(f"Warm container removal note: {e}")
+        remove_tree(warm.slot_dir)
+
+    async def _reset(self, warm: WarmContainer) -> bool:
+        """Return a container to a clean state, False if it must be discarded"""
+        if warm.uses >= self.max_uses:
+            return False
+        try:
+            _empty_dir(warm.input_dir)
+            _empty_dir(warm.output_dir)
+            result = await asyncio.wait_for(
+                asyncio.to_thread(warm.container.exec_run, ['sh', '-c', RESET_SCRIPT]),
+                timeout=30
+            )
+            if result.exit_code != 0:
+                return False
+            # Files left outside /input, /output and the tmpfs mounts would leak into the next job
+            changes = await asyncio.to_thread(_rootfs_changes, warm.container)
+            if changes != warm.baseline:
+                logger.debug(
+                    f"Warm container {warm.container.id[:12]} changed {len(changes ^ warm.baseline)} "
+                    f"path(s) in its filesystem - discarding"
+                )
+                return False
+            await asyncio.to_thread(warm.container.reload)
+            return warm.container.status == 'running'
+        except Exception as e:
+            logger.debug(f"Warm container reset failed: {e}")
+            return False
+
+    async def _fill(self, key: Tuple[str, int]):
+        """Top up idle containers for key in the background"""
+        try:
+            while len(self._idle.get(key, [])) < self.pool_size:
+                warm = await self._create(key)
+                if warm is None:
+                    break
+                self._idle.setdefault(key, []).append(warm)
+        finally:
+            self._filling.pop(key, None)
+
+    def _schedule_fill(self, key: Tuple[str, int]):
+        if key not in self._filling and len(self._idle.get(key, [])) < self.pool_size:
+            self._filling[key] = asyncio.create_task(self._fill(key))
+
+    async def run(self,
+                  image: str,
+                  command: List[str],
+                  environment: Dict[str, str],
+                  gpu_id: int,
+                  timeout: int,
+                  input_dir: Path,
+                  output_dir: Path,
+                  log_stream: JobLogStream) -> Optional[Dict]:
+        """
+        Run a job command in a warm container
+
+        Output is streamed into log_stream while the command runs.
+
+        Returns:
+            Result dict like DockerManager.run_job, or None if the job cannot use
+            the pool (caller falls back to a fresh container)
+        """
+        if not await self._is_poolable(image):
+            return None
+
+        key = (image, gpu_id)
+        idle = self._idle.get(key, [])
+        if idle:
+            warm = idle.pop()
+            self.hits += 1
+        else:
+            self.misses += 1
+            warm = await self._create(key)
+            if warm is None:
+                return None
+
+        keep = False
+        try:
+            if input_dir.exists():
+                await asyncio.to_thread(link_tree, input_dir, warm.input_dir)
+
+            warm.uses += 1
+            logger.info(f"Running job in warm container {warm.container.id[:12]} ({image})")
+            try:
+                exit_code = await asyncio.wait_for(
+                    asyncio.to_thread(self._exec_streaming, warm, command, environment, log_stream),
+                    timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                logger.error(f"Container timeout after {timeout}s")
+                return {
+                    'success': False,
+                    'error': f"Timeout after {timeout}s",
+                    'output': log_stream.tail_text()
+                }
+
+            await asyncio.to_thread(_move_contents, warm.output_dir, output_dir)
+            logs = log_stream.tail_text()
+
+            if exit_code == 0:
+                logger.info("Container completed successfully")
+                keep = True
+                return {
+                    'success': True,
+                    'output': logs,
+                    'exit_code': exit_code
+                }
+            else:
+                logger.error(f"Container failed with exit code {exit_code}")
+                return {
+                    'success': False,
+                    'error': f"Exit code {exit_code}",
+                    'output': logs
+                }
+        finally:
+            if keep and await self._reset(warm):
+                self._idle.setdefault(key, []).append(warm)
+            else:
+                await self._discard(warm)
+            self._schedule_fill(key)
+
+    def _exec_streaming(self,
+                        warm: WarmContainer,
+                        command: List[str],
+                        environment: Dict[str, str],
+                        log_stream: JobLogStream) -> int:
+        """Exec a command, streaming its output into the log, and return its exit code"""
+        api = self.client.api
+        exec_id = api.exec_create(warm.container.id, command, environment=environment)['Id']
+        chunks = api.exec_start(exec_id, stream=True, demux=True)
+        for stdout, stderr in chunks:
+            if stdout:
+                log_stream.feed(stdout, 'stdout')
+            if stderr:
+                log_stream.feed(stderr, 'stderr')
+        return api.exec_inspect(exec_id)['ExitCode']
+
+    def get_stats(self) -> Dict:
+        """Pool statistics"""
+        return {
+            'pool_size': self.pool_size,
+            'idle_containers': sum(len(v) for v in self._idle.values()),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    async def close(self):
+        """Remove all idle containers"""
+        for task in list(self._filling.values()):
+            task.cancel()
+        for idle in self._idle.values():
+            for warm in idle:
+                await self._discard(warm)
+        self._idle.clear()
+        remove_tree(self.pool_dir)
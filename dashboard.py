@@ -1,13 +1,15 @@
 # dashboard.py
 
 from fastapi import FastAPI, WebSocket, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 import uvicorn
-from typing import Dict, List
+import asyncio
+from typing import Dict
 from datetime import datetime
 from loguru import logger
 import os
+from status_broadcaster import StatusBroadcaster
 
 app = FastAPI(title="node3 Agent Dashboard")
 
@@ -24,12 +26,56 @@ class Dashboard:
                  gpu_detector,
                  job_manager,
                  payment_module,
-                 port: int = 8080):
+                 port: int = 8080,
+                 status_interval: float = 2.0):
         self.gpu_detector = gpu_detector
         self.job_manager = job_manager
         self.payment_module = payment_module
         self.port = port
-        self.active_websockets: List[WebSocket] = []
+        # One status build per interval, shared by every open dashboard
+        self.status_broadcaster = StatusBroadcaster(self._build_status, interval=status_interval)
+        
+    async def _build_status(self) -> Dict:
+        """Current agent status (GPU metrics, jobs, wallet)"""
+        gpus = self.gpu_detector.gpus
+        
+        # Update GPU detector with active job count for better metrics
+        active_job_count = len(self.job_manager.active_jobs)
+        if hasattr(self.gpu_detector, '_active_job_count'):
+            self.gpu_detector._active_job_count = active_job_count
+        
+        gpu_data = []
+        for gpu in gpus:
+            util = self.gpu_detector.get_gpu_utilization(gpu.index)
+            gpu_data.append({
+                'index': gpu.index,
+                'name': gpu.name,
+                'vendor': gpu.vendor,
+                'gpu_type': gpu.gpu_type.value if hasattr(gpu.gpu_type, 'value') else str(gpu.gpu_type),
+                'compute_framework': gpu.compute_framework.value if hasattr(gpu.compute_framework, 'value') else str(gpu.compute_framework),
+                'memory': gpu.total_memory,
+                'utilization': util.get('gpu_utilization', 0),
+                'memory_used': util.get('memory_used', 0),
+                'temperature': util.get('temperature', 0),
+                'power': util.get('power_usage', 0),
+                'metrics_accurate': util.get('metrics_accurate', False)  # True if real measurements
+            })
+        
+        # Get wallet balance
+        try:
+            balance = await self.payment_module.get_balance()
+        except Exception as e:
+            logger.error(f"Error getting balance: {e}")
+            balance = 0.0
+            
+        return {
+            'gpus': gpu_data,
+            'active_jobs': active_job_count,
+            'completed_jobs': len(self.job_manager.job_history),
+            'wallet_address': self.payment_module.get_wallet_address(),
+            'balance': float(balance),  # Ensure it's a float, not a string
+            'status': 'running' if self.job_manager.is_running else 'stopped'
+        }
         
     def setup_routes(self):
         """Setup FastAPI routes"""
@@ -51,45 +97,8 @@ class Dashboard:
         @app.get("/api/status")
         async def get_status():
             """Get current agent status"""
-            gpus = self.gpu_detector.gpus
-            
-            # Update GPU detector with active job count for better metrics
-            active_job_count = len(self.job_manager.active_jobs)
-            if hasattr(self.gpu_detector, '_active_job_count'):
-                self.gpu_detector._active_job_count = active_job_count
-            
-            gpu_data = []
-            for gpu in gpus:
-                util = self.gpu_detector.get_gpu_utilization(gpu.index)
-                gpu_data.append({
-                    'index': gpu.index,
-                    'name': gpu.name,
-                    'vendor': gpu.vendor,
-                    'gpu_type': gpu.gpu_type.value if hasattr(gpu.gpu_type, 'value') else str(gpu.gpu_type),
-                    'compute_framework': gpu.compute_framework.value if hasattr(gpu.compute_framework, 'value') else str(gpu.compute_framework),
-                    'memory': gpu.total_memory,
-                    'utilization': util.get('gpu_utilization', 0),
-                    'memory_used': util.get('memory_used', 0),
-                    'temperature': util.get('temperature', 0),
-                    'power': util.get('power_usage', 0),
-                    'metrics_accurate': util.get('metrics_accurate', False)  # True if real measurements
-                })
-            
-            # Get wallet balance
-            try:
-                balance = await self.payment_module.get_balance()
-            except Exception as e:
-                logger.error(f"Error getting balance: {e}")
-                balance = 0.0
-                
-            return {
-                'gpus': gpu_data,
-                'active_jobs': active_job_count,
-                'completed_jobs': len(self.job_manager.job_history),
-                'wallet_address': self.payment_module.get_wallet_address(),
-                'balance': float(balance),  # Ensure it's a float, not a string
-                'status': 'running' if self.job_manager.is_running else 'stopped'
-            }
+            # Served from the broadcaster while dashboards are open, built on demand otherwise
+            return self.status_broadcaster.latest or await self._build_status()
             
         @app.get("/api/jobs")
         async def get_jobs():
@@ -127,6 +136,123 @@ class Dashboard:
                 'failed_jobs': len([j for j in self.job_manager.job_history if j.status.value == 'failed'])
             }
             
+        @app.get("/api/cache")
+        async def get_cache_stats():
+            """Get input dataset cache statistics"""
+            if not self.job_manager.input_cache:
+                return {'enabled': False}
+            return self.job_manager.input_cache.get_stats()
+            
+        @app.get("/api/wallet/history")
+        async def get_wallet_history(page: int = 1, page_size: int = 50, direction: str = None):
+            """Get a page of wallet transactions from the local index"""
+            history = self.payment_module.history
+            if not history:
+                return {'enabled': False}
+            return history.get_page(page=page, page_size=page_size, direction=direction)
+            
+        @app.get("/api/wallet/earnings")
+        async def get_wallet_earnings(since: float = None):
+            """Get on-chain earnings totals from the local index"""
+            history = self.payment_module.history
+            if not history:
+                return {'enabled': False}
+            return history.get_earnings(since=since)
+            
+        @app.get("/api/wallet/job-payments")
+        async def get_job_payments():
+            """Match completed jobs to the incoming payments that settled them"""
+            history = self.payment_module.history
+            if not history:
+                return {'enabled': False}
+            jobs = [
+                {
+                    'job_id': job.job_id,
+                    'reward': job.reward,
+                    'completed_at': job.completed_at.timestamp() if job.completed_at else None
+                }
+                for job in self.job_manager.job_history if job.status.value == 'completed'
+            ]
+            matches = history.match_job_payments(jobs)
+            return {
+                'payments': matches,
+                'unpaid': [job_id for job_id, payment in matches.items() if payment is None]
+            }
+            
+        @app.get("/api/rpc")
+        async def get_rpc_stats():
+            """Get per-endpoint Solana RPC statistics"""
+            return {'endpoints': self.payment_module.get_rpc_stats()}
+            
+        @app.get("/api/metrics/history")
+        async def get_metrics_history(device: str = None,
+                                      metrics: str = None,
+                                      window: float = 3600,
+                                      start: float = None,
+                                      end: float = None,
+                                      resolution: str = 'auto',
+                                      agg: str = 'mean'):
+            """Get GPU/host metric history (device list when no device is given)"""
+            history = self.gpu_detector.history
+            if not device:
+                return {'devices': history.devices()}
+            end = end if end is not None else datetime.now().timestamp()
+            start = start if start is not None else end - window
+            try:
+                result = history.query(
+                    device,
+                    metrics=metrics.split(',') if metrics else None,
+                    start=start,
+                    end=end,
+                    resolution=resolution,
+                    agg=agg
+                )
+            except ValueError as e:
+                return JSONResponse({'error': str(e)}, status_code=400)
+            if result is None:
+                return JSONResponse({'error': f"No history for device {device}"}, status_code=404)
+            return result
+            
+        @app.get("/api/jobs/{job_id}/logs")
+        async def get_job_logs(job_id: str, tail: int = 200):
+            """Get the most recent output lines of a running or recent job"""
+            log_stream = self.job_manager.log_hub.get(job_id)
+            if not log_stream:
+                return {'job_id': job_id, 'lines': [], 'available': False}
+            return {
+                'job_id': job_id,
+                'available': True,
+                'finished': log_stream.closed,
+                'total_lines': log_stream.total_lines,
+                'lines': log_stream.tail(limit=max(0, tail))
+            }
+            
+        @app.websocket("/ws/jobs/{job_id}/logs")
+        async def job_logs_websocket(websocket: WebSocket, job_id: str):
+            """WebSocket streaming job output lines as they are produced"""
+            await websocket.accept()
+            log_stream = self.job_manager.log_hub.get(job_id)
+            if not log_stream:
+                await websocket.close(code=4404)
+                return
+            
+            # Subscribe before sending the backlog so no line falls in between
+            queue = log_stream.subscribe()
+            try:
+                for entry in log_stream.tail():
+                    await websocket.send_json(entry)
+                while True:
+                    entry = await queue.get()
+                    if entry is None:
+                        break
+                    timestamp, stream, line = entry
+                    await websocket.send_json({'time': timestamp, 'stream': stream, 'line': line})
+                await websocket.close()
+            except Exception as e:
+                logger.debug(f"Job log WebSocket closed: {e}")
+            finally:
+                log_stream.unsubscribe(queue)
+            
         @app.post("/api/start")
         async def start_agent():
             """Start the agent"""
@@ -145,25 +271,23 @@ class Dashboard:
         @app.get("/api/marketplace/jobs")
         async def get_marketplace_jobs():
             """Get available marketplace jobs"""
-            import httpx
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        f"{self.job_manager.marketplace_url}/api/jobs/available",
-                        json={
-                            'gpu_model': self.job_manager.gpu_info['name'],
-                            'gpu_vendor': self.job_manager.gpu_info.get('vendor', 'unknown'),
-                            'gpu_memory': self.job_manager.gpu_info['total_memory'],
-                            'max_concurrent_jobs': 1
-                        },
-                        headers={'X-API-Key': self.job_manager.api_key} if self.job_manager.api_key else {},
-                        timeout=5.0
-                    )
-                    
-                    if response.status_code == 200:
-                        return response.json()
-                    else:
-                        return {'jobs': []}
+                response = await self.job_manager.http_client.post(
+                    f"{self.job_manager.marketplace_url}/api/jobs/available",
+                    json={
+                        'gpu_model': self.job_manager.gpu_info['name'],
+                        'gpu_vendor': self.job_manager.gpu_info.get('vendor', 'unknown'),
+                        'gpu_memory': self.job_manager.gpu_info['total_memory'],
+                        'max_concurrent_jobs': self.job_manager.max_concurrent_jobs
+                    },
+                    headers={'X-API-Key': self.job_manager.api_key} if self.job_manager.api_key else {},
+                    timeout=5.0
+                )
+                
+                if response.status_code == 200:
+                    return response.json()
+                else:
+                    return {'jobs': []}
             except Exception as e:
                 logger.error(f"Error fetching marketplace jobs: {e}")
                 return {'jobs': []}
@@ -171,73 +295,59 @@ class Dashboard:
         @app.get("/api/marketplace/agents")
         async def get_marketplace_agents():
             """Get available compute agents in marketplace"""
-            import httpx
             try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(
-                        f"{self.job_manager.marketplace_url}/api/marketplace/agents",
-                        timeout=5.0
-                    )
-                    
-                    if response.status_code == 200:
-                        return response.json()
-                    else:
-                        return {'agents': []}
+                response = await self.job_manager.http_client.get(
+                    f"{self.job_manager.marketplace_url}/api/marketplace/agents",
+                    timeout=5.0
+                )
+                
+                if response.status_code == 200:
+                    return response.json()
+                else:
+                    return {'agents': []}
             except Exception as e:
                 logger.error(f"Error fetching marketplace agents: {e}")
                 return {'agents': []}
             
         @app.websocket("/ws")
         async def websocket_endpoint(websocket: WebSocket):
-            """WebSocket for real-time updates"""
+            """WebSocket for real-time updates (a snapshot, then deltas)"""
             await websocket.accept()
-            self.active_websockets.append(websocket)
+            queue = self.status_broadcaster.subscribe()
             
-            try:
+            async def send_updates():
                 while True:
-                    # Send status updates every 2 seconds
-                    import asyncio
-                    await asyncio.sleep(2)
-                    
-                    # Get status data
-                    gpus = self.gpu_detector.gpus
-                    gpu_data = []
-                    for gpu in gpus:
-                        util = self.gpu_detector.get_gpu_utilization(gpu.index)
-                        gpu_data.append({
-                            'index': gpu.index,
-                            'name': gpu.name,
-                            'vendor': gpu.vendor,
-                            'gpu_type': gpu.gpu_type.value if hasattr(gpu.gpu_type, 'value') else str(gpu.gpu_type),
-                            'compute_framework': gpu.compute_framework.value if hasattr(gpu.compute_framework, 'value') else str(gpu.compute_framework),
-                            'memory': gpu.total_memory,
-                            'utilization': util.get('gpu_utilization', 0),
-                            'memory_used': util.get('memory_used', 0),
-                            'temperature': util.get('temperature', 0),
-                            'power': util.get('power_usage', 0)
-                        })
-                    
-                    status = {
-                        'gpus': gpu_data,
-                        'active_jobs': len(self.job_manager.active_jobs),
-                        'completed_jobs': len(self.job_manager.job_history),
-                        'wallet_address': self.payment_module.get_wallet_address(),
-                        'balance': await self.payment_module.get_balance(),
-                        'status': 'running' if self.job_manager.is_running else 'stopped'
-                    }
-                    
-                    await websocket.send_json(status)
-                    
-            except Exception as e:
-                logger.error(f"WebSocket error: {e}")
+                    message = await queue.get()
+                    if message is None:
+                        # Fell too far behind - the page reconnects and gets a fresh snapshot
+                        await websocket.close(code=1013)
+                        return
+                    await websocket.send_text(message)
+            
+            async def wait_for_disconnect():
+                # The page never sends anything; reading is how a closed tab is noticed
+                while (await websocket.receive())['type'] != 'websocket.disconnect':
+                    pass
+            
+            tasks = [asyncio.create_task(send_updates()), asyncio.create_task(wait_for_disconnect())]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception():
+                        logger.debug(f"WebSocket closed: {task.exception()}")
             finally:
-                if websocket in self.active_websockets:
-                    self.active_websockets.remove(websocket)
+                for task in tasks:
+                    task.cancel()
+                self.status_broadcaster.unsubscribe(queue)
                 
     async def start(self):
         """Start the dashboard server"""
         self.setup_routes()
         config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="info")
         server = uvicorn.Server(config)
-        await server.serve()
+        self.status_broadcaster.start()
+        try:
+            await server.serve()
+        finally:
+            await self.status_broadcaster.stop()
 
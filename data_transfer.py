@@ -0,0 +1,272 @@
+# data_transfer.py
+"""
+Streaming job data transfer
+
+Input archives are extracted while they download: HTTP chunks are handed
+through a small bounded queue to a worker thread running tarfile in stream
+mode, so memory stays flat regardless of archive size and decompression
+overlaps the network transfer. gzip/bz2/xz are handled by tarfile itself;
+zstd is supported when the optional zstandard package is installed.
+
+Results go the other way: a worker thread writes a .tar.gz stream into the
+same kind of bounded queue and the chunks are sent as a chunked HTTP
+request body, so no archive is ever built on disk or in memory.
+"""
+
+import asyncio
+import concurrent.futures
+import tarfile
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import httpx
+from loguru import logger
+
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1MB network reads
+STREAM_QUEUE_CHUNKS = 8  # At most ~8MB of compressed data buffered in memory
+
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class _QueueReader:
+    """Blocking file-like reader fed from an asyncio.Queue (used from a worker thread)"""
+
+    def __init__(self, chunks: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        self._chunks = chunks
+        self._loop = loop
+        self._buffer = bytearray()
+        self._eof = False
+
+    def _next_chunk(self) -> bool:
+        chunk = asyncio.run_coroutine_threadsafe(self._chunks.get(), self._loop).result()
+        if chunk is None:
+            self._eof = True
+            return False
+        self._buffer += chunk
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            while not self._eof and self._next_chunk():
+                pass
+            size = len(self._buffer)
+        while len(self._buffer) < size and not self._eof:
+            if not self._next_chunk():
+                break
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+
+def _extract_tar_stream(reader: _QueueReader, dest_dir: Path, compression: str) -> int:
+    """Extract a tar stream into dest_dir, returns number of members extracted"""
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Input is zstd-compressed but the zstandard package is not installed")
+        source = zstandard.ZstdDecompressor().stream_reader(reader)
+        mode = 'r|'
+    else:
+        source = reader
+        mode = 'r|*'  # tarfile detects gzip/bz2/xz/uncompressed
+
+    count = 0
+    with tarfile.open(fileobj=source, mode=mode) as tar:
+        for member in tar:
+            # Use the safe 'data' filter where available (Python 3.12+, backported to 3.10.12/3.11.4)
+            if hasattr(tarfile, 'data_filter'):
+                tar.extract(member, dest_dir, filter='data')
+            else:
+                tar.extract(member, dest_dir)
+            count += 1
+    return count
+
+
+async def _put_chunk(chunks: asyncio.Queue, chunk: Optional[bytes], extract_task: asyncio.Future) -> bool:
+    """Queue a chunk for the extractor; returns False if the extractor already stopped"""
+    put_task = asyncio.ensure_future(chunks.put(chunk))
+    await asyncio.wait({put_task, extract_task}, return_when=asyncio.FIRST_COMPLETED)
+    if not put_task.done():
+        put_task.cancel()
+        return False
+    return True
+
+
+async def extract_response(response: httpx.Response, dest_dir: Path) -> int:
+    """
+    Extract the tar archive body of an open streaming response as it arrives
+
+    Args:
+        response: Response from client.stream() with a 200 status
+        dest_dir: Directory to extract into
+
+    Returns:
+        Number of extracted members
+    """
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+    extract_task = None
+    received = 0
+
+    try:
+        async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+            if not chunk:
+                continue
+            if extract_task is None:
+                compression = 'zstd' if chunk[:4] == ZSTD_MAGIC else 'auto'
+                reader = _QueueReader(chunks, loop)
+                extract_task = asyncio.ensure_future(
+                    asyncio.to_thread(_extract_tar_stream, reader, dest_dir, compression)
+                )
+            received += len(chunk)
+            if not await _put_chunk(chunks, chunk, extract_task):
+                break  # Extractor finished or failed - its result is raised below
+
+        if extract_task is None:
+            logger.warning(f"Empty response body from {response.url}")
+            return 0
+
+        await _put_chunk(chunks, None, extract_task)
+    except BaseException:
+        if extract_task is not None and not extract_task.done():
+            # Unblock the worker thread so it can exit
+            while not chunks.empty():
+                chunks.get_nowait()
+            chunks.put_nowait(None)
+        raise
+
+    count = await extract_task
+    logger.debug(f"Streamed {received / 1e6:.1f}MB from {response.url} ({count} entries extracted)")
+    return count
+
+
+async def stream_download_extract(client: httpx.AsyncClient,
+                                  url: str,
+                                  dest_dir: Path,
+                                  timeout: float = 300.0) -> Optional[int]:
+    """
+    Download a tar archive and extract it as it arrives
+
+    Args:
+        client: HTTP client to download with
+        url: Archive URL
+        dest_dir: Directory to extract into
+        timeout: Network timeout in seconds (per read, not for the whole transfer)
+
+    Returns:
+        Number of extracted members, or None if the server did not return 200
+    """
+    async with client.stream('GET', url, timeout=timeout) as response:
+        if response.status_code != 200:
+            logger.warning(f"Failed to download {url}: {response.status_code}")
+            return None
+        return await extract_response(response, dest_dir)
+
+
+class _QueueWriter:
+    """Blocking file-like writer that feeds an asyncio.Queue (used from a worker thread)"""
+
+    def __init__(self, chunks: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        self._chunks = chunks
+        self._loop = loop
+        self._buffer = bytearray()
+        self.cancelled = False
+
+    def _put(self, chunk: Optional[bytes]):
+        future = asyncio.run_coroutine_threadsafe(self._chunks.put(chunk), self._loop)
+        while True:
+            if self.cancelled:
+                future.cancel()
+                raise RuntimeError("Upload cancelled")
+            try:
+                return future.result(timeout=0.5)
+            except concurrent.futures.TimeoutError:
+                continue
+
+    def write(self, data) -> int:
+        self._buffer += data
+        if len(self._buffer) >= STREAM_CHUNK_SIZE:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """Flush remaining data and signal end of stream"""
+        if self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        self._put(None)
+
+
+def _write_tar_stream(writer: _QueueWriter, src_dir: Path, arcname: str):
+    """Write src_dir as a gzip tar stream into writer"""
+    try:
+        with tarfile.open(fileobj=writer, mode='w|gz') as tar:
+            tar.add(str(src_dir), arcname=arcname)
+    finally:
+        if not writer.cancelled:
+            writer.close()
+
+
+async def stream_upload_directory(client: httpx.AsyncClient,
+                                  url: str,
+                                  src_dir: Path,
+                                  arcname: str = 'output',
+                                  timeout: float = 300.0) -> httpx.Response:
+    """
+    Upload a directory as a .tar.gz without building the archive first
+
+    The archive is compressed in a worker thread while earlier chunks are
+    already on the wire, and sent with chunked transfer encoding.
+
+    Args:
+        client: HTTP client to upload with
+        url: Destination URL (HTTP PUT)
+        src_dir: Directory to archive
+        arcname: Top-level directory name inside the archive
+        timeout: Network timeout in seconds (per write, not for the whole transfer)
+
+    Returns:
+        The HTTP response
+    """
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+    writer = _QueueWriter(chunks, loop)
+    archive_task = asyncio.ensure_future(asyncio.to_thread(_write_tar_stream, writer, src_dir, arcname))
+
+    async def body() -> AsyncIterator[bytes]:
+        while True:
+            get_task = asyncio.ensure_future(chunks.get())
+            await asyncio.wait({get_task, archive_task}, return_when=asyncio.FIRST_COMPLETED)
+            if not get_task.done():
+                # Archiver stopped without sending end-of-stream - surface its error
+                get_task.cancel()
+                await archive_task
+                raise RuntimeError("Archive stream ended unexpectedly")
+            chunk = get_task.result()
+            if chunk is None:
+                break
+            yield chunk
+        await archive_task
+
+    try:
+        return await client.put(
+            url,
+            content=body(),
+            headers={'Content-Type': 'application/gzip'},
+            timeout=timeout
+        )
+    finally:
+        if not archive_task.done():
+            # Upload failed part-way - stop the archiver thread
+            writer.cancelled = True
+            await asyncio.wait({archive_task})
+            archive_task.exception()  # Expected cancellation error, mark as retrieved
@@ -8,8 +8,23 @@ import subprocess
 import shutil
 import os
 import sys
+import json
+import time
 from pathlib import Path
 from gpu_detector import GPUType, ComputeFramework
+from container_pool import WarmContainerPool
+from job_logs import JobLogStream, pump_chunks
+
+IMAGE_CACHE_STATE = Path.home() / '.node3-agent' / 'image_cache.json'
+IMAGE_STATE_SAVE_DELAY = 5.0  # Seconds to coalesce last-used updates into one write
+
+
+def normalize_image(image: str) -> str:
+    """Normalize an image reference so 'ubuntu' and 'ubuntu:latest' match"""
+    if '@' in image:
+        return image
+    last = image.rsplit('/', 1)[-1]
+    return image if ':' in last else f"{image}:latest"
 
 class DockerManager:
     """Manage Docker containers for job execution with multi-GPU support
@@ -17,13 +32,41 @@ class DockerManager:
     Supports Docker Desktop and Lima (lightweight Docker alternative)
     """
     
-    def __init__(self, gpu_info: Optional[Dict] = None):
+    def __init__(self,
+                 gpu_info: Optional[Dict] = None,
+                 pull_concurrency: int = 2,
+                 image_cache_max_bytes: int = 0,
+                 pinned_images: Optional[List[str]] = None,
+                 warm_pool_size: int = 0,
+                 warm_pool_max_uses: int = 50,
+                 warm_pool_dir: Optional[Path] = None):
+        """
+        Initialize Docker manager
+        
+        Args:
+            gpu_info: Primary GPU info (gpu_type, compute_framework)
+            pull_concurrency: Maximum parallel background image pulls
+            image_cache_max_bytes: Disk budget for images pulled by the agent (0 = never prune)
+            pinned_images: Popular images to prefetch and never prune
+            warm_pool_size: Idle containers kept per (image, GPU) - 0 disables the warm pool
+            warm_pool_max_uses: Jobs a warm container may run before it is replaced
+            warm_pool_dir: Host directory for warm container slot directories
+        """
         self.client = None
         self.gpu_runtime = None
         self.gpu_type = None
         self.compute_framework = None
         self.runtime_type = None  # 'docker' or 'lima'
         
+        # Warm image cache
+        self.image_cache_max_bytes = image_cache_max_bytes
+        self.pinned_images = {normalize_image(i) for i in (pinned_images or [])}
+        self._pull_semaphore = asyncio.Semaphore(max(1, pull_concurrency))
+        self._pull_tasks: Dict[str, asyncio.Task] = {}  # image -> in-flight pull
+        self._images_in_use: Dict[str, int] = {}  # image -> running containers
+        self._image_last_used: Dict[str, float] = self._load_image_state()  # Only images the agent pulled
+        self._state_save_task: Optional[asyncio.Task] = None
+        
         # Store GPU info if provided
         if gpu_info:
             self.gpu_type = GPUType(gpu_info.get('gpu_type', 'unknown'))
@@ -42,6 +85,17 @@ class DockerManager:
             self.gpu_runtime = None
             self.gpu_type = None
             self.compute_framework = None
+        
+        # Opt-in pool of idle containers that run jobs via exec
+        self.warm_pool = None
+        if self.client and warm_pool_size > 0:
+            self.warm_pool = WarmContainerPool(
+                self,
+                pool_size=warm_pool_size,
+                max_uses=warm_pool_max_uses,
+                pool_dir=warm_pool_dir
+            )
+            logger.info(f"Warm container pool enabled ({warm_pool_size} per image/GPU)")
     
     def _try_docker(self) -> bool:
         """Try to initialize Docker client"""
@@ -260,6 +314,14 @@ networks:
             config['environment'] = {}
             
         return config
+    
+    def container_limits(self) -> Dict:
+        """Isolation and resource limits applied to every job container"""
+        return {
+            'network_mode': 'none',  # Isolate from network for security
+            'mem_limit': '8g',
+            'cpu_count': 4
+        }
             
     async def run_job(self,
                      image: str,
@@ -267,7 +329,8 @@ networks:
                      environment: Dict[str, str],
                      gpu_id: int = 0,
                      timeout: int = 3600,
-                     volumes: Optional[Dict] = None) -> Dict:
+                     volumes: Optional[Dict] = None,
+                     log_stream: Optional[JobLogStream] = None) -> Dict:
         """
         Run a job in a Docker container with GPU access
         
@@ -278,6 +341,7 @@ networks:
             gpu_id: GPU device ID to use
             timeout: Maximum execution time in seconds
             volumes: Volume mounts
+            log_stream: Live log receiving container output as it is produced
             
         Returns:
             Dict with 'success', 'output', 'error'
@@ -288,8 +352,11 @@ networks:
                 'error': 'Container runtime not available'
             }
         
+        log = log_stream or JobLogStream(f"container-{image}")
+        image_key = normalize_image(image)
+        self._images_in_use[image_key] = self._images_in_use.get(image_key, 0) + 1
         try:
-            # Pull image if not exists
+            # Pull image if not exists (usually already warm from prefetch)
             await self.pull_image(image)
             
             # Get runtime configuration
@@ -298,6 +365,23 @@ networks:
             # Merge environment variables
             merged_env = {**runtime_config.get('environment', {}), **environment}
             
+            # Reuse a warm container when the job uses the standard /input and /output mounts
+            if self.warm_pool and volumes:
+                binds = {spec['bind']: host for host, spec in volumes.items()}
+                if set(binds) == {'/input', '/output'}:
+                    result = await self.warm_pool.run(
+                        image=image,
+                        command=command,
+                        environment=merged_env,
+                        gpu_id=gpu_id,
+                        timeout=timeout,
+                        input_dir=Path(binds['/input']),
+                        output_dir=Path(binds['/output']),
+                        log_stream=log
+                    )
+                    if result is not None:
+                        return result
+            
             # Run container
             logger.info(f"Starting container: {image}")
             if runtime_config.get('runtime'):
@@ -311,12 +395,21 @@ networks:
                 volumes=volumes or {},
                 detach=True,
                 remove=False,
-                network_mode='none',  # Isolate from network for security
-                mem_limit='8g',
-                cpu_count=4,
-                runtime=runtime_config.get('runtime')
+                runtime=runtime_config.get('runtime'),
+                **self.container_limits()
             )
             
+            # Follow stdout/stderr while the container runs
+            log_pumps = [
+                asyncio.create_task(asyncio.to_thread(
+                    pump_chunks,
+                    container.logs(stdout=name == 'stdout', stderr=name == 'stderr', stream=True, follow=True),
+                    log,
+                    name
+                ))
+                for name in ('stdout', 'stderr')
+            ]
+            
             # Wait for container with timeout
             try:
                 result = await asyncio.wait_for(
@@ -324,8 +417,9 @@ networks:
                     timeout=timeout
                 )
                 
-                # Get logs
-                logs = container.logs().decode('utf-8')
+                # Log streams end once the container has exited
+                await asyncio.wait(log_pumps, timeout=30)
+                logs = log.tail_text()
                 
                 # Check exit code
                 exit_code = result['StatusCode']
@@ -348,10 +442,12 @@ networks:
             except asyncio.TimeoutError:
                 logger.error(f"Container timeout after {timeout}s")
                 container.stop(timeout=10)
+                await asyncio.wait(log_pumps, timeout=30)
                 # Container will be removed in finally block
                 return {
                     'success': False,
-                    'error': f"Timeout after {timeout}s"
+                    'error': f"Timeout after {timeout}s",
+                    'output': log.tail_text()
                 }
                 
             finally:
@@ -371,17 +467,33 @@ networks:
                 'success': False,
                 'error': str(e)
             }
+        finally:
+            remaining = self._images_in_use.get(image_key, 1) - 1
+            if remaining > 0:
+                self._images_in_use[image_key] = remaining
+            else:
+                self._images_in_use.pop(image_key, None)
+            self._touch_image(image_key)
             
     async def pull_image(self, image: str):
         """Pull Docker image if not exists"""
         if not self.client:
             raise RuntimeError("Container runtime not available")
         
+        image_key = normalize_image(image)
+        
+        # Reuse a background prefetch that is already pulling this image
+        pending = self._pull_tasks.get(image_key)
+        if pending:
+            logger.info(f"Waiting for prefetch of {image}")
+            await asyncio.shield(pending)
+        
         try:
             # Check if image exists locally
             try:
-                self.client.images.get(image)
+                await asyncio.to_thread(self.client.images.get, image)
                 logger.info(f"Image {image} already exists locally")
+                self._touch_image(image_key)
                 return
             except docker.errors.ImageNotFound:
                 pass
@@ -390,10 +502,146 @@ networks:
             logger.info(f"Pulling image: {image}")
             await asyncio.to_thread(self.client.images.pull, image)
             logger.info(f"Image {image} pulled successfully")
+            self._touch_image(image_key, pulled=True)
             
         except Exception as e:
             logger.error(f"Failed to pull image {image}: {e}")
             raise
+        
+        await self.prune_images()
+    
+    def prefetch_images(self, images: List[str]):
+        """
+        Start background pulls for images that upcoming jobs will need
+        
+        Returns immediately; pulls run with at most pull_concurrency in parallel.
+        """
+        if not self.client:
+            return
+        
+        for image in images:
+            if not image:
+                continue
+            image_key = normalize_image(image)
+            if image_key in self._pull_tasks:
+                continue
+            self._pull_tasks[image_key] = asyncio.create_task(self._prefetch(image, image_key))
+    
+    async def _prefetch(self, image: str, image_key: str):
+        """Pull one image in the background (errors are logged, not raised)"""
+        try:
+            async with self._pull_semaphore:
+                try:
+                    await asyncio.to_thread(self.client.images.get, image)
+                    self._touch_image(image_key)
+                    return
+                except docker.errors.ImageNotFound:
+                    pass
+                
+                logger.info(f"Prefetching image: {image}")
+                start = time.time()
+                await asyncio.to_thread(self.client.images.pull, image)
+                self._touch_image(image_key, pulled=True)
+                logger.info(f"Prefetched {image} in {time.time() - start:.1f}s")
+        except Exception as e:
+            logger.warning(f"Prefetch of {image} failed: {e}")
+        finally:
+            self._pull_tasks.pop(image_key, None)
+        
+        await self.prune_images()
+    
+    def _load_image_state(self) -> Dict[str, float]:
+        """Load last-used times of images managed by the agent"""
+        try:
+            if IMAGE_CACHE_STATE.exists():
+                return json.loads(IMAGE_CACHE_STATE.read_text())
+        except Exception as e:
+            logger.debug(f"Could not load image cache state: {e}")
+        return {}
+    
+    def _touch_image(self, image_key: str, pulled: bool = False):
+        """
+        Record that an image was used (for LRU pruning)
+        
+        Args:
+            image_key: Normalized image reference
+            pulled: The agent just pulled it; otherwise only images it pulled
+                earlier are tracked, so images the operator provided are never pruned
+        """
+        if not pulled and image_key not in self._image_last_used:
+            return
+        self._image_last_used[image_key] = time.time()
+        self._schedule_state_save()
+    
+    def _schedule_state_save(self):
+        """Write the image state once, shortly after a burst of updates"""
+        if self._state_save_task is None or self._state_save_task.done():
+            self._state_save_task = asyncio.create_task(self._save_image_state_later())
+    
+    async def _save_image_state_later(self):
+        await asyncio.sleep(IMAGE_STATE_SAVE_DELAY)
+        await asyncio.to_thread(self._save_image_state, json.dumps(self._image_last_used))
+    
+    @staticmethod
+    def _save_image_state(state: str):
+        try:
+            IMAGE_CACHE_STATE.parent.mkdir(parents=True, exist_ok=True)
+            tmp = IMAGE_CACHE_STATE.with_suffix('.tmp')
+            tmp.write_text(state)
+            tmp.replace(IMAGE_CACHE_STATE)
+        except Exception as e:
+            logger.debug(f"Could not save image cache state: {e}")
+    
+    async def prune_images(self):
+        """
+        Keep images pulled by the agent within the disk budget
+        
+        Removes least recently used images first. Images used by running
+        jobs, pinned popular images and images the agent never pulled are
+        never touched.
+        """
+        if not self.client or self.image_cache_max_bytes <= 0:
+            return
+        
+        try:
+            images = await asyncio.to_thread(self.client.images.list)
+        except Exception as e:
+            logger.debug(f"Could not list images for pruning: {e}")
+            return
+        
+        # Map each managed tag to its image, counting each image's size once
+        managed = {}
+        sizes = {}
+        for img in images:
+            for tag in img.tags:
+                if tag in self._image_last_used:
+                    managed[tag] = img
+                    sizes[img.id] = img.attrs.get('Size', 0)
+        
+        total = sum(sizes.values())
+        if total <= self.image_cache_max_bytes:
+            return
+        
+        candidates = sorted(
+            (tag for tag in managed if tag not in self._images_in_use and tag not in self.pinned_images),
+            key=lambda tag: self._image_last_used.get(tag, 0)
+        )
+        removed = set()
+        for tag in candidates:
+            if total <= self.image_cache_max_bytes:
+                break
+            img = managed[tag]
+            try:
+                await asyncio.to_thread(self.client.images.remove, tag)
+                self._image_last_used.pop(tag, None)
+                self._schedule_state_save()
+                removed.add(tag)
+                # Only frees disk once the last tag of the image is gone
+                if all(t in removed for t in img.tags):
+                    total -= sizes.get(img.id, 0)
+                logger.info(f"Pruned image {tag} ({sizes.get(img.id, 0) / 1e9:.1f}GB)")
+            except Exception as e:
+                logger.debug(f"Could not prune image {tag}: {e}")
             
     def list_images(self) -> List[str]:
         """List all local Docker images"""
@@ -425,3 +673,11 @@ networks:
                     
         except Exception as e:
             logger.error(f"Failed to cleanup containers: {e}")
+    
+    async def close(self):
+        """Remove warm pool containers and write out pending image state"""
+        if self.warm_pool:
+            await self.warm_pool.close()
+        if self._state_save_task and not self._state_save_task.done():
+            self._state_save_task.cancel()
+            await asyncio.to_thread(self._save_image_state, json.dumps(self._image_last_used))
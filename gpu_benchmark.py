@@ -0,0 +1,317 @@
+# gpu_benchmark.py
+"""
+GPU benchmark suite with persisted results
+
+Kernels:
+    gemm_fp32 / gemm_fp16 / gemm_bf16  - dense matmul throughput (TFLOPS)
+    memory_bandwidth                   - device-to-device copy (GB/s)
+    h2d_transfer                       - host-to-device copy (GB/s)
+
+GPU kernels run through PyTorch (CUDA, ROCm via torch.cuda, or MPS on Apple
+Silicon). Without a usable torch device the suite falls back to numpy BLAS
+on the CPU, so every node reports comparable numbers.
+
+Results are stored per device fingerprint (UUID + driver version + backend)
+in ~/.node3-agent/benchmarks.json and reused on later starts; the suite only
+runs again when the hardware, driver or suite version changes, or when
+forced from the command line:
+
+    python gpu_benchmark.py [--gpu N] [--force] [--kernels gemm_fp32,...] [--json]
+"""
+
+import json
+import platform
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+SUITE_VERSION = 1
+DEFAULT_CACHE_PATH = Path.home() / '.node3-agent' / 'benchmarks.json'
+MIN_KERNEL_SECONDS = 0.5  # Keep iterating until a measurement is at least this long
+MAX_KERNEL_ITERATIONS = 50
+TRANSFER_BYTES = 256 * 1024 * 1024
+
+
+class _Backend:
+    """Where kernels run: a torch device, or numpy on the CPU"""
+
+    def __init__(self, name: str, torch=None, device=None, numpy=None):
+        self.name = name  # 'cuda', 'rocm', 'mps' or 'numpy'
+        self.torch = torch
+        self.device = device
+        self.numpy = numpy
+
+    def synchronize(self):
+        if self.name in ('cuda', 'rocm'):
+            self.torch.cuda.synchronize(self.device)
+        elif self.name == 'mps':
+            self.torch.mps.synchronize()
+
+    @classmethod
+    def for_gpu(cls, gpu) -> Optional['_Backend']:
+        """Best available backend for a GPUInfo (None if neither torch nor numpy is installed)"""
+        framework = getattr(gpu.compute_framework, 'value', None) if gpu is not None else None
+        try:
+            import torch
+            if framework in ('cuda', 'rocm') and torch.cuda.is_available():
+                name = 'rocm' if getattr(torch.version, 'hip', None) else 'cuda'
+                return cls(name, torch=torch, device=torch.device(f'cuda:{gpu.index}'))
+            if framework == 'metal' and torch.backends.mps.is_available():
+                return cls('mps', torch=torch, device=torch.device('mps'))
+        except ImportError:
+            pass
+        try:
+            import numpy
+            return cls('numpy', numpy=numpy)
+        except ImportError:
+            return None
+
+
+@dataclass
+class Kernel:
+    """A benchmark kernel; run returns the measured value in unit"""
+    name: str
+    unit: str
+    backends: Tuple[str, ...]
+    run: Callable[[_Backend, int], float]
+
+
+KERNELS: Dict[str, Kernel] = {}
+TORCH_BACKENDS = ('cuda', 'rocm', 'mps')
+
+
+def register_kernel(name: str, unit: str, backends: Tuple[str, ...]):
+    """Decorator adding a kernel to the suite"""
+    def decorator(func: Callable[[_Backend, int], float]):
+        KERNELS[name] = Kernel(name=name, unit=unit, backends=backends, run=func)
+        return func
+    return decorator
+
+
+def _timed(step: Callable[[], None], sync: Callable[[], None], warmup: int = 2) -> Tuple[int, float]:
+    """Run step until MIN_KERNEL_SECONDS have passed; returns (iterations, seconds)"""
+    for _ in range(warmup):
+        step()
+    sync()
+    iterations = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < MIN_KERNEL_SECONDS and iterations < MAX_KERNEL_ITERATIONS:
+        step()
+        sync()
+        iterations += 1
+        elapsed = time.perf_counter() - start
+    return iterations, elapsed
+
+
+def _torch_gemm(backend: _Backend, size: int, dtype_name: str) -> float:
+    torch = backend.torch
+    dtype = getattr(torch, dtype_name)
+    a = torch.randn(size, size, device=backend.device, dtype=dtype)
+    b = torch.randn(size, size, device=backend.device, dtype=dtype)
+    iterations, elapsed = _timed(lambda: torch.matmul(a, b), backend.synchronize)
+    return 2 * size ** 3 * iterations / elapsed / 1e12
+
+
+@register_kernel('gemm_fp32', 'TFLOPS', TORCH_BACKENDS + ('numpy',))
+def gemm_fp32(backend: _Backend, size: int) -> float:
+    if backend.name == 'numpy':
+        np = backend.numpy
+        size = min(size, 2048)  # CPU BLAS: keep the run short
+        a = np.random.rand(size, size).astype(np.float32)
+        b = np.random.rand(size, size).astype(np.float32)
+        iterations, elapsed = _timed(lambda: a @ b, lambda: None, warmup=1)
+        return 2 * size ** 3 * iterations / elapsed / 1e12
+    return _torch_gemm(backend, size, 'float32')
+
+
+@register_kernel('gemm_fp16', 'TFLOPS', TORCH_BACKENDS)
+def gemm_fp16(backend: _Backend, size: int) -> float:
+    return _torch_gemm(backend, size, 'float16')
+
+
+@register_kernel('gemm_bf16', 'TFLOPS', TORCH_BACKENDS)
+def gemm_bf16(backend: _Backend, size: int) -> float:
+    return _torch_gemm(backend, size, 'bfloat16')
+
+
+@register_kernel('memory_bandwidth', 'GB/s', TORCH_BACKENDS + ('numpy',))
+def memory_bandwidth(backend: _Backend, size: int) -> float:
+    if backend.name == 'numpy':
+        np = backend.numpy
+        src = np.ones(TRANSFER_BYTES // 4, dtype=np.float32)
+        dst = np.empty_like(src)
+        iterations, elapsed = _timed(lambda: np.copyto(dst, src), lambda: None, warmup=1)
+    else:
+        torch = backend.torch
+        src = torch.ones(TRANSFER_BYTES // 4, device=backend.device, dtype=torch.float32)
+        dst = torch.empty_like(src)
+        iterations, elapsed = _timed(lambda: dst.copy_(src), backend.synchronize)
+    # Each copy reads and writes the buffer once
+    return 2 * TRANSFER_BYTES * iterations / elapsed / 1e9
+
+
+@register_kernel('h2d_transfer', 'GB/s', TORCH_BACKENDS)
+def h2d_transfer(backend: _Backend, size: int) -> float:
+    torch = backend.torch
+    host = torch.ones(TRANSFER_BYTES // 4, dtype=torch.float32)
+    if backend.name in ('cuda', 'rocm'):
+        host = host.pin_memory()  # Pageable memory measures the staging copy instead
+    iterations, elapsed = _timed(
+        lambda: host.to(backend.device, non_blocking=True), backend.synchronize
+    )
+    return TRANSFER_BYTES * iterations / elapsed / 1e9
+
+
+class BenchmarkCache:
+    """Benchmark results on disk, keyed by device fingerprint"""
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH):
+        self.path = Path(path)
+        try:
+            self.results: Dict[str, Dict] = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            self.results = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable benchmark cache {self.path}: {e}")
+            self.results = {}
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        return self.results.get(fingerprint)
+
+    def put(self, fingerprint: str, result: Dict):
+        self.results[fingerprint] = result
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(self.results, indent=2))
+            tmp.replace(self.path)
+        except OSError as e:
+            logger.warning(f"Could not save benchmark results to {self.path}: {e}")
+
+
+class GPUBenchmarkSuite:
+    """Runs the benchmark kernels for a GPU, reusing persisted results"""
+
+    def __init__(self,
+                 cache_path: Path = DEFAULT_CACHE_PATH,
+                 kernels: Optional[List[str]] = None,
+                 size: int = 4096):
+        """
+        Initialize benchmark suite
+
+        Args:
+            cache_path: JSON file holding results per device fingerprint
+            kernels: Kernel names to run (default: all registered)
+            size: Matrix dimension for the GEMM kernels
+        """
+        self.cache = BenchmarkCache(cache_path)
+        self.kernels = kernels
+        self.size = size
+
+    @staticmethod
+    def fingerprint(gpu, backend: str) -> str:
+        """Identity of the hardware/driver/backend combination results are valid for"""
+        device = gpu.uuid or f"{gpu.vendor}:{gpu.name}:{gpu.index}"
+        driver = gpu.driver_version or f"{platform.system()} {platform.release()}"
+        return f"{device}|{driver}|{backend}|v{SUITE_VERSION}"
+
+    def run(self, gpu, force: bool = False) -> Dict:
+        """
+        Benchmark a GPU, or return its persisted results
+
+        Args:
+            gpu: GPUInfo to benchmark
+            force: Ignore persisted results
+
+        Returns:
+            Dict with per-kernel 'kernels' results, headline 'tflops' (FP32 GEMM)
+            and 'cached' telling whether the suite actually ran
+        """
+        backend = _Backend.for_gpu(gpu)
+        if backend is None:
+            logger.warning("Neither torch nor numpy is installed - skipping benchmark")
+            return {}
+
+        fingerprint = self.fingerprint(gpu, backend.name)
+        cached = None if force else self.cache.get(fingerprint)
+        wanted = [
+            name for name in (self.kernels or list(KERNELS))
+            if name in KERNELS and backend.name in KERNELS[name].backends
+            and not (cached and name in cached['kernels'])
+        ]
+        if cached and not wanted:
+            return {**cached, 'cached': True}
+
+        if backend.name == 'numpy':
+            logger.info(f"No GPU compute backend for {gpu.name} - benchmarking the CPU with numpy")
+        results = {}
+        for name in wanted:
+            kernel = KERNELS[name]
+            try:
+                value = kernel.run(backend, self.size)
+                results[name] = {'value': round(value, 3), 'unit': kernel.unit}
+                logger.info(f"GPU {gpu.index} {name}: {value:.2f} {kernel.unit}")
+            except Exception as e:
+                # e.g. bf16 on older GPUs, out of memory on small cards
+                results[name] = {'error': str(e)}
+                logger.warning(f"GPU {gpu.index} {name} benchmark failed: {e}")
+
+        kernels = {**(cached or {}).get('kernels', {}), **results}
+        result = {
+            'device': {'name': gpu.name, 'uuid': gpu.uuid, 'driver_version': gpu.driver_version},
+            'backend': backend.name,
+            'tflops': kernels.get('gemm_fp32', {}).get('value', 0),
+            'kernels': kernels,
+            'measured_at': time.time()
+        }
+        self.cache.put(fingerprint, result)
+        return {**result, 'cached': False}
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command-line entry point: benchmark the local GPUs"""
+    import argparse
+    from gpu_detector import GPUDetector
+
+    parser = argparse.ArgumentParser(description="Benchmark local GPUs")
+    parser.add_argument('--gpu', type=int, action='append', help="GPU index (repeatable, default: all)")
+    parser.add_argument('--force', action='store_true', help="Re-run even if results are cached")
+    parser.add_argument('--kernels', help=f"Comma-separated subset of: {', '.join(KERNELS)}")
+    parser.add_argument('--size', type=int, default=4096, help="GEMM matrix dimension")
+    parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE_PATH, help="Results file")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    detector = GPUDetector()
+    gpus = detector.detect_gpus()
+    if args.gpu:
+        gpus = [g for position, g in enumerate(gpus) if position in args.gpu]
+    suite = GPUBenchmarkSuite(
+        cache_path=args.cache,
+        kernels=[k.strip() for k in args.kernels.split(',')] if args.kernels else None,
+        size=args.size
+    )
+
+    report = {}
+    try:
+        for gpu in gpus:
+            report[gpu.name] = suite.run(gpu, force=args.force)
+    finally:
+        detector.shutdown()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for name, result in report.items():
+        source = "cached" if result.get('cached') else "measured"
+        print(f"{name} ({result.get('backend', 'n/a')}, {source})")
+        for kernel, value in result.get('kernels', {}).items():
+            shown = f"{value['value']:.2f} {value['unit']}" if 'value' in value else f"failed: {value['error']}"
+            print(f"  {kernel:<18} {shown}")
+
+
+if __name__ == '__main__':
+    main()
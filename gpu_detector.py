@@ -1,12 +1,22 @@
 # gpu_detector.py
 
-import pynvml
+import asyncio
+import os
 from typing import List, Dict, Optional
 from dataclasses import dataclass
 from loguru import logger
 import platform
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from types import MappingProxyType
+from metrics_history import MetricsHistory, HOST_METRICS
+import amd_smi
+from metric_probes import SubprocessProbe, IoregTemperatureParser, PowermetricsParser, JsonParser
+
+pynvml = None  # Imported by detect_nvidia_gpus, so non-NVIDIA hosts never load it
 
 class GPUType(Enum):
     NVIDIA = "nvidia"
@@ -36,18 +46,42 @@ class GPUInfo:
     cuda_cores: int = 0
     clock_speed: int = 0  # MHz
     memory_clock: int = 0  # MHz
+    driver_version: Optional[str] = None
     available: bool = True
     
 class GPUDetector:
     """Detect and monitor GPUs across vendors (NVIDIA, AMD, Intel, Apple)"""
     
-    def __init__(self):
+    def __init__(self, sample_interval: float = 1.0):
+        """
+        Initialize GPU detector
+        
+        Args:
+            sample_interval: Seconds between background NVML metric samples
+        """
         self.initialized = False
         self.gpus: List[GPUInfo] = []
         self.nvidia_available = False
         self.amd_available = False
         self._active_job_count = 0  # Track active jobs for better metrics
         
+        # NVML metrics are sampled by one background thread and published as an
+        # immutable snapshot, so readers never call NVML themselves
+        self.sample_interval = sample_interval
+        self._nvml_handles: Dict[int, object] = {}  # gpu index -> cached NVML handle
+        self._snapshot: Dict[int, MappingProxyType] = {}  # Replaced wholesale, never mutated
+        self._snapshot_lock = threading.Lock()  # Serializes writers (sampler thread, tool probes)
+        self._sampler_thread: Optional[threading.Thread] = None
+        self._sampler_stop = threading.Event()
+        self.history = MetricsHistory(raw_interval=sample_interval)  # Per-device time series
+        
+        # GPUs without a native API are read through command-line tools run as
+        # background asyncio subprocesses (see metric_probes)
+        self._probes: List[SubprocessProbe] = []
+        self._probe_tasks: List[asyncio.Task] = []
+        self._probe_metrics: Dict[str, Dict] = {}  # probe name -> latest parsed result
+        self._amd_backend: Optional[amd_smi.AmdSmiBackend] = None  # amdsmi bindings, when installed
+        
     def detect_system_gpus(self) -> List[Dict]:
         """Detect GPUs using system tools (works on macOS and Linux)"""
         gpus = []
@@ -102,14 +136,24 @@ class GPUDetector:
     
     def detect_nvidia_gpus(self) -> List[GPUInfo]:
         """Detect NVIDIA GPUs using NVML"""
+        global pynvml
         nvidia_gpus = []
+        try:
+            import pynvml
+        except ImportError:
+            logger.debug("pynvml not installed - NVIDIA GPUs not detected")
+            return nvidia_gpus
         try:
             pynvml.nvmlInit()
             self.nvidia_available = True
             device_count = pynvml.nvmlDeviceGetCount()
+            driver_version = pynvml.nvmlSystemGetDriverVersion()
+            if isinstance(driver_version, bytes):
+                driver_version = driver_version.decode('utf-8')
             
             for i in range(device_count):
                 handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+                self._nvml_handles[i] = handle
                 
                 gpu_info = GPUInfo(
                     index=i,
@@ -123,6 +167,7 @@ class GPUDetector:
                     cuda_cores=self._get_cuda_cores(handle),
                     clock_speed=pynvml.nvmlDeviceGetClockInfo(handle, pynvml.NVML_CLOCK_GRAPHICS),
                     memory_clock=pynvml.nvmlDeviceGetClockInfo(handle, pynvml.NVML_CLOCK_MEM),
+                    driver_version=driver_version,
                     available=True
                 )
                 
@@ -139,40 +184,39 @@ class GPUDetector:
         return nvidia_gpus
     
     def detect_amd_gpus(self) -> List[GPUInfo]:
-        """Detect AMD GPUs using rocm-smi"""
+        """Detect AMD GPUs using amdsmi, or rocm-smi JSON output"""
         amd_gpus = []
         try:
-            # Check if rocm-smi is available
-            result = subprocess.run(
-                ['rocm-smi'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                self.amd_available = True
-                # Parse rocm-smi output
-                # This is a simplified parser - in production, use rocm-smi JSON output
-                lines = result.stdout.split('\n')
-                gpu_index = 0
-                for line in lines:
-                    if 'card' in line.lower() and 'gpu' in line.lower():
-                        # Extract GPU name
-                        parts = line.split()
-                        name = ' '.join(parts[1:]) if len(parts) > 1 else f"AMD GPU {gpu_index}"
-                        
-                        gpu_info = GPUInfo(
-                            index=gpu_index,
-                            name=name,
-                            vendor="AMD",
-                            gpu_type=GPUType.AMD,
-                            compute_framework=ComputeFramework.ROCM,
-                            total_memory=0,  # Would need to parse from rocm-smi
-                            available=True
-                        )
-                        amd_gpus.append(gpu_info)
-                        logger.info(f"AMD GPU {gpu_index}: {name}")
-                        gpu_index += 1
+            self._amd_backend = amd_smi.AmdSmiBackend.create()
+            if self._amd_backend:
+                devices = self._amd_backend.devices()
+            else:
+                result = subprocess.run(
+                    amd_smi.ROCM_SMI_ENUMERATE,
+                    capture_output=True,
+                    text=True,
+                    timeout=10
+                )
+                if result.returncode != 0:
+                    logger.debug(f"rocm-smi failed: {result.stderr.strip()}")
+                    return amd_gpus
+                devices = amd_smi.parse_devices(amd_smi.loads(result.stdout))
+            
+            for gpu_index, device in enumerate(devices):
+                gpu_info = GPUInfo(
+                    index=gpu_index,
+                    name=device['name'],
+                    vendor="AMD",
+                    gpu_type=GPUType.AMD,
+                    compute_framework=ComputeFramework.ROCM,
+                    uuid=device['uuid'],
+                    total_memory=device['total_memory'],
+                    driver_version=device['driver_version'],
+                    available=True
+                )
+                amd_gpus.append(gpu_info)
+                logger.info(f"AMD GPU {gpu_index}: {gpu_info.name} ({gpu_info.total_memory / 1e9:.1f}GB)")
+            self.amd_available = bool(amd_gpus)
         except FileNotFoundError:
             logger.debug("rocm-smi not found - AMD GPUs not detected")
             self.amd_available = False
@@ -210,6 +254,7 @@ class GPUDetector:
                                 gpu_type=GPUType.APPLE,
                                 compute_framework=ComputeFramework.METAL,
                                 total_memory=0,  # Shared memory on Apple Silicon
+                                driver_version=f"macOS {platform.mac_ver()[0]}",
                                 available=True
                             )
                             apple_gpus.append(gpu_info)
@@ -246,19 +291,27 @@ class GPUDetector:
         """Initialize GPU detection for all vendors"""
         self.gpus = []
         
+        # The vendor probes are independent (NVML, rocm-smi, system_profiler/lspci),
+        # so run them side by side; results keep the priority order below
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="gpu-detect") as pool:
+            nvidia_future = pool.submit(self.detect_nvidia_gpus)
+            amd_future = pool.submit(self.detect_amd_gpus)
+            system_future = pool.submit(self.detect_system_gpus)
+            apple_future = pool.submit(self.detect_apple_gpus)
+        
         # Detect NVIDIA GPUs (highest priority for compute workloads)
-        nvidia_gpus = self.detect_nvidia_gpus()
+        nvidia_gpus = nvidia_future.result()
         self.gpus.extend(nvidia_gpus)
         
         # Detect AMD GPUs
-        amd_gpus = self.detect_amd_gpus()
+        amd_gpus = amd_future.result()
         self.gpus.extend(amd_gpus)
         
         # Detect system GPUs (for Intel/Apple on macOS)
-        system_gpus = self.detect_system_gpus()
+        system_gpus = system_future.result()
         
         # Detect Apple GPUs
-        apple_gpus = self.detect_apple_gpus()
+        apple_gpus = apple_future.result()
         self.gpus.extend(apple_gpus)
         
         # Detect Intel GPUs
@@ -318,194 +371,276 @@ class GPUDetector:
         gpu = self.gpus[gpu_index]
         
         if gpu.gpu_type == GPUType.NVIDIA and self.nvidia_available:
+            # Latest published sample; only query NVML directly when the sampler is not running
+            sample = self._snapshot.get(gpu_index)
+            if sample is not None:
+                return dict(sample)
+            if self.sampler_running:
+                return {}
             try:
-                handle = pynvml.nvmlDeviceGetHandleByIndex(gpu_index)
-                
-                utilization = pynvml.nvmlDeviceGetUtilizationRates(handle)
-                memory_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                temperature = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
-                power = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0
-                
-                return {
-                    'gpu_utilization': utilization.gpu,
-                    'memory_utilization': utilization.memory,
-                    'memory_used': memory_info.used,
-                    'memory_free': memory_info.free,
-                    'temperature': temperature,
-                    'power_usage': power
-                }
+                return self._sample_nvidia(gpu_index)
             except Exception as e:
                 logger.error(f"Error getting GPU utilization: {e}")
                 return {}
         else:
-            # For non-NVIDIA GPUs (Intel, AMD, Apple), try to get basic metrics
-            # Use system monitoring tools when available
+            # AMD metrics come from amdsmi or the rocm-smi probe, Intel on macOS from the
+            # ioreg/powermetrics probes - all cached, no tool runs here
+            sample = self._snapshot.get(gpu_index)
+            if sample is not None:
+                return dict(sample)
+            if platform.system() == "Darwin" and gpu.gpu_type == GPUType.INTEL:
+                return self._intel_mac_metrics(gpu)
+            # For other GPUs, return basic info with estimated values
+            return {
+                'gpu_utilization': 0,
+                'memory_utilization': 0,
+                'memory_used': 0,
+                'memory_free': gpu.total_memory,
+                'temperature': 0,
+                'power_usage': 0
+            }
+            
+    def _intel_mac_metrics(self, gpu: GPUInfo) -> Dict:
+        """Intel GPU metrics on macOS from the cached probe results"""
+        actual_temperature = self._probe_metrics.get('ioreg', {}).get('temperature')
+        actual_power = self._probe_metrics.get('powermetrics', {}).get('power_usage')
+        
+        # For Intel GPUs, real monitoring is limited without sudo
+        # Use real values if available, otherwise use realistic estimates
+        active_jobs = getattr(self, '_active_job_count', 0)
+        
+        # Temperature: Use real if available, else estimate based on activity
+        if actual_temperature is not None:
+            temperature = actual_temperature
+            temp_accurate = True
+        else:
+            # Realistic estimates for Intel integrated GPU:
+            # - Idle: ~35-40°C
+            # - Light load: ~40-50°C  
+            # - Heavy load: ~50-70°C
+            temperature = 45 if active_jobs > 0 else 35
+            temp_accurate = False
+        
+        # Power: Use real if available, else estimate
+        if actual_power is not None:
+            power = actual_power
+            power_accurate = True
+        else:
+            # Estimates: Idle ~1-2W, Active ~3-10W
+            power = 5.0 if active_jobs > 0 else 2.0
+            power_accurate = False
+        
+        # Utilization: 0% is accurate when no GPU-intensive work is happening
+        # (Most node3 jobs are CPU-only, not GPU compute)
+        utilization = 0
+        
+        # Memory: Intel GPUs share system RAM, very hard to measure accurately
+        memory_used = 0
+        
+        # Return metrics with accuracy flags
+        return {
+            'gpu_utilization': utilization,
+            'memory_utilization': int((memory_used / gpu.total_memory) * 100) if gpu.total_memory > 0 else 0,
+            'memory_used': memory_used,
+            'memory_free': gpu.total_memory - memory_used,
+            'temperature': temperature,
+            'power_usage': power,
+            'metrics_accurate': temp_accurate and power_accurate  # True if we got real data
+        }
+            
+    def _sample_nvidia(self, gpu_index: int) -> Dict:
+        """Query NVML for one device using its cached handle"""
+        handle = self._nvml_handles.get(gpu_index)
+        if handle is None:
+            handle = self._nvml_handles[gpu_index] = pynvml.nvmlDeviceGetHandleByIndex(gpu_index)
+        
+        utilization = pynvml.nvmlDeviceGetUtilizationRates(handle)
+        memory_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
+        temperature = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
+        try:
+            power = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000.0
+        except pynvml.NVMLError:
+            power = 0.0  # Not supported on some boards
+        
+        return {
+            'gpu_utilization': utilization.gpu,
+            'memory_utilization': utilization.memory,
+            'memory_used': memory_info.used,
+            'memory_free': memory_info.free,
+            'temperature': temperature,
+            'power_usage': power,
+            'sampled_at': time.time()
+        }
+        
+    @property
+    def sampler_running(self) -> bool:
+        return self._sampler_thread is not None and self._sampler_thread.is_alive()
+        
+    def start_sampler(self):
+        """Start the background metrics sampler (GPU snapshots plus metric history)"""
+        if self.sampler_running:
+            return
+        nvidia_indexes = [g.index for g in self.gpus if g.gpu_type == GPUType.NVIDIA] if self.nvidia_available else []
+        
+        self._sampler_stop.clear()
+        self._sample_once(nvidia_indexes)  # Readers have data from the first call on
+        self._sampler_thread = threading.Thread(
+            target=self._sampler_loop,
+            args=(nvidia_indexes,),
+            name="gpu-sampler",
+            daemon=True
+        )
+        self._sampler_thread.start()
+        self._start_probes()
+        logger.info(
+            f"Metrics sampler started ({self.sample_interval:.1f}s interval, {len(nvidia_indexes)} NVML device(s)"
+            + (f", probes: {', '.join(p.name for p in self._probes)})" if self._probes else ")")
+        )
+        
+    def _build_probes(self) -> List[tuple]:
+        """Tool probes for the detected GPUs, with the callback each one publishes to"""
+        probes = []
+        if platform.system() == "Darwin" and any(g.gpu_type == GPUType.INTEL for g in self.gpus):
+            # ioreg dumps the whole registry (MBs); once every 15s is plenty for a temperature
+            probes.append((
+                SubprocessProbe('ioreg', ['ioreg', '-l', '-w', '0'], IoregTemperatureParser, interval=15.0),
+                self._publish_intel_probe('ioreg')
+            ))
+            if os.geteuid() == 0:  # powermetrics refuses to run without root
+                probes.append((
+                    SubprocessProbe('powermetrics',
+                                    ['powermetrics', '--samplers', 'gpu_power', '-i', '100', '-n', '1'],
+                                    PowermetricsParser, interval=15.0, timeout=5.0),
+                    self._publish_intel_probe('powermetrics')
+                ))
+        if self.amd_available and not self._amd_backend and any(g.gpu_type == GPUType.AMD for g in self.gpus):
+            # Without amdsmi bindings AMD metrics come from the CLI (~100ms per run)
+            probes.append((
+                SubprocessProbe('rocm-smi', amd_smi.ROCM_SMI_METRICS,
+                                lambda: JsonParser(lambda data: {'devices': amd_smi.parse_metrics(data)}, amd_smi.loads),
+                                interval=max(self.sample_interval, 2.0)),
+                self._publish_amd
+            ))
+        return probes
+        
+    def _start_probes(self):
+        if self._probe_tasks:
+            return
+        probes = self._build_probes()
+        if not probes:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.debug("No event loop running - tool-based GPU metrics disabled")
+            return
+        self._probes = [probe for probe, _ in probes]
+        self._probe_tasks = [
+            loop.create_task(probe.run(callback), name=f"metric-probe-{probe.name}")
+            for probe, callback in probes
+        ]
+        
+    def _publish_intel_probe(self, name: str):
+        def publish(result: Dict):
+            self._probe_metrics = {**self._probe_metrics, name: result}
+            now = time.time()
+            for position, gpu in enumerate(self.gpus):
+                if gpu.gpu_type == GPUType.INTEL:
+                    self.history.record(f"gpu{position}", self._intel_mac_metrics(gpu), timestamp=now)
+        return publish
+        
+    def _amd_positions(self) -> List[int]:
+        """Positions in self.gpus of the AMD GPUs, in card order"""
+        return [p for p, g in enumerate(self.gpus) if g.gpu_type == GPUType.AMD]
+        
+    def _amd_sample(self, position: int, card: Dict, now: float) -> Dict:
+        gpu = self.gpus[position]
+        memory_used = card['memory_used']
+        if memory_used is None:
+            memory_used = int(gpu.total_memory * card['memory_utilization'] / 100)
+        return {
+            'gpu_utilization': card['gpu_utilization'],
+            'memory_utilization': card['memory_utilization'],
+            'memory_used': memory_used,
+            'memory_free': max(gpu.total_memory - memory_used, 0),
+            'temperature': card['temperature'],
+            'power_usage': card['power_usage'],
+            'sampled_at': now
+        }
+        
+    def _publish_amd(self, result: Dict):
+        """Publish a rocm-smi probe result"""
+        now = time.time()
+        samples = {}
+        for position, card in zip(self._amd_positions(), result.get('devices', [])):
+            samples[position] = self._amd_sample(position, card, now)
+            self.history.record(f"gpu{position}", samples[position], timestamp=now)
+        self._publish_samples(samples)
+        
+    def _publish_samples(self, samples: Dict[int, Dict]):
+        """Swap in a new snapshot containing the given per-GPU samples"""
+        if not samples:
+            return
+        with self._snapshot_lock:
+            snapshot = dict(self._snapshot)
+            for position, sample in samples.items():
+                snapshot[position] = MappingProxyType(sample)
+            self._snapshot = snapshot  # Atomic reference swap - readers need no lock
+        
+    def _sample_once(self, indexes: List[int]):
+        now = time.time()
+        samples = {}
+        for index in indexes:
             try:
-                import platform
-                system = platform.system()
-                
-                # For macOS, try to get GPU metrics
-                if system == "Darwin" and gpu.gpu_type == GPUType.INTEL:
-                    # Try multiple methods to get real GPU metrics
-                    actual_temperature = None
-                    actual_power = None
-                    actual_memory_used = None
-                    
-                    # Method 1: Try to get temperature from IORegistry
-                    try:
-                        result = subprocess.run(
-                            ['ioreg', '-l', '-w', '0'],
-                            capture_output=True,
-                            text=True,
-                            timeout=3
-                        )
-                        if result.returncode == 0:
-                            output = result.stdout
-                            # Look for GPU temperature entries
-                            import re
-                            # Try to find temperature values
-                            # Temperature can be stored as:
-                            # - Direct value (e.g., 35 = 35°C)
-                            # - Scaled by 100 (e.g., 3500 = 35°C) 
-                            # - Scaled by 10 (e.g., 350 = 35°C)
-                            temp_patterns = [
-                                r'"Temperature"\s*=\s*(\d+)',  # Direct temperature (in IORegistry)
-                                r'"GPU.*Temperature"\s*=\s*(\d+)',  # GPU-specific
-                                r'"GPU Temperature"\s*=\s*(\d+)',  # Alternative format
-                            ]
-                            for pattern in temp_patterns:
-                                matches = re.findall(pattern, output, re.IGNORECASE)
-                                if matches:
-                                    # Try the most recent/last match (most likely to be current)
-                                    temp_val = int(matches[-1])
-                                    
-                                    # Determine scale: battery temp is usually 100x (3089 = 30.89°C)
-                                    # GPU temp might be different, try to infer
-                                    if temp_val > 5000:  # Probably 100x scale (e.g., 5000 = 50°C)
-                                        actual_temperature = temp_val / 100.0
-                                    elif temp_val > 500:  # Might be 10x scale (e.g., 350 = 35°C)
-                                        actual_temperature = temp_val / 10.0
-                                    elif temp_val < 150:  # Likely direct value (e.g., 35 = 35°C)
-                                        actual_temperature = float(temp_val)
-                                    else:
-                                        # Default: assume 100x scale for values 150-5000
-                                        actual_temperature = temp_val / 100.0
-                                    
-                                    # Sanity check: temperature should be reasonable (20-100°C)
-                                    if 20 <= actual_temperature <= 100:
-                                        logger.debug(f"Found GPU temperature from ioreg: {actual_temperature}°C")
-                                        break
-                                    else:
-                                        actual_temperature = None
-                    except Exception as e:
-                        logger.debug(f"ioreg temperature check failed: {e}")
-                    
-                    # Method 2: Try powermetrics for power (may require sudo)
-                    try:
-                        result = subprocess.run(
-                            ['powermetrics', '--samplers', 'gpu_power', '-i', '100', '-n', '1'],
-                            capture_output=True,
-                            text=True,
-                            timeout=2
-                        )
-                        if result.returncode == 0:
-                            output = result.stdout
-                            import re
-                            power_match = re.search(r'GPU.*?(\d+\.?\d*)\s*W', output, re.IGNORECASE)
-                            if power_match:
-                                actual_power = float(power_match.group(1))
-                    except (subprocess.TimeoutExpired, FileNotFoundError, PermissionError):
-                        pass
-                    
-                    # Method 3: Try Activity Monitor approach (parse system_profiler or vm_stat)
-                    # GPU memory usage is harder - Intel integrated GPUs share system RAM
-                    # We can estimate based on system memory pressure
-                    try:
-                        result = subprocess.run(
-                            ['vm_stat'],
-                            capture_output=True,
-                            text=True,
-                            timeout=1
-                        )
-                        if result.returncode == 0:
-                            # Parse memory stats to estimate GPU memory (very rough)
-                            # Intel GPUs use system RAM, so this is an approximation
-                            pass  # Keep memory_used as 0 for now - very hard to measure accurately
-                    except Exception:
-                        pass
-                    
-                    # For Intel GPUs, real monitoring is limited without sudo
-                    # Use Activity Monitor approach or return realistic defaults
-                    active_jobs = getattr(self, '_active_job_count', 0)
-                    
-                    # Try to get real GPU utilization using Activity Monitor or system calls
-                    # On macOS, GPU utilization is harder to get without system APIs
-                    # For now, show 0% utilization (accurate when no GPU-intensive work)
-                    # Temperature and power can be estimated based on activity
-                    
-                    # Use real values if available, otherwise use realistic estimates
-                    active_jobs = getattr(self, '_active_job_count', 0)
-                    
-                    # Temperature: Use real if available, else estimate based on activity
-                    if actual_temperature is not None:
-                        temperature = actual_temperature
-                        temp_accurate = True
-                    else:
-                        # Realistic estimates for Intel integrated GPU:
-                        # - Idle: ~35-40°C
-                        # - Light load: ~40-50°C  
-                        # - Heavy load: ~50-70°C
-                        temperature = 45 if active_jobs > 0 else 35
-                        temp_accurate = False
-                    
-                    # Power: Use real if available, else estimate
-                    if actual_power is not None:
-                        power = actual_power
-                        power_accurate = True
-                    else:
-                        # Estimates: Idle ~1-2W, Active ~3-10W
-                        power = 5.0 if active_jobs > 0 else 2.0
-                        power_accurate = False
-                    
-                    # Utilization: 0% is accurate when no GPU-intensive work is happening
-                    # (Most node3 jobs are CPU-only, not GPU compute)
-                    utilization = 0
-                    
-                    # Memory: Intel GPUs share system RAM, very hard to measure accurately
-                    # Show 0GB used unless we have a way to measure it
-                    memory_used = actual_memory_used if actual_memory_used is not None else 0
-                    
-                    # Return metrics with accuracy flags
-                    return {
-                        'gpu_utilization': utilization,  # 0% - accurate (no GPU compute jobs running)
-                        'memory_utilization': int((memory_used / gpu.total_memory) * 100) if gpu.total_memory > 0 else 0,
-                        'memory_used': memory_used,
-                        'memory_free': gpu.total_memory - memory_used,
-                        'temperature': temperature,
-                        'power_usage': power,
-                        'metrics_accurate': temp_accurate and power_accurate  # True if we got real data
-                    }
-                else:
-                    # For other GPUs, return basic info with estimated values
-                    return {
-                        'gpu_utilization': 0,
-                        'memory_utilization': 0,
-                        'memory_used': 0,
-                        'memory_free': gpu.total_memory,
-                        'temperature': 0,
-                        'power_usage': 0
-                    }
+                samples[index] = self._sample_nvidia(index)
             except Exception as e:
-                logger.debug(f"Error getting GPU metrics: {e}")
-                return {
-                    'gpu_utilization': 0,
-                    'memory_utilization': 0,
-                    'memory_used': 0,
-                    'memory_free': gpu.total_memory,
-                    'temperature': 0,
-                    'power_usage': 0
-                }
-            
+                # Keep the last good sample; readers can tell its age from sampled_at
+                logger.debug(f"NVML sample failed for GPU {index}: {e}")
+                continue
+            self.history.record(f"gpu{index}", samples[index], timestamp=now)
+        if self._amd_backend:
+            for position in self._amd_positions():
+                try:
+                    card = self._amd_backend.sample(self.gpus[position].index)
+                except Exception as e:
+                    logger.debug(f"amdsmi sample failed for GPU {position}: {e}")
+                    continue
+                samples[position] = self._amd_sample(position, card, now)
+                self.history.record(f"gpu{position}", samples[position], timestamp=now)
+        self._publish_samples(samples)
+        
+        host = self._sample_host()
+        if host:
+            self.history.record("host", host, metrics=HOST_METRICS, timestamp=now)
+        
+    @staticmethod
+    def _sample_host() -> Dict:
+        """CPU and RAM usage of the machine"""
+        try:
+            import psutil
+        except ImportError:
+            return {}
+        memory = psutil.virtual_memory()
+        return {
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_used': memory.used,
+            'memory_percent': memory.percent
+        }
+        
+    def _sampler_loop(self, indexes: List[int]):
+        while not self._sampler_stop.wait(self.sample_interval):
+            self._sample_once(indexes)
+        
+    def stop_sampler(self):
+        """Stop the background sampler"""
+        self._sampler_stop.set()
+        for task in self._probe_tasks:
+            task.cancel()
+        self._probe_tasks = []
+        if self._sampler_thread:
+            self._sampler_thread.join(timeout=self.sample_interval + 5)
+            self._sampler_thread = None
+        
     def is_gpu_available(self, gpu_index: int = 0, threshold: int = 20) -> bool:
         """Check if GPU is available for work"""
         if gpu_index >= len(self.gpus):
@@ -521,89 +656,11 @@ class GPUDetector:
             
         return util.get('gpu_utilization', 0) < threshold
         
-    def benchmark_gpu(self, gpu_index: int = 0) -> Dict:
-        """Run GPU benchmark using appropriate framework"""
-        if gpu_index >= len(self.gpus):
-            return {}
-            
-        gpu = self.gpus[gpu_index]
-        
-        if gpu.compute_framework == ComputeFramework.CUDA:
-            return self._benchmark_cuda(gpu_index)
-        elif gpu.compute_framework == ComputeFramework.METAL:
-            return self._benchmark_metal(gpu_index)
-        elif gpu.compute_framework == ComputeFramework.ROCM:
-            return self._benchmark_rocm(gpu_index)
-        else:
-            logger.warning(f"Benchmarking not yet implemented for {gpu.compute_framework.value}")
-            return {}
-    
-    def _benchmark_cuda(self, gpu_index: int) -> Dict:
-        """Benchmark NVIDIA GPU using CUDA"""
-        import torch
-        import time
-        
-        if not torch.cuda.is_available():
-            logger.error("CUDA not available for benchmarking")
-            return {}
-            
-        try:
-            device = torch.device(f'cuda:{gpu_index}')
-            size = 10000
-            
-            # Warm up
-            a = torch.randn(size, size, device=device)
-            b = torch.randn(size, size, device=device)
-            torch.matmul(a, b)
-            torch.cuda.synchronize()
-            
-            # Benchmark
-            iterations = 10
-            start = time.time()
-            
-            for _ in range(iterations):
-                c = torch.matmul(a, b)
-                torch.cuda.synchronize()
-                
-            end = time.time()
-            elapsed = end - start
-            
-            operations = 2 * (size ** 3) * iterations
-            tflops = (operations / elapsed) / 1e12
-            
-            logger.info(f"GPU {gpu_index} benchmark: {tflops:.2f} TFLOPS")
-            
-            return {
-                'tflops': tflops,
-                'elapsed_time': elapsed,
-                'iterations': iterations,
-                'framework': 'cuda'
-            }
-            
-        except Exception as e:
-            logger.error(f"CUDA benchmark failed: {e}")
-            return {}
-    
-    def _benchmark_metal(self, gpu_index: int) -> Dict:
-        """Benchmark Apple GPU using Metal"""
-        # Placeholder - would need Metal Performance Shaders
-        logger.info("Metal benchmarking not yet implemented")
-        return {
-            'framework': 'metal',
-            'note': 'Metal benchmarking coming soon'
-        }
-    
-    def _benchmark_rocm(self, gpu_index: int) -> Dict:
-        """Benchmark AMD GPU using ROCm"""
-        # Placeholder - would need ROCm PyTorch
-        logger.info("ROCm benchmarking not yet implemented")
-        return {
-            'framework': 'rocm',
-            'note': 'ROCm benchmarking coming soon'
-        }
-            
     def shutdown(self):
         """Cleanup resources"""
+        self.stop_sampler()
+        if self._amd_backend:
+            self._amd_backend.shutdown()
         if self.nvidia_available:
             try:
                 pynvml.nvmlShutdown()
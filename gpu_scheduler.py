@@ -0,0 +1,196 @@
+# gpu_scheduler.py
+"""
+GPU Slot Scheduler - Places jobs on specific GPU devices
+
+Jobs are placed using their declared GPU memory requirement and the live
+free memory reported by GPUDetector. Small jobs are bin-packed onto the
+fullest card they still fit on (best fit), so several of them can share a
+device. Large jobs go to the emptiest card (worst fit) so they spread out
+across the node instead of stacking up on one GPU.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from gpu_detector import GPUType
+
+
+@dataclass
+class GPUSlot:
+    """Scheduling state for one GPU device"""
+    position: int  # Position in GPUDetector.gpus (used for utilization queries)
+    device_id: int  # Vendor-local device index passed to the runtime (NVIDIA 0 and AMD 0 can coexist)
+    name: str
+    gpu_type: GPUType
+    total_memory: int  # bytes (0 = unknown / shared memory)
+    reservations: Dict[str, int] = field(default_factory=dict)  # job_id -> bytes
+
+    @property
+    def key(self) -> Tuple[GPUType, int]:
+        """Unique identity of the device on this node"""
+        return (self.gpu_type, self.device_id)
+
+    @property
+    def label(self) -> str:
+        return f"{self.gpu_type.value}:{self.device_id}"
+
+    @property
+    def reserved_memory(self) -> int:
+        return sum(self.reservations.values())
+
+
+class GPUScheduler:
+    """Memory-aware placement of jobs onto GPU devices"""
+
+    def __init__(self,
+                 gpu_detector,
+                 max_jobs_per_gpu: int = 0,
+                 large_job_fraction: float = 0.5,
+                 memory_headroom: int = 256 * 1024 * 1024):
+        """
+        Initialize GPU scheduler
+
+        Args:
+            gpu_detector: Initialized GPUDetector
+            max_jobs_per_gpu: Maximum jobs sharing one device (0 = limited by memory only)
+            large_job_fraction: Jobs needing more than this fraction of a card are spread, not packed
+            memory_headroom: Bytes kept free on each device for driver/context overhead
+        """
+        self.gpu_detector = gpu_detector
+        self.max_jobs_per_gpu = max_jobs_per_gpu
+        self.large_job_fraction = large_job_fraction
+        self.memory_headroom = memory_headroom
+        # Device indices are per vendor, so slots are keyed by (vendor, index)
+        self.slots: Dict[Tuple[GPUType, int], GPUSlot] = {}
+        for position, gpu in enumerate(gpu_detector.gpus):
+            slot = GPUSlot(
+                position=position,
+                device_id=gpu.index,
+                name=gpu.name,
+                gpu_type=gpu.gpu_type,
+                total_memory=gpu.total_memory
+            )
+            self.slots[slot.key] = slot
+        self._assignments: Dict[str, GPUSlot] = {}  # job_id -> slot
+
+    def _free_memory(self, slot: GPUSlot) -> Optional[int]:
+        """Effective free memory on a device, or None if it cannot be measured
+
+        Live free memory does not yet reflect jobs that were just placed, so the
+        result is capped by total memory minus our own reservations.
+        """
+        if slot.total_memory <= 0:
+            return None
+
+        booked_free = slot.total_memory - slot.reserved_memory
+        live_free = None
+        try:
+            util = self.gpu_detector.get_gpu_utilization(slot.position)
+            if util and 'memory_free' in util:
+                live_free = int(util['memory_free'])
+        except Exception as e:
+            logger.debug(f"Could not read live memory for GPU {slot.label}: {e}")
+
+        free = booked_free if live_free is None else min(booked_free, live_free)
+        return max(0, free - self.memory_headroom)
+
+    def _has_job_capacity(self, slot: GPUSlot) -> bool:
+        return self.max_jobs_per_gpu <= 0 or len(slot.reservations) < self.max_jobs_per_gpu
+
+    def can_ever_fit(self, memory_required: int) -> bool:
+        """Check whether a job could fit on any device when the node is idle"""
+        if not self.slots:
+            return False
+        for slot in self.slots.values():
+            if slot.total_memory <= 0 or memory_required <= slot.total_memory - self.memory_headroom:
+                return True
+        return False
+
+    def allocate(self, job_id: str, memory_required: int) -> Optional[int]:
+        """
+        Reserve a GPU for a job
+
+        Args:
+            job_id: Unique job identifier
+            memory_required: GPU memory needed by the job in bytes
+
+        Returns:
+            Vendor-local device index of the chosen GPU (see assigned_slot for
+            its vendor), or None if no device has room right now
+        """
+        if job_id in self._assignments:
+            return self._assignments[job_id].device_id
+
+        memory_required = max(0, memory_required or 0)
+        candidates = []
+        for slot in self.slots.values():
+            if not self._has_job_capacity(slot):
+                continue
+            free = self._free_memory(slot)
+            if free is not None and memory_required > free:
+                continue
+            candidates.append((slot, free))
+
+        if not candidates:
+            return None
+
+        def is_large(slot: GPUSlot) -> bool:
+            return slot.total_memory > 0 and memory_required > slot.total_memory * self.large_job_fraction
+
+        if any(is_large(slot) for slot, _ in candidates):
+            # Spread: emptiest card first, fewest co-located jobs as tie-breaker
+            slot, _ = max(
+                candidates,
+                key=lambda c: (c[1] if c[1] is not None else 0, -len(c[0].reservations))
+            )
+        else:
+            # Pack: fullest card that still fits, unknown-memory devices last
+            slot, _ = min(
+                candidates,
+                key=lambda c: (c[1] is None, (c[1] or 0) - memory_required, len(c[0].reservations))
+            )
+
+        slot.reservations[job_id] = memory_required
+        self._assignments[job_id] = slot
+        logger.info(
+            f"Placed job {job_id} on GPU {slot.label} ({slot.name}) - "
+            f"{memory_required / 1e9:.1f}GB reserved, {len(slot.reservations)} job(s) on device"
+        )
+        return slot.device_id
+
+    def release(self, job_id: str):
+        """Release the GPU reservation held by a job"""
+        slot = self._assignments.pop(job_id, None)
+        if slot:
+            slot.reservations.pop(job_id, None)
+            logger.debug(f"Released GPU {slot.label} reservation for job {job_id}")
+
+    def assigned_slot(self, job_id: str) -> Optional[GPUSlot]:
+        """Device a job is placed on"""
+        return self._assignments.get(job_id)
+
+    def visible_devices_env(self, job_id: str) -> Dict[str, str]:
+        """Environment variables that restrict a job's native process to its GPU"""
+        slot = self._assignments.get(job_id)
+        if slot is None:
+            return {}
+        if slot.gpu_type == GPUType.NVIDIA:
+            return {'CUDA_VISIBLE_DEVICES': str(slot.device_id)}
+        if slot.gpu_type == GPUType.AMD:
+            return {'HIP_VISIBLE_DEVICES': str(slot.device_id), 'ROCR_VISIBLE_DEVICES': str(slot.device_id)}
+        return {}
+
+    def get_stats(self) -> List[Dict]:
+        """Per-device reservation summary"""
+        return [
+            {
+                'device_id': slot.device_id,
+                'vendor': slot.gpu_type.value,
+                'name': slot.name,
+                'total_memory': slot.total_memory,
+                'reserved_memory': slot.reserved_memory,
+                'jobs': list(slot.reservations.keys())
+            }
+            for slot in self.slots.values()
+        ]
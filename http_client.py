@@ -0,0 +1,54 @@
+# http_client.py
+"""
+Shared HTTP client for marketplace traffic
+
+A single long-lived httpx.AsyncClient keeps TCP/TLS connections to the
+marketplace alive between requests instead of paying a new handshake for
+every heartbeat, poll and job report. HTTP/2 is negotiated when the h2
+package is installed and the server supports it.
+"""
+
+import httpx
+from loguru import logger
+
+
+def _http2_available() -> bool:
+    """Check if the optional h2 package is installed"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_http_client(max_connections: int = 20,
+                       max_keepalive_connections: int = 10,
+                       keepalive_expiry: float = 30.0,
+                       http2: bool = True) -> httpx.AsyncClient:
+    """
+    Create a connection-pooled async HTTP client
+
+    Args:
+        max_connections: Maximum concurrent connections in the pool
+        max_keepalive_connections: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection is kept alive
+        http2: Negotiate HTTP/2 when the server supports it
+
+    Returns:
+        httpx.AsyncClient - caller owns it and must aclose() it on shutdown
+    """
+    use_http2 = http2 and _http2_available()
+    if http2 and not use_http2:
+        logger.debug("h2 package not installed - using HTTP/1.1 keep-alive")
+
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry
+    )
+
+    logger.debug(
+        f"HTTP client pool: {max_connections} connections, "
+        f"{max_keepalive_connections} keep-alive, http2={use_http2}"
+    )
+    return httpx.AsyncClient(limits=limits, http2=use_http2)
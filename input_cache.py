@@ -0,0 +1,286 @@
+# input_cache.py
+"""
+Content-addressed cache for job input datasets
+
+Marketplace jobs often reuse the same input_data_url (model weights, eval
+sets). Extracted inputs are kept under a key derived from the URL and the
+server's ETag (or Last-Modified when no ETag is sent), so a changed dataset
+gets a new key. Cached datasets are made read-only and shared by every job
+that needs them; each job's input directory is a symlink to the entry.
+
+A URL that is already cached is requested conditionally (If-None-Match or
+If-Modified-Since with the stored validator), so a hit costs a 304 and no
+body download. HEAD is not used: presigned URLs are often valid for GET only.
+
+The cache has a disk budget. When it is exceeded, the least recently used
+entries that no running job holds are evicted.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import stat
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+from loguru import logger
+
+from data_transfer import extract_response
+
+DEFAULT_CACHE_DIR = Path.home() / '.node3-agent' / 'input_cache'
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _set_read_only(path: Path):
+    """Make a directory tree read-only so jobs cannot modify shared data"""
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            full = os.path.join(root, name)
+            if not os.path.islink(full):
+                os.chmod(full, stat.S_IMODE(os.lstat(full).st_mode) & ~0o222)
+        os.chmod(root, 0o555)
+
+
+def _remove_tree(path: Path):
+    """Remove a (possibly read-only) directory tree"""
+    def make_writable(func, target, _exc_info):
+        os.chmod(os.path.dirname(target), 0o755)
+        os.chmod(target, 0o755)
+        func(target)
+
+    if path.exists():
+        os.chmod(path, 0o755)
+        shutil.rmtree(path, onerror=make_writable)
+
+
+class InputCache:
+    """Disk-budgeted LRU cache of extracted input datasets"""
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: int = 20 * 1024 ** 3):
+        """
+        Initialize input cache
+
+        Args:
+            cache_dir: Directory holding cached datasets
+            max_bytes: Disk budget for cached data
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.index_path = self.cache_dir / 'index.json'
+        self.entries: Dict[str, Dict] = {}  # key -> {url, validator, size, last_used}
+        self._refcounts: Dict[str, int] = {}  # key -> number of jobs using the entry
+        self._url_locks: Dict[str, asyncio.Lock] = {}
+        self._index_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.evictions = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Load the index and drop entries/partial downloads that no longer match disk"""
+        if self.index_path.exists():
+            try:
+                self.entries = json.loads(self.index_path.read_text())
+            except Exception as e:
+                logger.warning(f"Input cache index unreadable, starting empty: {e}")
+                self.entries = {}
+
+        self.entries = {k: v for k, v in self.entries.items() if (self.cache_dir / k).is_dir()}
+        for path in self.cache_dir.iterdir():
+            if path.is_dir() and path.name not in self.entries:
+                _remove_tree(path)
+        self._save_index()
+
+        if self.entries:
+            logger.info(f"Input cache: {len(self.entries)} dataset(s), {self.bytes_used / 1e9:.1f}GB")
+
+    def _save_index(self):
+        self._write_index(json.dumps(self.entries))
+
+    async def _save_index_async(self):
+        """Write the index from a worker thread (serialized here, so the latest state wins)"""
+        async with self._index_lock:
+            await asyncio.to_thread(self._write_index, json.dumps(self.entries))
+
+    def _write_index(self, data: str):
+        tmp_path = self.index_path.with_suffix('.tmp')
+        tmp_path.write_text(data)
+        os.replace(tmp_path, self.index_path)
+
+    @property
+    def bytes_used(self) -> int:
+        return sum(entry['size'] for entry in self.entries.values())
+
+    @staticmethod
+    def _cache_key(url: str, headers: httpx.Headers) -> Optional[str]:
+        """Key from URL + validator, or None if the server gives no way to detect changes"""
+        validator = headers.get('etag') or headers.get('last-modified')
+        if not validator:
+            return None
+        return hashlib.sha256(f"{url}\n{validator}".encode()).hexdigest()
+
+    def _latest_entry(self, url: str) -> Optional[str]:
+        """Most recently used cached entry for a URL"""
+        keys = [key for key, entry in self.entries.items() if entry['url'] == url and (self.cache_dir / key).is_dir()]
+        return max(keys, key=lambda key: self.entries[key]['last_used'], default=None)
+
+    @staticmethod
+    def _revalidation_headers(entry: Dict) -> Dict[str, str]:
+        """Conditional request headers for a cached entry (ETags are quoted, dates are not)"""
+        validator = entry['validator']
+        if validator.startswith(('"', 'W/"')):
+            return {'If-None-Match': validator}
+        return {'If-Modified-Since': validator}
+
+    async def fetch(self, client: httpx.AsyncClient, url: str, dest_dir: Path, timeout: float = 300.0) -> Optional[str]:
+        """
+        Make the dataset at url available at dest_dir
+
+        On a hit (304 to the conditional request, or an unchanged validator)
+        dest_dir becomes a symlink to the cached entry without the body being
+        downloaded. On a miss the archive is streamed into the cache first.
+        Responses without an ETag/Last-Modified are extracted straight into
+        dest_dir and not cached.
+
+        Args:
+            client: HTTP client to download with
+            url: Input archive URL
+            dest_dir: Job input directory
+            timeout: Network timeout in seconds
+
+        Returns:
+            Cache key held for the job (pass to release() when done), or None if not cached
+        """
+        lock = self._url_locks.setdefault(url, asyncio.Lock())
+        async with lock:
+            cached = self._latest_entry(url)
+            headers = self._revalidation_headers(self.entries[cached]) if cached else {}
+            async with client.stream('GET', url, headers=headers, timeout=timeout) as response:
+                if cached and response.status_code == 304:
+                    key = cached  # Unchanged since it was cached: no body was sent
+                elif response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                else:
+                    key = self._cache_key(url, response.headers)
+                    if key is None:
+                        self.uncacheable += 1
+                        await extract_response(response, dest_dir)
+                        return None
+
+                entry_dir = self.cache_dir / key
+                if key in self.entries and entry_dir.is_dir():
+                    self.hits += 1
+                    logger.info(f"Input cache hit for {url}")
+                else:
+                    self.misses += 1
+                    partial_dir = self.cache_dir / f"{key}.partial"
+                    await asyncio.to_thread(_remove_tree, partial_dir)
+                    try:
+                        await extract_response(response, partial_dir)
+                        await asyncio.to_thread(_set_read_only, partial_dir)
+                        size = await asyncio.to_thread(_dir_size, partial_dir)
+                    except BaseException:
+                        await asyncio.shield(asyncio.to_thread(_remove_tree, partial_dir))
+                        raise
+                    os.replace(partial_dir, entry_dir)
+                    self.entries[key] = {
+                        'url': url,
+                        'validator': response.headers.get('etag') or response.headers.get('last-modified'),
+                        'size': size,
+                        'last_used': time.time()
+                    }
+                    logger.info(f"Cached input {url} ({size / 1e6:.1f}MB)")
+
+            self._refcounts[key] = self._refcounts.get(key, 0) + 1
+            self.entries[key]['last_used'] = time.time()
+            await asyncio.to_thread(self._link, entry_dir, dest_dir)
+            await self._evict()
+            await self._save_index_async()
+            return key
+
+    @staticmethod
+    def _link(entry_dir: Path, dest_dir: Path):
+        """Point the job's input directory at the cached entry"""
+        if dest_dir.is_symlink():
+            dest_dir.unlink()
+        elif dest_dir.exists():
+            shutil.rmtree(dest_dir)
+        dest_dir.parent.mkdir(parents=True, exist_ok=True)
+        dest_dir.symlink_to(entry_dir.resolve(), target_is_directory=True)
+
+    async def release(self, key: str):
+        """Drop a job's hold on a cache entry"""
+        count = self._refcounts.get(key, 0) - 1
+        if count > 0:
+            self._refcounts[key] = count
+        else:
+            self._refcounts.pop(key, None)
+        await self._evict()
+
+    async def _evict(self):
+        """
+        Evict least recently used idle entries until within the disk budget
+
+        Victims leave the index and are renamed aside right away, so a
+        concurrent fetch downloads a fresh copy instead of reusing them;
+        deleting the (possibly multi-GB) trees happens in a worker thread.
+        """
+        used = self.bytes_used
+        if used <= self.max_bytes:
+            return
+
+        idle = sorted(
+            (k for k in self.entries if self._refcounts.get(k, 0) == 0),
+            key=lambda k: self.entries[k]['last_used']
+        )
+        doomed = []
+        for key in idle:
+            if used <= self.max_bytes:
+                break
+            entry = self.entries.pop(key)
+            trash = self.cache_dir / f"{key}.evicted-{uuid.uuid4().hex[:8]}"
+            try:
+                os.rename(self.cache_dir / key, trash)
+                doomed.append(trash)
+            except OSError as e:
+                logger.debug(f"Could not move evicted input {key} aside: {e}")
+            used -= entry['size']
+            self.evictions += 1
+            logger.info(f"Evicted cached input {entry['url']} ({entry['size'] / 1e6:.1f}MB)")
+        await self._save_index_async()
+        for trash in doomed:
+            await asyncio.to_thread(_remove_tree, trash)
+
+    def get_stats(self) -> Dict:
+        """Cache statistics for the dashboard"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': True,
+            'entries': len(self.entries),
+            'bytes_used': self.bytes_used,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'uncacheable': self.uncacheable,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'in_use': len(self._refcounts)
+        }
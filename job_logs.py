@@ -0,0 +1,223 @@
+# job_logs.py
+"""
+Streaming job logs
+
+Job stdout/stderr is consumed incrementally while the job runs instead of
+being captured in full after it exits. Every line goes to:
+
+  - a bounded in-memory ring buffer (recent lines for the dashboard and
+    for the result summary),
+  - a rotating per-job log file on disk (the full output, size-capped),
+  - any dashboard subscribers, pushed in real time.
+
+A job that prints gigabytes therefore costs a fixed amount of agent memory.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+from loguru import logger
+
+DEFAULT_LOG_DIR = Path("logs/jobs")
+MAX_LINE_LENGTH = 8192  # Longer lines are truncated
+SUBSCRIBER_QUEUE_SIZE = 1000  # Lines buffered per slow subscriber before dropping
+
+
+class JobLogStream:
+    """Live log of one job
+
+    Without a log_dir only the ring buffer and subscribers are kept.
+    """
+
+    def __init__(self,
+                 job_id: str,
+                 log_dir: Optional[Path] = None,
+                 ring_size: int = 1000,
+                 max_file_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 3):
+        self.job_id = job_id
+        self.path = Path(log_dir) / f"{job_id}.log" if log_dir else None
+        self.max_file_bytes = max_file_bytes
+        self.backup_count = backup_count
+        self.lines: Deque[Tuple[float, str, str]] = deque(maxlen=ring_size)  # (time, stream, line)
+        self.total_lines = 0
+        self.closed = False
+        self._partial: Dict[str, bytes] = {}  # stream -> incomplete trailing line
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._lock = threading.Lock()
+        self._loop = asyncio.get_running_loop()
+
+        self._file = None
+        self._file_bytes = 0
+        if self.path is not None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+                self._file_bytes = self.path.stat().st_size
+            except OSError as e:
+                logger.warning(f"Cannot write job log {self.path}, keeping logs in memory only: {e}")
+
+    def feed(self, data: bytes, stream: str = 'stdout'):
+        """Add raw output; complete lines are emitted, the remainder is kept for the next chunk
+
+        Safe to call from worker threads.
+        """
+        if not data:
+            return
+        with self._lock:
+            buffer = self._partial.get(stream, b'') + data
+            *complete, rest = buffer.split(b'\n')
+            if len(rest) > MAX_LINE_LENGTH:
+                complete.append(rest)
+                rest = b''
+            self._partial[stream] = rest
+        for raw in complete:
+            self.append(raw.decode('utf-8', errors='replace').rstrip('\r'), stream)
+
+    def append(self, line: str, stream: str = 'stdout'):
+        """Record one line (safe to call from worker threads)"""
+        if len(line) > MAX_LINE_LENGTH:
+            line = line[:MAX_LINE_LENGTH] + ' [truncated]'
+        entry = (time.time(), stream, line)
+        with self._lock:
+            self.lines.append(entry)
+            self.total_lines += 1
+            self._write(entry)
+        if self._subscribers:
+            self._loop.call_soon_threadsafe(self._publish, entry)
+
+    def _write(self, entry: Tuple[float, str, str]):
+        if self._file is None:
+            return
+        text = f"[{entry[1]}] {entry[2]}\n"
+        if self._file_bytes + len(text) > self.max_file_bytes:
+            self._rotate()
+        self._file.write(text)
+        self._file_bytes += len(text)
+
+    def _rotate(self):
+        """Roll <job>.log -> <job>.log.1 -> ... keeping backup_count files"""
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                src.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backup_count > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file_bytes = 0
+
+    def _publish(self, entry):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                # Slow subscriber - drop it rather than buffer without bound,
+                # making room for the end-of-log marker
+                self._subscribers.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue receiving (time, stream, line) entries; None marks the end of the log"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        if self.closed:
+            queue.put_nowait(None)
+        else:
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def tail(self, limit: Optional[int] = None, stream: Optional[str] = None) -> List[Dict]:
+        """Most recent lines from the ring buffer"""
+        with self._lock:
+            entries = [e for e in self.lines if stream is None or e[1] == stream]
+        if limit is not None:
+            entries = entries[-limit:]
+        return [{'time': t, 'stream': s, 'line': line} for t, s, line in entries]
+
+    def tail_text(self, stream: Optional[str] = None) -> str:
+        """Recent output as text (used for job results)"""
+        return '\n'.join(e['line'] for e in self.tail(stream=stream))
+
+    def close(self):
+        """Flush partial lines, close the file and end subscriber streams"""
+        if self.closed:
+            return
+        for stream, rest in list(self._partial.items()):
+            if rest:
+                self.append(rest.decode('utf-8', errors='replace'), stream)
+        self._partial.clear()
+        self.closed = True
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+        # Runs after any lines still queued for publishing
+        self._loop.call_soon_threadsafe(self._end_subscribers)
+
+    def _end_subscribers(self):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                queue.get_nowait()
+                queue.put_nowait(None)
+        self._subscribers.clear()
+
+
+def pump_chunks(chunks: Iterable[bytes], log: JobLogStream, stream: str):
+    """Feed a blocking iterator of output chunks into a log (run in a worker thread)"""
+    try:
+        for chunk in chunks:
+            log.feed(chunk, stream)
+    except Exception as e:
+        logger.debug(f"Log stream for job {log.job_id} ended: {e}")
+
+
+class JobLogHub:
+    """Registry of job log streams (running jobs plus recently finished ones)"""
+
+    def __init__(self,
+                 log_dir: Optional[Path] = None,
+                 ring_size: int = 1000,
+                 max_file_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 3,
+                 keep_finished: int = 50):
+        self.log_dir = Path(log_dir) if log_dir else DEFAULT_LOG_DIR
+        self.ring_size = ring_size
+        self.max_file_bytes = max_file_bytes
+        self.backup_count = backup_count
+        self.keep_finished = keep_finished
+        self._streams: "OrderedDict[str, JobLogStream]" = OrderedDict()
+
+    def open(self, job_id: str) -> JobLogStream:
+        """Create (or return) the log stream for a job"""
+        stream = self._streams.get(job_id)
+        if stream is None or stream.closed:
+            stream = JobLogStream(
+                job_id,
+                self.log_dir,
+                ring_size=self.ring_size,
+                max_file_bytes=self.max_file_bytes,
+                backup_count=self.backup_count
+            )
+            self._streams[job_id] = stream
+            self._trim()
+        return stream
+
+    def get(self, job_id: str) -> Optional[JobLogStream]:
+        return self._streams.get(job_id)
+
+    def _trim(self):
+        """Forget the oldest finished streams (their files stay on disk)"""
+        finished = [job_id for job_id, s in self._streams.items() if s.closed]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._streams[job_id]
+            logger.debug(f"Dropped in-memory log buffer for job {job_id}")
@@ -1,6 +1,7 @@
 # job_manager.py
 
 import asyncio
+import time
 import httpx
 from typing import Optional, Dict, List
 from dataclasses import dataclass, field
@@ -8,6 +9,10 @@ from datetime import datetime
 from enum import Enum
 from loguru import logger
 from pathlib import Path
+from http_client import create_http_client
+from data_transfer import stream_download_extract, stream_upload_directory
+from job_workspace import JobWorkspace, DEFAULT_WORK_DIR, is_valid_job_id
+from job_logs import JobLogHub
 
 class JobStatus(Enum):
     PENDING = "pending"
@@ -36,6 +41,12 @@ class Job:
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     error_message: Optional[str] = None
+    gpu_id: Optional[int] = None  # Device assigned by the GPU scheduler
+    
+    @property
+    def requires_container(self) -> bool:
+        """Job explicitly asks for container execution"""
+        return self.environment.get('REQUIRE_CONTAINER', 'false').lower() == 'true'
 
 class JobManager:
     """Manage job lifecycle from marketplace to execution"""
@@ -47,7 +58,16 @@ class JobManager:
                  docker_manager,
                  use_native_execution: bool = True,
                  payment_module = None,
-                 telemetry = None):
+                 telemetry = None,
+                 max_concurrent_jobs: int = 1,
+                 gpu_scheduler = None,
+                 http_client: Optional[httpx.AsyncClient] = None,
+                 work_dir: Optional[Path] = None,
+                 input_cache = None,
+                 log_hub: Optional[JobLogHub] = None,
+                 worker_pool = None,
+                 cgroup_manager = None,
+                 agent_started_at: Optional[float] = None):
         self.marketplace_url = marketplace_url
         self.api_key = api_key
         self.gpu_info = gpu_info
@@ -55,17 +75,33 @@ class JobManager:
         self.use_native_execution = use_native_execution
         self.payment_module = payment_module  # For wallet address
         self.telemetry = telemetry  # For telemetry reporting
+        self.gpu_scheduler = gpu_scheduler  # Optional per-GPU placement
+        # Shared connection pool for all marketplace traffic (also used by the dashboard)
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or create_http_client()
+        self.work_dir = Path(work_dir) if work_dir else DEFAULT_WORK_DIR  # Per-job workspaces live here
+        self.input_cache = input_cache  # Optional shared cache of input datasets
+        self._input_leases: Dict[str, str] = {}  # job_id -> input cache key held by the job
+        self.log_hub = log_hub or JobLogHub()  # Live stdout/stderr of running and recent jobs
         self.active_jobs: List[Job] = []
         self.job_history: List[Job] = []
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self._job_tasks: Dict[str, asyncio.Task] = {}  # job_id -> running execution task
         self.is_running = False
         self.total_jobs_completed = 0
         self.total_earnings = 0.0
+        self.agent_started_at = agent_started_at  # time.monotonic() at agent start, for time-to-first-job
+        self.first_job_seconds: Optional[float] = None
         
         # Initialize native executor as fallback
         if use_native_execution:
             try:
                 from native_executor import NativeExecutor
-                self.native_executor = NativeExecutor()
+                self.native_executor = NativeExecutor(
+                    work_dir=self.work_dir,
+                    worker_pool=worker_pool,
+                    cgroup_manager=cgroup_manager
+                )
                 logger.info("Native executor initialized (fallback for jobs without containers)")
             except ImportError:
                 logger.warning("Native executor not available - install psutil for native execution")
@@ -80,6 +116,14 @@ class JobManager:
             else:
                 logger.warning("Job manager initialized without Docker - job execution disabled")
         
+    def set_docker_manager(self, docker_manager):
+        """Attach the Docker manager once its (slow) startup probing has finished"""
+        self.docker_manager = docker_manager
+        if docker_manager is not None:
+            logger.info("Docker available - can use containers for enhanced isolation (optional)")
+        elif self.native_executor:
+            logger.info("Docker not available - using native execution (no installation needed!)")
+        
     async def start(self):
         """Start the job manager loop"""
         self.is_running = True
@@ -96,10 +140,11 @@ class JobManager:
                 else:
                     heartbeat_counter += 1
                 
-                # Poll for new jobs
-                await self.poll_marketplace()
+                # Poll for new jobs (only while we have free capacity)
+                if self.available_slots() > 0:
+                    await self.poll_marketplace()
                 
-                # Process queued jobs
+                # Launch queued jobs - runs them in the background so polling continues
                 await self.process_jobs()
                 
                 # Wait before next poll
@@ -113,18 +158,17 @@ class JobManager:
         """Send heartbeat to marketplace and telemetry server"""
         # Send to marketplace
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.marketplace_url}/api/agents/heartbeat",
-                    headers={'X-API-Key': self.api_key} if self.api_key else {},
-                    timeout=5.0
-                )
+            response = await self.http_client.post(
+                f"{self.marketplace_url}/api/agents/heartbeat",
+                headers={'X-API-Key': self.api_key} if self.api_key else {},
+                timeout=5.0
+            )
+            
+            if response.status_code == 200:
+                logger.debug("Heartbeat sent successfully")
+            else:
+                logger.warning(f"Heartbeat failed: {response.status_code}")
                 
-                if response.status_code == 200:
-                    logger.debug("Heartbeat sent successfully")
-                else:
-                    logger.warning(f"Heartbeat failed: {response.status_code}")
-                    
         except Exception as e:
             logger.debug(f"Error sending heartbeat: {e}")
         
@@ -147,56 +191,96 @@ class JobManager:
             List[Job]: List of jobs that were accepted
         """
         accepted_jobs = []
+        free_slots = self.available_slots()
+        if free_slots <= 0:
+            logger.debug("At job capacity - not polling marketplace")
+            return accepted_jobs
+        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.marketplace_url}/api/jobs/available",
-                    json={
-                        'gpu_model': self.gpu_info['name'],
-                        'gpu_vendor': self.gpu_info.get('vendor', 'unknown'),
-                        'gpu_type': self.gpu_info.get('gpu_type', 'unknown'),
-                        'compute_framework': self.gpu_info.get('compute_framework', 'none'),
-                        'gpu_memory': self.gpu_info['total_memory'],
-                        'compute_capability': self.gpu_info.get('compute_capability'),
-                        'max_concurrent_jobs': 1  # MVP: one job at a time
-                    },
-                    headers={'X-API-Key': self.api_key} if self.api_key else {},
-                    timeout=10.0
-                )
+            response = await self.http_client.post(
+                f"{self.marketplace_url}/api/jobs/available",
+                json={
+                    'gpu_model': self.gpu_info['name'],
+                    'gpu_vendor': self.gpu_info.get('vendor', 'unknown'),
+                    'gpu_type': self.gpu_info.get('gpu_type', 'unknown'),
+                    'compute_framework': self.gpu_info.get('compute_framework', 'none'),
+                    'gpu_memory': self.gpu_info['total_memory'],
+                    'compute_capability': self.gpu_info.get('compute_capability'),
+                    'max_concurrent_jobs': self.max_concurrent_jobs,
+                    'available_slots': free_slots
+                },
+                headers={'X-API-Key': self.api_key} if self.api_key else {},
+                timeout=10.0
+            )
+            
+            if response.status_code == 200:
+                jobs_data = response.json()
+                
+                # Warm the image cache for container jobs before they are needed
+                self._prefetch_job_images(jobs_data.get('jobs', []))
                 
-                if response.status_code == 200:
-                    jobs_data = response.json()
+                for job_data in jobs_data.get('jobs', []):
+                    # Never admit more jobs than we have free slots for
+                    if self.available_slots() <= 0:
+                        logger.debug("Job capacity reached - leaving remaining jobs for other agents")
+                        break
+                    
+                    # The id names directories and cgroups: never let it escape them
+                    if not is_valid_job_id(job_data.get('job_id')):
+                        logger.warning(f"Rejecting job with invalid id {job_data.get('job_id')!r}")
+                        continue
+                    
+                    job = Job(
+                        job_id=job_data['job_id'],
+                        job_type=job_data['job_type'],
+                        docker_image=job_data['docker_image'],
+                        gpu_memory_required=job_data['gpu_memory_required'],
+                        estimated_duration=job_data['estimated_duration'],
+                        reward=job_data['reward'],
+                        input_data_url=job_data['input_data_url'],
+                        output_upload_url=job_data['output_upload_url'],
+                        command=job_data['command'],
+                        environment=job_data.get('environment', {}),
+                        timeout=job_data.get('timeout', 3600),
+                        created_at=datetime.now()
+                    )
+                    
+                    # Skip jobs that no GPU on this node could ever hold
+                    if self.gpu_scheduler and not self.gpu_scheduler.can_ever_fit(job.gpu_memory_required):
+                        logger.info(f"Skipping job {job.job_id}: needs {job.gpu_memory_required / 1e9:.1f}GB GPU memory")
+                        continue
                     
-                    for job_data in jobs_data.get('jobs', []):
-                        job = Job(
-                            job_id=job_data['job_id'],
-                            job_type=job_data['job_type'],
-                            docker_image=job_data['docker_image'],
-                            gpu_memory_required=job_data['gpu_memory_required'],
-                            estimated_duration=job_data['estimated_duration'],
-                            reward=job_data['reward'],
-                            input_data_url=job_data['input_data_url'],
-                            output_upload_url=job_data['output_upload_url'],
-                            command=job_data['command'],
-                            environment=job_data.get('environment', {}),
-                            timeout=job_data.get('timeout', 3600),
-                            created_at=datetime.now()
-                        )
-                        
-                        # Accept the job
-                        await self.accept_job(job)
+                    # Accept the job
+                    if await self.accept_job(job):
                         accepted_jobs.append(job)
-                        
-                else:
-                    logger.warning(f"Failed to poll marketplace: {response.status_code}")
                     
+            else:
+                logger.warning(f"Failed to poll marketplace: {response.status_code}")
+                
         except Exception as e:
             logger.error(f"Error polling marketplace: {e}")
         
         return accepted_jobs
     
-    async def accept_job(self, job: Job):
-        """Accept a job from the marketplace - includes wallet address for payment"""
+    def _prefetch_job_images(self, jobs_data: List[Dict]):
+        """Start background pulls for images of offered container jobs"""
+        if not self.docker_manager or not self.docker_manager.is_available():
+            return
+        
+        images = [
+            job_data.get('docker_image')
+            for job_data in jobs_data
+            if str(job_data.get('environment', {}).get('REQUIRE_CONTAINER', 'false')).lower() == 'true'
+        ]
+        if images:
+            self.docker_manager.prefetch_images(images)
+    
+    async def accept_job(self, job: Job) -> bool:
+        """Accept a job from the marketplace - includes wallet address for payment
+        
+        Returns:
+            bool: True if the marketplace confirmed the job
+        """
         try:
             # Get wallet address for payment
             wallet_address = None
@@ -205,40 +289,110 @@ class JobManager:
             
             if not wallet_address:
                 logger.error("Cannot accept job: No wallet address available")
-                return
+                return False
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.marketplace_url}/api/jobs/{job.job_id}/accept",
-                    headers={'X-API-Key': self.api_key} if self.api_key else {},
-                    json={"wallet_address": wallet_address},  # Send wallet for payment
-                    timeout=10.0
-                )
+            response = await self.http_client.post(
+                f"{self.marketplace_url}/api/jobs/{job.job_id}/accept",
+                headers={'X-API-Key': self.api_key} if self.api_key else {},
+                json={"wallet_address": wallet_address},  # Send wallet for payment
+                timeout=10.0
+            )
+            
+            if response.status_code == 200:
+                self.active_jobs.append(job)
+                logger.info(f"Accepted job {job.job_id}: {job.job_type} - {job.reward} SOL")
+                if self.first_job_seconds is None and self.agent_started_at is not None:
+                    self.first_job_seconds = time.monotonic() - self.agent_started_at
+                    logger.info(f"First job accepted {self.first_job_seconds:.1f}s after agent start")
+                    if self.telemetry:
+                        asyncio.create_task(asyncio.to_thread(
+                            self.telemetry.log_event, 'first_job', {'seconds_since_start': round(self.first_job_seconds, 3)}
+                        ))
+                logger.info(f"Payment will be sent to: {wallet_address}")
+                return True
+            else:
+                logger.warning(f"Failed to accept job {job.job_id}: {response.status_code}")
+                if response.status_code == 400:
+                    logger.error(f"Error: {response.text}")
                 
-                if response.status_code == 200:
-                    self.active_jobs.append(job)
-                    logger.info(f"Accepted job {job.job_id}: {job.job_type} - {job.reward} SOL")
-                    logger.info(f"Payment will be sent to: {wallet_address}")
-                else:
-                    logger.warning(f"Failed to accept job {job.job_id}: {response.status_code}")
-                    if response.status_code == 400:
-                        logger.error(f"Error: {response.text}")
-                    
         except Exception as e:
             logger.error(f"Error accepting job: {e}")
+        
+        return False
+    
+    def available_slots(self) -> int:
+        """Number of additional jobs this node can admit right now"""
+        return max(0, self.max_concurrent_jobs - len(self.active_jobs))
             
     async def process_jobs(self):
-        """Process active jobs"""
+        """Launch pending jobs as concurrent tasks
+        
+        Each job runs in its own asyncio task so that independent jobs execute
+        in parallel and the poll loop is never blocked by a long-running job.
+        Admission is bounded by max_concurrent_jobs in poll_marketplace.
+        """
         for job in self.active_jobs[:]:  # Copy list to allow modification during iteration
-            try:
-                if job.status == JobStatus.PENDING:
-                    await self.execute_job(job)
-                    
-            except Exception as e:
-                logger.error(f"Error processing job {job.job_id}: {e}")
-                job.status = JobStatus.FAILED
-                job.error_message = str(e)
-                await self.report_job_failure(job)
+            if job.status != JobStatus.PENDING or job.job_id in self._job_tasks:
+                continue
+            
+            # Place the job on a specific GPU; if none has room yet, retry next cycle
+            if self.gpu_scheduler:
+                job.gpu_id = self.gpu_scheduler.allocate(job.job_id, job.gpu_memory_required)
+                if job.gpu_id is None:
+                    logger.debug(f"No GPU has room for job {job.job_id} yet - waiting")
+                    continue
+            
+            task = asyncio.create_task(self._run_job(job), name=f"job-{job.job_id}")
+            self._job_tasks[job.job_id] = task
+            task.add_done_callback(lambda _t, job_id=job.job_id: self._job_tasks.pop(job_id, None))
+            logger.debug(f"Launched job {job.job_id} ({len(self._job_tasks)}/{self.max_concurrent_jobs} running)")
+    
+    async def _run_job(self, job: Job):
+        """Task wrapper around execute_job that guarantees the job leaves active_jobs"""
+        try:
+            await self.execute_job(job)
+            
+        except Exception as e:
+            logger.error(f"Error processing job {job.job_id}: {e}")
+            job.status = JobStatus.FAILED
+            job.error_message = str(e)
+            job.completed_at = datetime.now()
+            if job in self.active_jobs:
+                self.active_jobs.remove(job)
+                self.job_history.append(job)
+            await self.report_job_failure(job)
+        finally:
+            if self.gpu_scheduler:
+                self.gpu_scheduler.release(job.job_id)
+            # Inputs are no longer needed; outputs stay available locally
+            lease = self._input_leases.pop(job.job_id, None)
+            if lease and self.input_cache:
+                await self.input_cache.release(lease)
+            self.get_workspace(job).cleanup_input()
+            log_stream = self.log_hub.get(job.job_id)
+            if log_stream:
+                log_stream.close()
+    
+    def get_workspace(self, job: Job) -> JobWorkspace:
+        """Isolated input/output directories for a job"""
+        return JobWorkspace.for_job(job.job_id, self.work_dir)
+    
+    async def wait_for_jobs(self, timeout: Optional[float] = None):
+        """
+        Wait for running jobs to finish, cancelling any still running after timeout
+
+        Args:
+            timeout: Seconds to wait (None = until all have finished)
+        """
+        tasks = list(self._job_tasks.values())
+        if not tasks:
+            return
+        _done, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            logger.warning(f"Cancelling {len(pending)} running jobs")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
                 
     async def execute_job(self, job: Job):
         """Execute a job - uses native execution by default, Docker/Lima if available and preferred"""
@@ -246,7 +400,7 @@ class JobManager:
         # Docker/Lima is optional enhancement for better isolation
         
         # Check if job requires container (specified in job metadata)
-        job_requires_container = job.environment.get('REQUIRE_CONTAINER', 'false').lower() == 'true'
+        job_requires_container = job.requires_container
         
         # Determine execution method (native first, containers optional)
         use_container = False
@@ -267,6 +421,9 @@ class JobManager:
             job.status = JobStatus.FAILED
             job.error_message = "Job execution not available"
             job.completed_at = datetime.now()
+            if job in self.active_jobs:
+                self.active_jobs.remove(job)
+                self.job_history.append(job)
             await self.report_job_failure(job)
             return
             
@@ -276,6 +433,10 @@ class JobManager:
             
             logger.info(f"Executing job {job.job_id} using {executor_type} execution")
             
+            # Each job gets its own workspace so concurrent jobs never collide
+            workspace = self.get_workspace(job).create()
+            log_stream = self.log_hub.open(job.job_id)
+            
             # Download input data
             await self.download_input_data(job)
             
@@ -286,25 +447,29 @@ class JobManager:
                     image=job.docker_image,
                     command=job.command,
                     environment=job.environment,
-                    gpu_id=0,  # MVP: use first GPU
+                    gpu_id=job.gpu_id if job.gpu_id is not None else 0,
                     timeout=job.timeout,
                     volumes={
-                        '/tmp/node3_input': {'bind': '/input', 'mode': 'ro'},
-                        '/tmp/node3_output': {'bind': '/output', 'mode': 'rw'}
-                    }
+                        str(workspace.input_dir): {'bind': '/input', 'mode': 'ro'},
+                        str(workspace.output_dir): {'bind': '/output', 'mode': 'rw'}
+                    },
+                    log_stream=log_stream
                 )
             else:
                 # Run natively
-                input_dir = Path('/tmp/node3_input')
-                output_dir = Path('/tmp/node3_output')
+                # Pin the native process to its assigned GPU
+                environment = dict(job.environment)
+                if self.gpu_scheduler and job.gpu_id is not None:
+                    environment.update(self.gpu_scheduler.visible_devices_env(job.job_id))
                 
                 result = await self.native_executor.run_job(
                     job_id=job.job_id,
                     command=job.command,
-                    environment=job.environment,
+                    environment=environment,
                     timeout=job.timeout,
-                    input_dir=input_dir,
-                    output_dir=output_dir
+                    input_dir=workspace.input_dir,
+                    output_dir=workspace.output_dir,
+                    log_stream=log_stream
                 )
             
             if result['success']:
@@ -375,146 +540,133 @@ class JobManager:
                 logger.error(f"Failed to report job failure: {report_error}")
             
     async def download_input_data(self, job: Job):
-        """Download input data for job (optional if URL is empty)"""
+        """Download input data into the job's workspace (optional if URL is empty)"""
+        input_dir = self.get_workspace(job).input_dir
+        # Ensure input directory exists even if there is nothing to download
+        input_dir.mkdir(parents=True, exist_ok=True)
+        
         # Skip if no input URL provided (test jobs may not need input)
         if not job.input_data_url or not job.input_data_url.strip():
             logger.info(f"No input data URL for job {job.job_id} - skipping download")
-            # Ensure input directory exists anyway
-            import os
-            os.makedirs('/tmp/node3_input', exist_ok=True)
             return
         
         # Validate URL has protocol
         if not job.input_data_url.startswith(('http://', 'https://')):
             logger.warning(f"Invalid input_data_url for job {job.job_id}: {job.input_data_url}")
             logger.info("Skipping input download - job will run without input data")
-            import os
-            os.makedirs('/tmp/node3_input', exist_ok=True)
             return
         
         logger.info(f"Downloading input data for job {job.job_id}")
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(job.input_data_url, timeout=300.0)
-                
-                if response.status_code == 200:
-                    # Save to /tmp/node3_input/
-                    import os
-                    os.makedirs('/tmp/node3_input', exist_ok=True)
-                    
-                    with open(f'/tmp/node3_input/{job.job_id}_input.tar.gz', 'wb') as f:
-                        f.write(response.content)
-                        
-                    # Extract if compressed
-                    import tarfile
-                    with tarfile.open(f'/tmp/node3_input/{job.job_id}_input.tar.gz', 'r:gz') as tar:
-                        tar.extractall(f'/tmp/node3_input/')
-                        
-                    logger.info(f"Input data downloaded for job {job.job_id}")
-                else:
-                    logger.warning(f"Failed to download input data: {response.status_code} - continuing without input")
-                    import os
-                    os.makedirs('/tmp/node3_input', exist_ok=True)
+            if self.input_cache:
+                # Shared read-only dataset from the cache (downloaded on a miss)
+                lease = await self.input_cache.fetch(self.http_client, job.input_data_url, input_dir, timeout=300.0)
+                if lease:
+                    self._input_leases[job.job_id] = lease
+                logger.info(f"Input data ready for job {job.job_id}")
+                return
+            
+            # Stream straight into the tar extractor - never buffers the whole archive
+            extracted = await stream_download_extract(
+                self.http_client,
+                job.input_data_url,
+                input_dir,
+                timeout=300.0
+            )
+            
+            if extracted is not None:
+                logger.info(f"Input data downloaded for job {job.job_id} ({extracted} files)")
+            else:
+                logger.warning("Failed to download input data - continuing without input")
         except Exception as e:
             logger.warning(f"Error downloading input data: {e} - continuing without input")
-            import os
-            os.makedirs('/tmp/node3_input', exist_ok=True)
                 
     async def upload_results(self, job: Job):
-        """Upload job results (optional if URL is empty)"""
+        """Upload job results from the job's workspace (optional if URL is empty)"""
+        output_dir = self.get_workspace(job).output_dir
+        
         # Skip if no upload URL provided (test jobs may not need upload)
         if not job.output_upload_url or not job.output_upload_url.strip():
             logger.info(f"No output upload URL for job {job.job_id} - skipping upload")
-            logger.info(f"Results are available locally at /tmp/node3_output/")
+            logger.info(f"Results are available locally at {output_dir}/")
             return
         
         # Validate URL has protocol
         if not job.output_upload_url.startswith(('http://', 'https://')):
             logger.warning(f"Invalid output_upload_url for job {job.job_id}: {job.output_upload_url}")
-            logger.info("Skipping result upload - results available locally at /tmp/node3_output/")
+            logger.info(f"Skipping result upload - results available locally at {output_dir}/")
             return
         
         logger.info(f"Uploading results for job {job.job_id}")
         
         try:
-            # Compress output directory
-            import tarfile
-            import os
-            
-            output_path = f'/tmp/node3_output/{job.job_id}_output.tar.gz'
-            os.makedirs('/tmp/node3_output', exist_ok=True)
+            output_dir.mkdir(parents=True, exist_ok=True)
             
             # Check if output directory has any files
-            output_files = list(Path('/tmp/node3_output').glob('*'))
-            if not output_files:
+            if not any(output_dir.iterdir()):
                 logger.info("No output files to upload")
                 return
             
-            with tarfile.open(output_path, 'w:gz') as tar:
-                tar.add('/tmp/node3_output/', arcname='output')
+            # Compress and upload in one pass - the archive is never materialized
+            response = await stream_upload_directory(
+                self.http_client,
+                job.output_upload_url,
+                output_dir,
+                arcname='output',
+                timeout=300.0
+            )
                 
-            # Upload to provided URL
-            async with httpx.AsyncClient() as client:
-                with open(output_path, 'rb') as f:
-                    response = await client.put(
-                        job.output_upload_url,
-                        content=f.read(),
-                        timeout=300.0
-                    )
-                    
-                if response.status_code in [200, 201]:
-                    logger.info(f"Results uploaded for job {job.job_id}")
-                else:
-                    logger.warning(f"Failed to upload results: {response.status_code} - results saved locally")
+            if response.status_code in [200, 201]:
+                logger.info(f"Results uploaded for job {job.job_id}")
+            else:
+                logger.warning(f"Failed to upload results: {response.status_code} - results saved locally")
         except Exception as e:
-            logger.warning(f"Error uploading results: {e} - results saved locally at /tmp/node3_output/")
+            logger.warning(f"Error uploading results: {e} - results saved locally at {output_dir}/")
                 
     async def report_job_success(self, job: Job):
         """Report successful job completion to marketplace"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.marketplace_url}/api/jobs/{job.job_id}/complete",
-                    json={
-                        'status': 'completed',
-                        'started_at': job.started_at.isoformat(),
-                        'completed_at': job.completed_at.isoformat(),
-                        'duration': (job.completed_at - job.started_at).total_seconds()
-                    },
-                    headers={'X-API-Key': self.api_key} if self.api_key else {},
-                    timeout=10.0
-                )
+            response = await self.http_client.post(
+                f"{self.marketplace_url}/api/jobs/{job.job_id}/complete",
+                json={
+                    'status': 'completed',
+                    'started_at': job.started_at.isoformat(),
+                    'completed_at': job.completed_at.isoformat(),
+                    'duration': (job.completed_at - job.started_at).total_seconds()
+                },
+                headers={'X-API-Key': self.api_key} if self.api_key else {},
+                timeout=10.0
+            )
+            
+            if response.status_code == 200:
+                logger.info(f"Reported success for job {job.job_id}")
+            else:
+                logger.warning(f"Failed to report success: {response.status_code}")
                 
-                if response.status_code == 200:
-                    logger.info(f"Reported success for job {job.job_id}")
-                else:
-                    logger.warning(f"Failed to report success: {response.status_code}")
-                    
         except Exception as e:
             logger.error(f"Error reporting job success: {e}")
             
     async def report_job_failure(self, job: Job):
         """Report job failure to marketplace"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.marketplace_url}/api/jobs/{job.job_id}/fail",
-                    json={
-                        'status': 'failed',
-                        'error_message': job.error_message,
-                        'started_at': job.started_at.isoformat() if job.started_at else None,
-                        'failed_at': job.completed_at.isoformat() if job.completed_at else None
-                    },
-                    headers={'X-API-Key': self.api_key} if self.api_key else {},
-                    timeout=10.0
-                )
+            response = await self.http_client.post(
+                f"{self.marketplace_url}/api/jobs/{job.job_id}/fail",
+                json={
+                    'status': 'failed',
+                    'error_message': job.error_message,
+                    'started_at': job.started_at.isoformat() if job.started_at else None,
+                    'failed_at': job.completed_at.isoformat() if job.completed_at else None
+                },
+                headers={'X-API-Key': self.api_key} if self.api_key else {},
+                timeout=10.0
+            )
+            
+            if response.status_code == 200:
+                logger.info(f"Reported failure for job {job.job_id}")
+            else:
+                logger.warning(f"Failed to report failure: {response.status_code}")
                 
-                if response.status_code == 200:
-                    logger.info(f"Reported failure for job {job.job_id}")
-                else:
-                    logger.warning(f"Failed to report failure: {response.status_code}")
-                    
         except Exception as e:
             logger.error(f"Error reporting job failure: {e}")
             
@@ -522,4 +674,9 @@ class JobManager:
         """Stop the job manager"""
         self.is_running = False
         logger.info("Job manager stopped")
+    
+    async def close(self):
+        """Release network resources (only closes the HTTP client if we created it)"""
+        if self._owns_http_client:
+            await self.http_client.aclose()
 
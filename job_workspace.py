@@ -0,0 +1,120 @@
+# job_workspace.py
+"""
+Per-job working directories
+
+Every job gets its own directory tree under the agent work dir:
+
+    <work_dir>/<job_id>/input   - job input data (read-only for the job)
+    <work_dir>/<job_id>/output  - files produced by the job
+
+Input data is downloaded straight into the job's input directory once and
+then exposed to the job by bind mount (containers) or used in place
+(native). When inputs from another location have to be exposed, they are
+hardlinked rather than copied.
+"""
+
+import os
+import re
+import shutil
+import stat
+from dataclasses import dataclass
+from pathlib import Path
+from loguru import logger
+
+DEFAULT_WORK_DIR = Path("/tmp/node3_jobs")
+JOB_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,128}')
+
+
+def is_valid_job_id(job_id) -> bool:
+    """
+    Whether a job id is safe to use as a single path component
+
+    Job ids come from the marketplace and name workspace directories, log
+    files and cgroups, so absolute paths, separators and '..' are refused.
+    """
+    return isinstance(job_id, str) and JOB_ID_PATTERN.fullmatch(job_id) is not None and job_id not in ('.', '..')
+
+
+@dataclass(frozen=True)
+class JobWorkspace:
+    """Directory layout for a single job"""
+    root: Path
+
+    @classmethod
+    def for_job(cls, job_id: str, work_dir: Path = DEFAULT_WORK_DIR) -> "JobWorkspace":
+        if not is_valid_job_id(job_id):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        return cls(root=Path(work_dir) / job_id)
+
+    @property
+    def input_dir(self) -> Path:
+        return self.root / "input"
+
+    @property
+    def output_dir(self) -> Path:
+        return self.root / "output"
+
+    def create(self) -> "JobWorkspace":
+        """Create the input and output directories"""
+        self.input_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def cleanup_input(self):
+        """Remove job inputs (outputs are kept for inspection)"""
+        if self.input_dir.is_symlink():
+            self.input_dir.unlink()
+        else:
+            remove_tree(self.input_dir)
+
+    def remove(self):
+        """Remove the whole workspace"""
+        remove_tree(self.root)
+
+
+def _make_owner_writable(path: str):
+    os.chmod(path, stat.S_IMODE(os.lstat(path).st_mode) | stat.S_IRWXU)
+
+
+def remove_tree(path: Path):
+    """
+    Remove a directory tree, including read-only directories inside it
+
+    Only directories are made writable; files may be hardlinks into the input
+    cache and keep their modes. Errors are logged, not raised.
+    """
+    def retry_writable(func, target, _exc_info):
+        try:
+            _make_owner_writable(os.path.dirname(target))
+            if os.path.isdir(target) and not os.path.islink(target):
+                _make_owner_writable(target)
+            func(target)
+        except OSError as e:
+            logger.debug(f"Could not remove {target}: {e}")
+
+    if os.path.lexists(path):
+        shutil.rmtree(path, onerror=retry_writable)
+
+
+def _link_or_copy(src: str, dst: str):
+    """Hardlink a file, falling back to a copy across filesystems"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def link_tree(src: Path, dst: Path):
+    """
+    Expose the contents of src under dst without duplicating file data
+
+    Files are hardlinked where possible (same filesystem) and copied otherwise.
+    Directories stay writable by the agent even when src is read-only (input
+    cache entries), so the workspace can be emptied and removed later.
+    """
+    if Path(src).resolve() == Path(dst).resolve():
+        return
+    shutil.copytree(src, dst, copy_function=_link_or_copy, dirs_exist_ok=True, symlinks=True)
+    for root, _dirs, _files in os.walk(dst):
+        _make_owner_writable(root)
+    logger.debug(f"Linked {src} -> {dst}")
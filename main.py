@@ -5,15 +5,23 @@ VERSION = "1.0.0"
 import asyncio
 from loguru import logger
 import sys
+import time
 from pathlib import Path
 import os
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
-# Import modules
+# Import modules (docker_manager and payment_module pull in docker and
+# solana, so they are imported in the startup stage that needs them)
 from gpu_detector import GPUDetector
-from docker_manager import DockerManager
+from gpu_benchmark import GPUBenchmarkSuite, DEFAULT_CACHE_PATH as DEFAULT_BENCHMARK_CACHE
 from job_manager import JobManager
-from payment_module import PaymentModule
+from gpu_scheduler import GPUScheduler
+from http_client import create_http_client
+from input_cache import InputCache
+from job_logs import JobLogHub
+from python_worker_pool import PythonWorkerPool
+from cgroup_limits import CgroupManager
 from dashboard import Dashboard
 from agent_telemetry import AgentTelemetry
 
@@ -25,21 +33,225 @@ MARKETPLACE_URL = os.getenv("MARKETPLACE_URL", "https://api.node-3.com")
 API_KEY = os.getenv("API_KEY", "")
 WALLET_PATH = os.getenv("WALLET_PATH", "./wallet.json")
 SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL", "https://api.devnet.solana.com")
+SOLANA_RPC_FALLBACK_URLS = [u.strip() for u in os.getenv("SOLANA_RPC_FALLBACK_URLS", "").split(",") if u.strip()]
+SOLANA_WS_URL = os.getenv("SOLANA_WS_URL") or None
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", "30"))
+WALLET_HISTORY_SYNC_INTERVAL = float(os.getenv("WALLET_HISTORY_SYNC_INTERVAL", "60"))
+WALLET_HISTORY_DIR = os.getenv("WALLET_HISTORY_DIR") or None
 DASHBOARD_PORT = int(os.getenv("DASHBOARD_PORT", "8080"))
 SKIP_GPU_CHECK = os.getenv("SKIP_GPU_CHECK", "false").lower() == "true"
 TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "true").lower() == "true"
 TELEMETRY_URL = os.getenv("TELEMETRY_URL", "https://node3-production-16ca.up.railway.app")
+# 0 = auto (one job slot per detected GPU)
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "0"))
+# 0 = no per-GPU job limit (placement bounded by GPU memory only)
+MAX_JOBS_PER_GPU = int(os.getenv("MAX_JOBS_PER_GPU", "0"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+JOB_WORK_DIR = Path(os.getenv("JOB_WORK_DIR", "/tmp/node3_jobs"))
+# Disk budget for cached input datasets (0 = disable caching)
+INPUT_CACHE_MAX_GB = float(os.getenv("INPUT_CACHE_MAX_GB", "20"))
+INPUT_CACHE_DIR = os.getenv("INPUT_CACHE_DIR", "")
+# Docker image cache: disk budget for images pulled by the agent (0 = never prune)
+IMAGE_CACHE_MAX_GB = float(os.getenv("IMAGE_CACHE_MAX_GB", "50"))
+IMAGE_PULL_CONCURRENCY = int(os.getenv("IMAGE_PULL_CONCURRENCY", "2"))
+# Comma-separated popular images to pull at startup and keep warm
+PREFETCH_IMAGES = [i.strip() for i in os.getenv("PREFETCH_IMAGES", "").split(",") if i.strip()]
+# Warm container pool: idle containers kept per (image, GPU), 0 = disabled
+WARM_POOL_SIZE = int(os.getenv("WARM_POOL_SIZE", "0"))
+WARM_POOL_MAX_USES = int(os.getenv("WARM_POOL_MAX_USES", "50"))
+# Job stdout/stderr: per-job log files (rotated at JOB_LOG_MAX_MB) and in-memory tail size
+JOB_LOG_DIR = Path(os.getenv("JOB_LOG_DIR", "logs/jobs"))
+JOB_LOG_MAX_MB = float(os.getenv("JOB_LOG_MAX_MB", "10"))
+JOB_LOG_TAIL_LINES = int(os.getenv("JOB_LOG_TAIL_LINES", "1000"))
+# Fork native `python -c` jobs from a warm interpreter with these modules already imported
+PREFORK_WORKERS = os.getenv("PREFORK_WORKERS", "true").lower() == "true"
+PREFORK_PRELOAD = [m.strip() for m in os.getenv("PREFORK_PRELOAD", "numpy").split(",") if m.strip()]
+# Native job isolation: per-job cgroup v2 when delegated to the agent, rlimits otherwise
+NATIVE_CGROUPS = os.getenv("NATIVE_CGROUPS", "true").lower() == "true"
+NATIVE_CGROUP_DIR = os.getenv("NATIVE_CGROUP_DIR", "")
+NATIVE_PIDS_MAX = int(os.getenv("NATIVE_PIDS_MAX", "1024"))
+NATIVE_IO_READ_MBPS = float(os.getenv("NATIVE_IO_READ_MBPS", "0"))
+NATIVE_IO_WRITE_MBPS = float(os.getenv("NATIVE_IO_WRITE_MBPS", "0"))
+# Seconds between background GPU metric samples
+GPU_SAMPLE_INTERVAL = float(os.getenv("GPU_SAMPLE_INTERVAL", "1.0"))
+# Benchmarks run once per GPU/driver; later starts reuse the saved results
+BENCHMARK_ON_START = os.getenv("BENCHMARK_ON_START", "true").lower() == "true"
+BENCHMARK_CACHE = Path(os.getenv("BENCHMARK_CACHE", str(DEFAULT_BENCHMARK_CACHE)))
+# Start polling the marketplace as soon as the agent is ready (otherwise via the dashboard's Start button)
+AUTO_START_JOBS = os.getenv("AUTO_START_JOBS", "false").lower() == "true"
+# Seconds running jobs get to finish on shutdown before they are cancelled
+JOB_SHUTDOWN_GRACE = float(os.getenv("JOB_SHUTDOWN_GRACE", "30"))
+
+class StartupTimer:
+    """Wall-clock timings of the startup phases (several run concurrently)"""
+    
+    def __init__(self):
+        self.started = time.monotonic()
+        self.phases: Dict[str, float] = {}  # phase -> seconds it took
+        self.milestones: Dict[str, float] = {}  # milestone -> seconds since start
+        
+    async def timed(self, name: str, awaitable):
+        """Await a phase and record its duration"""
+        start = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            self.phases[name] = time.monotonic() - start
+            
+    def mark(self, milestone: str):
+        self.milestones[milestone] = time.monotonic() - self.started
+        
+    def summary(self) -> Dict:
+        return {
+            'phases': {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            'milestones': {name: round(seconds, 3) for name, seconds in self.milestones.items()}
+        }
+        
+    def report(self):
+        phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        milestones = ", ".join(f"{name} at {seconds:.2f}s" for name, seconds in self.milestones.items())
+        logger.info(f"Startup phases: {phases}")
+        logger.info(f"Startup milestones: {milestones}")
+
+def _load_docker_manager_class():
+    from docker_manager import DockerManager  # Imports the docker SDK
+    return DockerManager
+
+def _load_payment_module_class():
+    from payment_module import PaymentModule  # Imports solana/solders
+    return PaymentModule
+
+async def _init_docker(docker_manager_class, gpus: List) -> Optional[object]:
+    """Docker (or Lima) manager, or None to run jobs natively"""
+    # Pass GPU info to Docker manager for runtime selection
+    gpu_info_dict = {
+        'gpu_type': gpus[0].gpu_type.value if gpus else 'unknown',
+        'compute_framework': gpus[0].compute_framework.value if gpus else 'none',
+        'vendor': gpus[0].vendor if gpus else 'unknown'
+    }
+    try:
+        DockerManager = await docker_manager_class
+        # Probing Docker and Lima runs CLI tools and may boot a VM - keep it off the loop
+        docker_manager = await asyncio.to_thread(
+            DockerManager,
+            gpu_info=gpu_info_dict,
+            pull_concurrency=IMAGE_PULL_CONCURRENCY,
+            image_cache_max_bytes=int(IMAGE_CACHE_MAX_GB * 1024 ** 3),
+            pinned_images=PREFETCH_IMAGES,
+            warm_pool_size=WARM_POOL_SIZE,
+            warm_pool_max_uses=WARM_POOL_MAX_USES
+        )
+        if docker_manager.is_available() and PREFETCH_IMAGES:
+            docker_manager.prefetch_images(PREFETCH_IMAGES)
+        return docker_manager
+    except Exception as e:
+        logger.warning(f"Docker initialization failed: {e}")
+        logger.warning("Continuing in demo mode without Docker...")
+        return None
+
+async def _init_payment_module():
+    PaymentModule = await asyncio.to_thread(_load_payment_module_class)
+    payment_module = PaymentModule(
+        rpc_url=SOLANA_RPC_URL,
+        wallet_path=WALLET_PATH,
+        fallback_rpc_urls=SOLANA_RPC_FALLBACK_URLS,
+        ws_url=SOLANA_WS_URL,
+        balance_ttl=BALANCE_CACHE_TTL,
+        history_sync_interval=WALLET_HISTORY_SYNC_INTERVAL,
+        history_dir=WALLET_HISTORY_DIR
+    )
+    await payment_module.initialize()
+    logger.info(f"Wallet: {payment_module.get_wallet_address()}")
+    return payment_module
+
+def _init_cgroups() -> Optional[CgroupManager]:
+    """Per-job cgroups for native execution (Linux with a delegated cgroup v2 subtree)"""
+    if not (NATIVE_CGROUPS and sys.platform.startswith('linux')):
+        return None
+    return CgroupManager(
+        base_dir=Path(NATIVE_CGROUP_DIR) if NATIVE_CGROUP_DIR else None,
+        pids_max=NATIVE_PIDS_MAX,
+        io_read_bps=int(NATIVE_IO_READ_MBPS * 1024 * 1024),
+        io_write_bps=int(NATIVE_IO_WRITE_MBPS * 1024 * 1024)
+    )
+
+async def _init_worker_pool() -> Optional[PythonWorkerPool]:
+    """Warm interpreter for native inline-code jobs (fork is POSIX only)"""
+    if not (PREFORK_WORKERS and hasattr(os, 'fork')):
+        return None
+    worker_pool = PythonWorkerPool(preload_modules=PREFORK_PRELOAD)
+    if not await worker_pool.start():
+        await worker_pool.close()
+        return None
+    return worker_pool
+
+def _init_input_cache() -> Optional[InputCache]:
+    """Shared cache for input datasets reused across jobs"""
+    if INPUT_CACHE_MAX_GB <= 0:
+        return None
+    try:
+        return InputCache(
+            cache_dir=Path(INPUT_CACHE_DIR) if INPUT_CACHE_DIR else None,
+            max_bytes=int(INPUT_CACHE_MAX_GB * 1024 ** 3)
+        )
+    except Exception as e:
+        logger.warning(f"Input cache disabled: {e}")
+        return None
+
+async def _run_benchmarks(gpus: List):
+    """Benchmark GPUs (persisted per device UUID and driver version)"""
+    benchmark_suite = GPUBenchmarkSuite(cache_path=BENCHMARK_CACHE)
+    for gpu in gpus:
+        try:
+            benchmark = await asyncio.to_thread(benchmark_suite.run, gpu)
+        except Exception as e:
+            logger.warning(f"Benchmark failed for {gpu.name}: {e}")
+            continue
+        if benchmark:
+            source = "saved results" if benchmark['cached'] else "measured"
+            logger.info(f"{gpu.name} performance: {benchmark.get('tflops', 0):.2f} TFLOPS FP32 ({source})")
+
+async def _register_telemetry(telemetry: AgentTelemetry, gpus: List):
+    """Register with the telemetry server (blocking HTTP, including a geo-IP lookup)"""
+    primary_gpu = gpus[0] if gpus else None
+    if not primary_gpu:
+        return
+    gpu_info_telemetry = {
+        'vendor': primary_gpu.vendor,
+        'name': primary_gpu.name,
+        'total_memory': primary_gpu.total_memory,
+        'count': len(gpus)
+    }
+    await asyncio.to_thread(telemetry.register, gpu_info_telemetry, VERSION)
+    logger.info("✓ Telemetry initialized")
 
 async def main():
-    """Main application entry point"""
+    """Main application entry point
     
+    Startup is staged: independent probes (GPU detection, Docker/Lima, wallet,
+    cgroups, warm interpreter, input cache) run concurrently, and the
+    dashboard comes up as soon as the job manager and wallet exist. Slow
+    extras that nothing waits on (benchmarks, telemetry registration, wallet
+    balance) keep running in the background.
+    """
+    startup = StartupTimer()
+    background: List[asyncio.Task] = []
     logger.info("Starting node3 Agent...")
     
     try:
-        # 1. Initialize GPU Detector
+        # 1. Independent probes
         logger.info("Initializing GPU detector...")
-        gpu_detector = GPUDetector()
-        gpus = gpu_detector.detect_gpus()
+        gpu_detector = GPUDetector(sample_interval=GPU_SAMPLE_INTERVAL)
+        gpu_task = asyncio.create_task(startup.timed("gpu_detection", asyncio.to_thread(gpu_detector.detect_gpus)))
+        docker_import = asyncio.create_task(asyncio.to_thread(_load_docker_manager_class))
+        payment_task = asyncio.create_task(startup.timed("wallet", _init_payment_module()))
+        cgroup_task = asyncio.create_task(startup.timed("cgroups", asyncio.to_thread(_init_cgroups)))
+        worker_pool_task = asyncio.create_task(startup.timed("worker_pool", _init_worker_pool()))
+        input_cache_task = asyncio.create_task(startup.timed("input_cache", asyncio.to_thread(_init_input_cache)))
+        
+        gpus = await gpu_task
         
         if not gpus:
             if SKIP_GPU_CHECK:
@@ -80,81 +292,52 @@ async def main():
                 logger.error("  (Note: Jobs will not execute in this mode)")
                 logger.error("=" * 60)
                 sys.exit(1)
-            
-        # Benchmark GPUs
-        for gpu in gpus:
-            logger.info(f"Benchmarking {gpu.name}...")
-            benchmark = gpu_detector.benchmark_gpu(gpu.index)
-            if benchmark:
-                logger.info(f"Performance: {benchmark.get('tflops', 0):.2f} TFLOPS")
-        
-        # 1.5. Initialize Telemetry (optional)
+        
+        # 2. Everything that only needs the GPU list
+        logger.info("Initializing Docker manager...")
+        docker_task = asyncio.create_task(startup.timed("docker", _init_docker(docker_import, gpus)))
+        
+        # Background GPU metrics sampling (dashboard and scheduler read cached snapshots)
+        gpu_detector.start_sampler()
+        if BENCHMARK_ON_START:
+            background.append(asyncio.create_task(startup.timed("benchmark", _run_benchmarks(gpus))))
+        
+        # Telemetry (optional) - registration runs in the background
         telemetry = None
         if TELEMETRY_ENABLED:
             try:
                 logger.info("Initializing telemetry...")
                 telemetry = AgentTelemetry(telemetry_url=TELEMETRY_URL)
-                
-                # Register agent with telemetry server
-                primary_gpu = gpus[0] if gpus else None
-                if primary_gpu:
-                    gpu_info_telemetry = {
-                        'vendor': primary_gpu.vendor,
-                        'name': primary_gpu.name,
-                        'total_memory': primary_gpu.total_memory,
-                        'count': len(gpus)
-                    }
-                    telemetry.register(gpu_info_telemetry, agent_version=VERSION)
-                    telemetry.log_event('agent_started', {
-                        'version': VERSION,
-                        'gpu_count': len(gpus),
-                        'has_docker': docker_manager is not None
-                    })
-                    logger.info("✓ Telemetry initialized")
+                background.append(asyncio.create_task(startup.timed("telemetry", _register_telemetry(telemetry, gpus))))
             except Exception as e:
                 logger.warning(f"Telemetry initialization failed: {e}")
                 logger.warning("Continuing without telemetry...")
                 telemetry = None
-            
-        # 2. Initialize Docker Manager
-        logger.info("Initializing Docker manager...")
-        # Pass GPU info to Docker manager for runtime selection
-        gpu_info_dict = {
-            'gpu_type': gpus[0].gpu_type.value if gpus else 'unknown',
-            'compute_framework': gpus[0].compute_framework.value if gpus else 'none',
-            'vendor': gpus[0].vendor if gpus else 'unknown'
-        }
-        try:
-            docker_manager = DockerManager(gpu_info=gpu_info_dict)
-        except Exception as e:
-            logger.warning(f"Docker initialization failed: {e}")
-            logger.warning("Continuing in demo mode without Docker...")
-            # Create a dummy docker manager that won't execute jobs
-            docker_manager = None
         
-        # 3. Initialize Payment Module
-        logger.info("Initializing payment module...")
-        payment_module = PaymentModule(
-            rpc_url=SOLANA_RPC_URL,
-            wallet_path=WALLET_PATH
-        )
-        await payment_module.initialize()
+        max_concurrent_jobs = MAX_CONCURRENT_JOBS if MAX_CONCURRENT_JOBS > 0 else max(1, len(gpus))
+        logger.info(f"Job capacity: {max_concurrent_jobs} concurrent job(s)")
+        
+        # Per-GPU placement (only when real GPUs were detected, not in demo mode)
+        gpu_scheduler = None
+        if gpu_detector.gpus:
+            gpu_scheduler = GPUScheduler(gpu_detector, max_jobs_per_gpu=MAX_JOBS_PER_GPU)
         
-        wallet_address = payment_module.get_wallet_address()
-        balance = await payment_module.get_balance()
+        # One pooled HTTP client shared by the job manager and dashboard
+        http_client = create_http_client(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            http2=HTTP2_ENABLED
+        )
         
-        logger.info(f"Wallet: {wallet_address}")
-        logger.info(f"Balance: {balance} SOL")
+        # 3. Job manager: needs the wallet and native execution; Docker is attached when ready
+        logger.info("Initializing payment module...")
+        payment_module = await payment_task
+        cgroup_manager = await cgroup_task
+        worker_pool = await worker_pool_task
+        input_cache = await input_cache_task
         
-        # 4. Initialize Job Manager (native execution by default, Docker optional)
         logger.info("Initializing job manager...")
         primary_gpu = gpus[0] if gpus else None
-        
-        if docker_manager is None:
-            logger.info("Docker not available - using native execution (no installation needed!)")
-        else:
-            logger.info("Docker available - can use containers for enhanced isolation (optional)")
-        
         job_manager = JobManager(
             marketplace_url=MARKETPLACE_URL,
             api_key=API_KEY,
@@ -166,13 +349,26 @@ async def main():
                 'total_memory': primary_gpu.total_memory if primary_gpu else 0,
                 'compute_capability': primary_gpu.compute_capability if primary_gpu else None
             },
-            docker_manager=docker_manager,  # Optional - native execution works without it
+            docker_manager=docker_task.result() if docker_task.done() else None,
             use_native_execution=True,  # Always enable native execution
             payment_module=payment_module,  # For wallet address and payment tracking
-            telemetry=telemetry  # Optional telemetry reporting
+            telemetry=telemetry,  # Optional telemetry reporting
+            max_concurrent_jobs=max_concurrent_jobs,
+            gpu_scheduler=gpu_scheduler,
+            http_client=http_client,
+            work_dir=JOB_WORK_DIR,
+            input_cache=input_cache,
+            log_hub=JobLogHub(
+                log_dir=JOB_LOG_DIR,
+                ring_size=JOB_LOG_TAIL_LINES,
+                max_file_bytes=int(JOB_LOG_MAX_MB * 1024 * 1024)
+            ),
+            worker_pool=worker_pool,
+            cgroup_manager=cgroup_manager,
+            agent_started_at=startup.started
         )
         
-        # 5. Start Dashboard
+        # 4. Start Dashboard
         logger.info("Starting dashboard...")
         dashboard = Dashboard(
             gpu_detector=gpu_detector,
@@ -180,15 +376,28 @@ async def main():
             payment_module=payment_module,
             port=DASHBOARD_PORT
         )
-        
-        # 6. Start all services
-        logger.info("node3 Agent started successfully!")
+        tasks = [asyncio.create_task(dashboard.start())]
+        startup.mark("dashboard")
         logger.info(f"Dashboard available at: http://127.0.0.1:{DASHBOARD_PORT}")
         
-        # Run job manager and dashboard concurrently
-        tasks = [dashboard.start()]
-        if job_manager.is_running:
-            tasks.append(job_manager.start())
+        # 5. Docker is optional - jobs run natively until it is attached
+        docker_manager = await docker_task
+        job_manager.set_docker_manager(docker_manager)
+        startup.mark("docker")
+        
+        if AUTO_START_JOBS:
+            tasks.append(asyncio.create_task(job_manager.start()))
+            startup.mark("job_polling")
+        
+        logger.info("node3 Agent started successfully!")
+        startup.report()
+        if telemetry:
+            background.append(asyncio.create_task(asyncio.to_thread(telemetry.log_event, 'agent_started', {
+                'version': VERSION,
+                'gpu_count': len(gpus),
+                'has_docker': docker_manager is not None,
+                'startup': startup.summary()
+            })))
         
         await asyncio.gather(*tasks)
         
@@ -201,6 +410,18 @@ async def main():
         sys.exit(1)
     finally:
         # Cleanup
+        for task in background:
+            task.cancel()
+        if 'job_manager' in locals():
+            # Before the executors below are closed under the running jobs
+            job_manager.stop()
+            await job_manager.wait_for_jobs(timeout=JOB_SHUTDOWN_GRACE)
+        if 'docker_task' in locals() and docker_task.done() and not docker_task.cancelled() and docker_task.result():
+            await docker_task.result().close()
+        if 'worker_pool' in locals() and worker_pool:
+            await worker_pool.close()
+        if 'http_client' in locals():
+            await http_client.aclose()
         if 'payment_module' in locals():
             await payment_module.close()
         if 'gpu_detector' in locals():
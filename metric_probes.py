@@ -0,0 +1,229 @@
+# metric_probes.py
+"""
+Background subprocess probes for GPU metrics without a native API
+
+Some GPUs can only be monitored through command-line tools (ioreg and
+powermetrics on macOS, rocm-smi on Linux). Running those inside a request
+handler blocks the event loop for seconds. Instead, each tool is wrapped in
+a SubprocessProbe that runs it as an asyncio subprocess on a fixed interval
+and caches the parsed result; readers only ever see the cached value.
+
+Output is parsed line by line as it streams in (ioreg dumps are several MB),
+probes are rate limited (fixed interval, at most a few tool processes at
+once, exponential backoff on failure) and a tool that is missing or needs
+privileges is disabled after the first attempt.
+"""
+
+import asyncio
+import json
+import re
+import time
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+
+MAX_CONCURRENT_PROBES = 2
+READ_CHUNK_SIZE = 64 * 1024
+MAX_LINE_BYTES = 4 * 1024 * 1024  # Longer lines are truncated (ioreg -w 0 prints lines over 64 KiB)
+IOREG_TEMPERATURE = re.compile(r'"(?:GPU[^"]*)?Temperature"\s*=\s*(\d+)', re.IGNORECASE)
+POWERMETRICS_GPU_POWER = re.compile(r'GPU.*?(\d+\.?\d*)\s*W', re.IGNORECASE)
+
+
+async def read_lines(stream: asyncio.StreamReader, max_line: int = MAX_LINE_BYTES):
+    """
+    Yield lines from a stream, truncating any longer than max_line
+
+    StreamReader's own line iteration raises ValueError past its buffer limit,
+    which would throw away the whole run for one oversized line.
+    """
+    buffer = bytearray()
+    skipping = False  # Discarding the rest of a truncated line
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+        while True:
+            end = buffer.find(b'\n')
+            if end < 0:
+                break
+            line = bytes(buffer[:end + 1])
+            del buffer[:end + 1]
+            if skipping:
+                skipping = False
+            else:
+                yield line
+        if len(buffer) > max_line:
+            if not skipping:
+                yield bytes(buffer[:max_line])
+                skipping = True
+            buffer.clear()
+    if buffer and not skipping:
+        yield bytes(buffer)
+
+
+class IoregTemperatureParser:
+    """GPU temperature from `ioreg -l -w 0`, scanning only candidate lines"""
+
+    def __init__(self):
+        self.temperature: Optional[float] = None
+
+    def feed(self, line: str):
+        if 'emperature' not in line:  # Cheap filter before the regex
+            return
+        match = IOREG_TEMPERATURE.search(line)
+        if not match:
+            return
+        value = int(match.group(1))
+        # Values may be plain, x10 or x100 scaled (e.g. 35, 350, 3500 = 35C)
+        if value > 5000:
+            celsius = value / 100.0
+        elif value > 500:
+            celsius = value / 10.0
+        elif value < 150:
+            celsius = float(value)
+        else:
+            celsius = value / 100.0
+        if 20 <= celsius <= 100:
+            self.temperature = celsius  # Last plausible entry wins
+
+    def result(self) -> Dict:
+        return {'temperature': self.temperature} if self.temperature is not None else {}
+
+
+class PowermetricsParser:
+    """GPU power draw from `powermetrics --samplers gpu_power`"""
+
+    def __init__(self):
+        self.power: Optional[float] = None
+
+    def feed(self, line: str):
+        if self.power is None:
+            match = POWERMETRICS_GPU_POWER.search(line)
+            if match:
+                self.power = float(match.group(1))
+
+    def result(self) -> Dict:
+        return {'power_usage': self.power} if self.power is not None else {}
+
+
+class JsonParser:
+    """Collects the whole output and decodes it as JSON (small tool outputs)"""
+
+    def __init__(self, transform: Callable[[Dict], Dict], loads: Callable[[str], Dict] = json.loads):
+        self.transform = transform
+        self.loads = loads
+        self.lines: List[str] = []
+
+    def feed(self, line: str):
+        self.lines.append(line)
+
+    def result(self) -> Dict:
+        return self.transform(self.loads(''.join(self.lines)))
+
+
+class SubprocessProbe:
+    """Runs a metrics tool periodically and caches its parsed output"""
+
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    def __init__(self,
+                 name: str,
+                 argv: List[str],
+                 parser_factory: Callable[[], object],
+                 interval: float = 10.0,
+                 timeout: float = 10.0,
+                 max_backoff: float = 600.0):
+        """
+        Initialize probe
+
+        Args:
+            name: Probe name (for logs and stats)
+            argv: Command to run
+            parser_factory: Returns a fresh parser with feed(line) and result()
+            interval: Seconds between runs
+            timeout: Maximum seconds a single run may take
+            max_backoff: Upper bound for the retry delay after failures
+        """
+        self.name = name
+        self.argv = argv
+        self.parser_factory = parser_factory
+        self.interval = interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.latest: Dict = {}
+        self.updated_at: Optional[float] = None
+        self.failures = 0
+        self.disabled = False
+        self.runs = 0
+
+    @classmethod
+    def _limit(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROBES)
+        return cls._semaphore
+
+    async def run_once(self) -> Optional[Dict]:
+        """Run the tool once; returns the parsed result or None on failure"""
+        async with self._limit():
+            parser = self.parser_factory()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *self.argv,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                    stdin=asyncio.subprocess.DEVNULL
+                )
+            except (FileNotFoundError, PermissionError) as e:
+                self.disabled = True
+                logger.debug(f"Metric probe {self.name} disabled: {e}")
+                return None
+
+            self.runs += 1
+            try:
+                async def consume():
+                    async for raw in read_lines(process.stdout):
+                        parser.feed(raw.decode('utf-8', errors='replace'))
+                    return await process.wait()
+                returncode = await asyncio.wait_for(consume(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                logger.debug(f"Metric probe {self.name} timed out after {self.timeout}s")
+                return None
+
+            if returncode != 0:
+                logger.debug(f"Metric probe {self.name} exited with {returncode}")
+                return None
+            try:
+                return parser.result()
+            except Exception as e:
+                logger.debug(f"Metric probe {self.name} parse failed: {e}")
+                return None
+
+    async def run(self, on_result: Callable[[Dict], None]):
+        """Probe forever, publishing each successful result"""
+        while not self.disabled:
+            result = await self.run_once()
+            if result is not None:
+                self.failures = 0
+                self.latest = result
+                self.updated_at = time.time()
+                on_result(result)
+                delay = self.interval
+            else:
+                self.failures += 1
+                delay = min(self.interval * 2 ** self.failures, self.max_backoff)
+                if self.failures == 3:
+                    logger.info(f"Metric probe {self.name} keeps failing - retrying every {delay:.0f}s at most")
+            if self.disabled:
+                break
+            await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict:
+        return {
+            'name': self.name,
+            'runs': self.runs,
+            'failures': self.failures,
+            'disabled': self.disabled,
+            'updated_at': self.updated_at
+        }
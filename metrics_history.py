@@ -0,0 +1,235 @@
+# metrics_history.py
+"""
+In-memory metrics history for GPU and host telemetry
+
+Each device keeps three fixed-size ring buffers backed by array('d'), so
+a sample costs a few float stores instead of a Python dict:
+
+    raw    - every sample at the sampler interval (default 1h of 1s samples)
+    minute - per-minute mean/min/max (default 24h)
+    hour   - per-hour mean/min/max (default 30 days)
+
+Raw samples are folded into the minute tier as each minute closes, and
+minutes into the hour tier, so long ranges never scan raw data. Enough for
+capacity planning without running an external TSDB.
+"""
+
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+GPU_METRICS = ('gpu_utilization', 'memory_used', 'temperature', 'power_usage')
+HOST_METRICS = ('cpu_percent', 'memory_used', 'memory_percent')
+AGGREGATES = ('mean', 'min', 'max')
+TIER_SECONDS = {'minute': 60, 'hour': 3600}
+NAN = float('nan')
+
+
+class _Ring:
+    """Fixed-capacity columnar ring buffer of float samples"""
+
+    def __init__(self, capacity: int, columns: Iterable[str]):
+        self.capacity = capacity
+        self.head = 0  # Next write position
+        self.count = 0
+        self.times = array('d', bytes(8 * capacity))
+        self.columns = {name: array('d', bytes(8 * capacity)) for name in columns}
+
+    def append(self, timestamp: float, values: Dict[str, float]):
+        i = self.head
+        self.times[i] = timestamp
+        for name, column in self.columns.items():
+            column[i] = values.get(name, NAN)
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _ordered(self, data: array) -> array:
+        """Oldest-first view of a column (array slices are C-level copies)"""
+        if self.count < self.capacity:
+            return data[:self.count]
+        return data[self.head:] + data[:self.head]
+
+    def window(self, start: float, end: float, columns: List[str]) -> Tuple[array, Dict[str, array]]:
+        times = self._ordered(self.times)
+        lo = bisect_left(times, start)
+        hi = bisect_right(times, end)
+        return times[lo:hi], {name: self._ordered(self.columns[name])[lo:hi] for name in columns}
+
+
+class _Bucket:
+    """Running mean/min/max of the samples in one minute or hour"""
+
+    def __init__(self, metrics: Tuple[str, ...]):
+        self.metrics = metrics
+        self.start: Optional[float] = None
+        self.reset(None)
+
+    def reset(self, start: Optional[float]):
+        self.start = start
+        self.sums = dict.fromkeys(self.metrics, 0.0)
+        self.counts = dict.fromkeys(self.metrics, 0)
+        self.mins = dict.fromkeys(self.metrics, math.inf)
+        self.maxs = dict.fromkeys(self.metrics, -math.inf)
+
+    def add(self, mean: Dict[str, float], low: Dict[str, float], high: Dict[str, float]):
+        for metric in self.metrics:
+            value = mean.get(metric, NAN)
+            if math.isnan(value):
+                continue
+            self.sums[metric] += value
+            self.counts[metric] += 1
+            self.mins[metric] = min(self.mins[metric], low.get(metric, value))
+            self.maxs[metric] = max(self.maxs[metric], high.get(metric, value))
+
+    def summary(self) -> Tuple[Dict[str, float], Dict[str, float], Dict[str, float]]:
+        mean, low, high = {}, {}, {}
+        for metric in self.metrics:
+            n = self.counts[metric]
+            mean[metric] = self.sums[metric] / n if n else NAN
+            low[metric] = self.mins[metric] if n else NAN
+            high[metric] = self.maxs[metric] if n else NAN
+        return mean, low, high
+
+    def row(self) -> Dict[str, float]:
+        """Columns for an aggregated ring (metric.mean / metric.min / metric.max)"""
+        mean, low, high = self.summary()
+        values = {}
+        for metric in self.metrics:
+            values[f"{metric}.mean"] = mean[metric]
+            values[f"{metric}.min"] = low[metric]
+            values[f"{metric}.max"] = high[metric]
+        return values
+
+
+class _DeviceHistory:
+    def __init__(self, metrics: Tuple[str, ...], raw_capacity: int, minute_capacity: int, hour_capacity: int):
+        self.metrics = metrics
+        aggregated = [f"{m}.{agg}" for m in metrics for agg in AGGREGATES]
+        self.tiers = {
+            'raw': _Ring(raw_capacity, metrics),
+            'minute': _Ring(minute_capacity, aggregated),
+            'hour': _Ring(hour_capacity, aggregated)
+        }
+        self.buckets = {tier: _Bucket(metrics) for tier in TIER_SECONDS}
+
+    def record(self, timestamp: float, values: Dict[str, float]):
+        self.tiers['raw'].append(timestamp, values)
+        self._fold('minute', timestamp, values, values, values)
+
+    def _fold(self, tier: str, timestamp: float, mean: Dict, low: Dict, high: Dict):
+        """Add to the open bucket of a tier, closing it when time moves past it"""
+        seconds = TIER_SECONDS[tier]
+        bucket_start = timestamp - timestamp % seconds
+        bucket = self.buckets[tier]
+        if bucket.start is not None and bucket_start != bucket.start:
+            self.tiers[tier].append(bucket.start, bucket.row())
+            if tier == 'minute':
+                self._fold('hour', bucket.start, *bucket.summary())
+            bucket.reset(bucket_start)
+        elif bucket.start is None:
+            bucket.reset(bucket_start)
+        bucket.add(mean, low, high)
+
+
+class MetricsHistory:
+    """Per-device metric history with raw, minute and hour tiers"""
+
+    def __init__(self,
+                 raw_interval: float = 1.0,
+                 raw_seconds: int = 3600,
+                 minute_capacity: int = 24 * 60,
+                 hour_capacity: int = 30 * 24):
+        """
+        Initialize metrics history
+
+        Args:
+            raw_interval: Expected seconds between samples
+            raw_seconds: How long full-resolution samples are kept
+            minute_capacity: Number of per-minute aggregates kept
+            hour_capacity: Number of per-hour aggregates kept
+        """
+        self.raw_interval = raw_interval
+        self.raw_capacity = max(1, int(raw_seconds / max(raw_interval, 0.001)))
+        self.minute_capacity = minute_capacity
+        self.hour_capacity = hour_capacity
+        self._devices: Dict[str, _DeviceHistory] = {}
+        self._lock = threading.Lock()
+
+    def record(self, device: str, values: Dict[str, float], metrics: Tuple[str, ...] = GPU_METRICS,
+               timestamp: Optional[float] = None):
+        """Append one sample for a device (called from the sampler thread)"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        numeric = {m: float(values[m]) for m in metrics if isinstance(values.get(m), (int, float))}
+        with self._lock:
+            history = self._devices.get(device)
+            if history is None:
+                history = self._devices[device] = _DeviceHistory(
+                    metrics, self.raw_capacity, self.minute_capacity, self.hour_capacity
+                )
+            history.record(timestamp, numeric)
+
+    def devices(self) -> Dict[str, List[str]]:
+        """Recorded devices and their metrics"""
+        with self._lock:
+            return {name: list(history.metrics) for name, history in self._devices.items()}
+
+    def _pick_tier(self, start: float, now: Optional[float] = None) -> str:
+        """Finest tier still holding data from start (retention counts back from now, not from end)"""
+        age = (now if now is not None else time.time()) - start
+        if age <= self.raw_capacity * self.raw_interval:
+            return 'raw'
+        if age <= self.minute_capacity * TIER_SECONDS['minute']:
+            return 'minute'
+        return 'hour'
+
+    def query(self,
+              device: str,
+              metrics: Optional[List[str]] = None,
+              start: Optional[float] = None,
+              end: Optional[float] = None,
+              resolution: str = 'auto',
+              agg: str = 'mean') -> Optional[Dict]:
+        """
+        Samples of a device within [start, end]
+
+        Args:
+            device: Device key (e.g. 'gpu0', 'host')
+            metrics: Metrics to return (default: all recorded for the device)
+            start: Window start (epoch seconds, default: one hour before end)
+            end: Window end (epoch seconds, default: now)
+            resolution: 'raw', 'minute', 'hour' or 'auto' (finest tier still holding start)
+            agg: 'mean', 'min' or 'max' for aggregated tiers
+
+        Returns:
+            Dict with 'resolution', 'timestamps' and 'series' (metric -> values,
+            None for gaps), or None if the device is unknown
+        """
+        end = end if end is not None else time.time()
+        start = start if start is not None else end - 3600
+        if agg not in AGGREGATES:
+            raise ValueError(f"agg must be one of {', '.join(AGGREGATES)}")
+
+        with self._lock:
+            history = self._devices.get(device)
+            if history is None:
+                return None
+            metrics = [m for m in (metrics or history.metrics) if m in history.metrics]
+            tier = self._pick_tier(start) if resolution == 'auto' else resolution
+            if tier not in history.tiers:
+                raise ValueError("resolution must be raw, minute, hour or auto")
+            columns = metrics if tier == 'raw' else [f"{m}.{agg}" for m in metrics]
+            times, data = history.tiers[tier].window(start, end, columns)
+
+        return {
+            'device': device,
+            'resolution': tier,
+            'aggregate': None if tier == 'raw' else agg,
+            'timestamps': times.tolist(),
+            'series': {
+                metric: [None if math.isnan(v) else v for v in data[column]]
+                for metric, column in zip(metrics, columns)
+            }
+        }
@@ -19,20 +19,43 @@ from typing import Dict, List, Optional
 from loguru import logger
 import psutil
 import resource
+from job_logs import JobLogStream
+from job_workspace import JobWorkspace, DEFAULT_WORK_DIR, link_tree
+from python_worker_pool import PythonWorkerPool
+from cgroup_limits import CgroupManager
+
+PIPE_READ_SIZE = 64 * 1024
+PATH_SHIM_DIR = Path(__file__).with_name("native_shim")  # sitecustomize remapping /input and /output
+
+
+async def _pump_pipe(pipe: asyncio.StreamReader, log: JobLogStream, stream: str):
+    """Forward a subprocess pipe into the job log as output arrives"""
+    while True:
+        chunk = await pipe.read(PIPE_READ_SIZE)
+        if not chunk:
+            break
+        log.feed(chunk, stream)
 
 
 class NativeExecutor:
     """Execute jobs natively without containers"""
     
-    def __init__(self, work_dir: Optional[Path] = None):
+    def __init__(self,
+                 work_dir: Optional[Path] = None,
+                 worker_pool: Optional[PythonWorkerPool] = None,
+                 cgroup_manager: Optional[CgroupManager] = None):
         """
         Initialize native executor
         
         Args:
             work_dir: Base directory for job execution (default: /tmp/node3_jobs)
+            worker_pool: Optional prefork pool used for `python -c` jobs
+            cgroup_manager: Optional cgroup v2 backend (rlimits are used without it)
         """
-        self.work_dir = work_dir or Path("/tmp/node3_jobs")
+        self.work_dir = work_dir or DEFAULT_WORK_DIR
         self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.worker_pool = worker_pool
+        self.cgroup_manager = cgroup_manager
         
     async def run_job(self,
                      job_id: str,
@@ -42,7 +65,8 @@ class NativeExecutor:
                      input_dir: Optional[Path] = None,
                      output_dir: Optional[Path] = None,
                      memory_limit_mb: int = 8192,
-                     cpu_limit: int = 4) -> Dict:
+                     cpu_limit: int = 4,
+                     log_stream: Optional[JobLogStream] = None) -> Dict:
         """
         Execute a job natively as a subprocess
         
@@ -51,30 +75,33 @@ class NativeExecutor:
             command: Command to execute (e.g., ["python", "script.py"])
             environment: Environment variables
             timeout: Maximum execution time in seconds
-            input_dir: Directory with input files
-            output_dir: Directory for output files
+            input_dir: Directory with input files (used in place if it is the job's
+                workspace input, otherwise hardlinked into the workspace)
+            output_dir: Directory for output files (default: job workspace output)
             memory_limit_mb: Memory limit in MB
             cpu_limit: CPU core limit
+            log_stream: Live log receiving stdout/stderr as it is produced
             
         Returns:
-            Dict with 'success', 'output', 'error', 'exit_code'
+            Dict with 'success', 'output', 'error', 'exit_code' ('output' and
+            'error' hold the most recent lines; the full log is in log_stream),
+            plus 'resource_usage' when the job ran in a cgroup
         """
+        log = log_stream or JobLogStream(job_id)
         # Create isolated job directory
-        job_dir = self.work_dir / job_id
-        job_dir.mkdir(parents=True, exist_ok=True)
+        workspace = JobWorkspace.for_job(job_id, self.work_dir).create()
+        job_dir = workspace.root
+        cgroup = None
         
         try:
             # Setup input/output directories
-            job_input = job_dir / "input"
-            job_output = job_dir / "output"
+            job_input = workspace.input_dir
+            job_output = Path(output_dir) if output_dir else workspace.output_dir
+            job_output.mkdir(parents=True, exist_ok=True)
             
             if input_dir and input_dir.exists():
-                # Copy input files
-                shutil.copytree(input_dir, job_input, dirs_exist_ok=True)
-            else:
-                job_input.mkdir(exist_ok=True)
-            
-            job_output.mkdir(exist_ok=True)
+                # Expose external inputs without copying file data
+                link_tree(input_dir, job_input)
             
             # Prepare environment
             env = os.environ.copy()
@@ -82,29 +109,21 @@ class NativeExecutor:
             env['JOB_ID'] = job_id
             env['INPUT_DIR'] = str(job_input)
             env['OUTPUT_DIR'] = str(job_output)
+            # Container paths (/input, /output) are remapped inside Python by the shim
+            if PATH_SHIM_DIR.is_dir():
+                env['NODE3_PATH_MAP'] = json.dumps({'/input': str(job_input), '/output': str(job_output)})
+                env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(PATH_SHIM_DIR), env.get('PYTHONPATH')]))
+            else:
+                logger.error(
+                    f"Path shim missing at {PATH_SHIM_DIR} (not bundled in this build?) - "
+                    f"job {job_id} must use INPUT_DIR/OUTPUT_DIR instead of /input and /output"
+                )
             
             # Build command (support Python scripts and inline code)
             if command[0] in ("python", "python3") and len(command) > 1:
                 if command[1] == "-c":
                     # Python inline code execution: python -c "code"
                     python_code = command[2] if len(command) > 2 else ""
-                    # Replace container paths with proper path handling
-                    # Need to replace /output/path with os.path.join(OUTPUT_DIR, 'path')
-                    import re
-                    # Replace /output/path with proper path join
-                    # Handle 'path' format
-                    python_code = re.sub(r"'/output/([^']+)'", r"os.path.join(os.getenv('OUTPUT_DIR', '/tmp/node3_output'), '\1')", python_code)
-                    # Handle "path" format  
-                    python_code = re.sub(r'"/output/([^"]+)"', r'os.path.join(os.getenv("OUTPUT_DIR", "/tmp/node3_output"), "\1")', python_code)
-                    # Replace standalone /output references (for open('/output/file'))
-                    python_code = re.sub(r"open\('/output/([^']+)'", r"open(os.path.join(os.getenv('OUTPUT_DIR', '/tmp/node3_output'), '\1')", python_code)
-                    python_code = re.sub(r'open\("/output/([^"]+)"', r'open(os.path.join(os.getenv("OUTPUT_DIR", "/tmp/node3_output"), "\1")', python_code)
-                    # Replace /input references similarly
-                    python_code = re.sub(r"'/input/([^']+)'", r"os.path.join(os.getenv('INPUT_DIR', '/tmp/node3_input'), '\1')", python_code)
-                    python_code = re.sub(r'"/input/([^"]+)"', r'os.path.join(os.getenv("INPUT_DIR", "/tmp/node3_input"), "\1")', python_code)
-                    # Ensure os is imported if we're using it
-                    if ("os.getenv" in python_code or "os.path.join" in python_code) and "import os" not in python_code:
-                        python_code = "import os; " + python_code
                     cmd = ["python3", "-c", python_code]
                 elif command[1].endswith(".py") or "/app/" in command[1]:
                     # Python script execution
@@ -150,9 +169,24 @@ class NativeExecutor:
             
             logger.info(f"Executing job {job_id} natively: {' '.join(cmd)}")
             
+            # Own cgroup (memory/cpu/pids/io/cpuset) when delegated, rlimits otherwise
+            if self.cgroup_manager:
+                cgroup = await self.cgroup_manager.create(
+                    job_id,
+                    self.cgroup_manager.limits_for(job_id, memory_limit_mb, cpu_limit),
+                    io_path=job_dir
+                )
+            
             # Set resource limits
             def set_limits():
                 """Set resource limits for the subprocess"""
+                if cgroup:
+                    try:
+                        cgroup.enter()
+                        return
+                    except OSError:
+                        pass  # Fall back to rlimits
+                
                 # Memory limit (RSS)
                 try:
                     resource.setrlimit(
@@ -171,26 +205,49 @@ class NativeExecutor:
                 except:
                     pass
             
+            # Inline code forks from the warm template when the prefork pool is enabled
+            process = None
+            if self.worker_pool and cmd[:2] == ["python3", "-c"]:
+                process = await self.worker_pool.spawn(
+                    cmd[2],
+                    env=env,
+                    cwd=job_dir,
+                    memory_limit_mb=memory_limit_mb,
+                    cpu_seconds=timeout,
+                    cgroup_procs=cgroup.procs_file if cgroup else None
+                )
+            
             # Run subprocess with limits
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env,
-                cwd=str(job_dir),
-                preexec_fn=set_limits if sys.platform != 'win32' else None
-            )
+            if process is None:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=env,
+                    cwd=str(job_dir),
+                    preexec_fn=set_limits if sys.platform != 'win32' else None
+                )
             
-            # Wait with timeout
+            # Stream output while waiting, with timeout
+            pumps = asyncio.gather(
+                _pump_pipe(process.stdout, log, 'stdout'),
+                _pump_pipe(process.stderr, log, 'stderr')
+            )
             try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
+                await asyncio.wait_for(
+                    asyncio.gather(pumps, process.wait()),
                     timeout=timeout
                 )
                 
                 exit_code = process.returncode
-                output = stdout.decode('utf-8', errors='replace')
-                error_output = stderr.decode('utf-8', errors='replace')
+                output = log.tail_text('stdout')
+                error_output = log.tail_text('stderr')
+                usage = cgroup.stats() if cgroup else {}
+                if usage:
+                    logger.info(
+                        f"Job {job_id} used {usage.get('memory_peak', 0) / 1e6:.0f}MB peak memory, "
+                        f"{usage.get('cpu_usage_usec', 0) / 1e6:.1f}s CPU"
+                    )
                 
                 if exit_code == 0:
                     logger.info(f"Job {job_id} completed successfully")
@@ -199,28 +256,42 @@ class NativeExecutor:
                         'output': output,
                         'error': error_output,
                         'exit_code': exit_code,
-                        'output_dir': str(job_output)
+                        'output_dir': str(job_output),
+                        'resource_usage': usage
                     }
                 else:
+                    if usage.get('oom_kills'):
+                        error_output = f"{error_output}\nKilled: exceeded memory limit of {memory_limit_mb}MB".strip()
                     logger.error(f"Job {job_id} failed with exit code {exit_code}")
                     return {
                         'success': False,
                         'output': output,
                         'error': error_output,
                         'exit_code': exit_code,
-                        'output_dir': str(job_output)
+                        'output_dir': str(job_output),
+                        'resource_usage': usage
                     }
                     
             except asyncio.TimeoutError:
                 logger.error(f"Job {job_id} timed out after {timeout}s")
+                if cgroup:
+                    cgroup.kill()  # Also takes down anything the job spawned
                 process.kill()
                 await process.wait()
                 return {
                     'success': False,
+                    'output': log.tail_text('stdout'),
                     'error': f"Job timed out after {timeout} seconds",
                     'exit_code': -1
                 }
-                
+            except asyncio.CancelledError:
+                # Agent shutting down: do not leave the job running unsupervised
+                if cgroup:
+                    cgroup.kill()
+                if process.returncode is None:
+                    process.kill()
+                raise
+
         except Exception as e:
             logger.error(f"Error executing job {job_id}: {e}")
             return {
@@ -229,9 +300,12 @@ class NativeExecutor:
                 'exit_code': -1
             }
         finally:
+            if cgroup:
+                await asyncio.to_thread(cgroup.remove)
+            if self.cgroup_manager:
+                self.cgroup_manager.release_cores(job_id)
             # Cleanup (optional - keep for debugging)
             # shutil.rmtree(job_dir, ignore_errors=True)
-            pass
     
     async def run_python_script(self,
                                 job_id: str,
@@ -0,0 +1,107 @@
+# native_shim/sitecustomize.py
+"""
+Container path remapping for native Python jobs
+
+Marketplace jobs are written for containers and use /input and /output.
+Native jobs get this directory prepended to PYTHONPATH, so Python imports
+it at startup and routes file-system calls on those paths to the job's
+workspace (mapping in NODE3_PATH_MAP, a JSON object of prefix -> directory).
+
+Unlike rewriting the job's source, this also covers paths built at runtime
+(os.path.join('/output', name), f-strings, pathlib) and costs nothing per
+job. Standard library only.
+"""
+
+import builtins
+import importlib.machinery
+import importlib.util
+import io
+import json
+import os
+import sys
+
+_MAP = []  # [(prefix, target)], longest prefix first
+
+
+def remap(path):
+    """Translate a container path to its workspace path (other values pass through)"""
+    if isinstance(path, int) or not _MAP:
+        return path
+    if hasattr(path, '__fspath__'):
+        path = os.fspath(path)
+    if isinstance(path, bytes):
+        mapped = remap(os.fsdecode(path))
+        return os.fsencode(mapped) if isinstance(mapped, str) else path
+    if not isinstance(path, str) or not path.startswith('/'):
+        return path
+    for prefix, target in _MAP:
+        if path == prefix or path.startswith(prefix + '/'):
+            return target + path[len(prefix):]
+    return path
+
+
+def _wrap_first(func):
+    def wrapper(path, *args, **kwargs):
+        return func(remap(path), *args, **kwargs)
+    wrapper.__name__ = getattr(func, '__name__', 'wrapper')
+    wrapper.__doc__ = func.__doc__
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+def _wrap_two(func):
+    def wrapper(src, dst, *args, **kwargs):
+        return func(remap(src), remap(dst), *args, **kwargs)
+    wrapper.__name__ = getattr(func, '__name__', 'wrapper')
+    wrapper.__doc__ = func.__doc__
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+# Functions taking a path first; os.path helpers, shutil and pathlib call these
+_SINGLE_PATH = (
+    'open', 'stat', 'lstat', 'access', 'listdir', 'scandir', 'mkdir', 'makedirs',
+    'rmdir', 'remove', 'unlink', 'chdir', 'chmod', 'utime', 'truncate', 'readlink',
+)
+_TWO_PATHS = ('rename', 'replace', 'link', 'symlink')
+
+
+def install(mapping):
+    """Start remapping the given {prefix: directory} paths in this interpreter"""
+    global _MAP
+    installed = bool(_MAP)
+    _MAP = sorted(
+        ((prefix.rstrip('/'), target.rstrip('/')) for prefix, target in mapping.items() if prefix and target),
+        key=lambda item: len(item[0]),
+        reverse=True
+    )
+    if installed or not _MAP:
+        return
+
+    builtins.open = io.open = _wrap_first(io.open)
+    for name in _SINGLE_PATH:
+        if hasattr(os, name):
+            setattr(os, name, _wrap_first(getattr(os, name)))
+    for name in _TWO_PATHS:
+        if hasattr(os, name):
+            setattr(os, name, _wrap_two(getattr(os, name)))
+
+
+def _chain_next_sitecustomize():
+    """Run a sitecustomize further down sys.path that this module shadows"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    search_path = [p for p in sys.path if os.path.abspath(p or '.') != here]
+    spec = importlib.machinery.PathFinder.find_spec('sitecustomize', search_path)
+    if spec and spec.loader:
+        try:
+            spec.loader.exec_module(importlib.util.module_from_spec(spec))
+        except Exception:
+            pass
+
+
+if __name__ == 'sitecustomize':
+    try:
+        install(json.loads(os.environ.get('NODE3_PATH_MAP', '{}')))
+    except ValueError:
+        pass
+    _chain_next_sitecustomize()
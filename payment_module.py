@@ -5,26 +5,82 @@ from solders.pubkey import Pubkey
 from solders.transaction import VersionedTransaction
 from solders.system_program import TransferParams, transfer
 from solders.message import MessageV0
-from solana.rpc.async_api import AsyncClient
 from solana.rpc.commitment import Confirmed
 from solana.rpc.types import TxOpts
 from typing import Optional, List, Dict
 from loguru import logger
 import os
 import json
+import time
 import asyncio
+from confirmation_tracker import ConfirmationTracker
+from payout_batcher import Payout, PayoutBatcher, PayoutLedger, DEFAULT_LEDGER_PATH
+from rpc_pool import RpcPool
+from wallet_history import WalletHistory
+
+BALANCE_RESUBSCRIBE_MAX_SECONDS = 300
+
+def _websocket_url(rpc_url: str) -> str:
+    """PubSub endpoint of an RPC node (same host, ws/wss scheme)"""
+    if rpc_url.startswith("https://"):
+        return "wss://" + rpc_url[len("https://"):]
+    if rpc_url.startswith("http://"):
+        return "ws://" + rpc_url[len("http://"):]
+    return rpc_url
 
 class PaymentModule:
     """Handle Solana wallet and payments"""
     
     def __init__(self, 
                  rpc_url: str = "https://api.devnet.solana.com",
-                 wallet_path: str = "./wallet.json"):
+                 wallet_path: str = "./wallet.json",
+                 fallback_rpc_urls: Optional[List[str]] = None,
+                 ws_url: Optional[str] = None,
+                 balance_ttl: float = 30.0,
+                 watch_balance: bool = True,
+                 payout_ledger_path: str = str(DEFAULT_LEDGER_PATH),
+                 history_dir: Optional[str] = None,
+                 history_sync_interval: float = 60.0):
+        """
+        Initialize payment module
+        
+        Args:
+            rpc_url: Solana JSON-RPC endpoint
+            wallet_path: Keypair file (created if missing)
+            fallback_rpc_urls: More endpoints for the same cluster; calls go to
+                the fastest healthy one, reads are hedged across them
+            ws_url: PubSub endpoint for balance notifications (default: derived from rpc_url)
+            balance_ttl: Seconds a polled balance is served from cache
+            watch_balance: Keep the cached balance current in the background
+                (accountSubscribe, polling while the subscription is down)
+            payout_ledger_path: Status file for batched payouts (send_payments)
+            history_dir: Directory of the local transaction history index, one
+                SQLite file per wallet (default: ~/.node3-agent/wallet_history)
+            history_sync_interval: Seconds between history index syncs (0 = no index)
+        """
         self.rpc_url = rpc_url
         self.wallet_path = wallet_path
-        self.client = AsyncClient(rpc_url)
+        self.ws_url = ws_url or _websocket_url(rpc_url)
+        self.client = RpcPool([rpc_url] + list(fallback_rpc_urls or []))
         self.keypair: Optional[Keypair] = None
         self.pubkey: Optional[Pubkey] = None
+        # All in-flight transactions share one PubSub connection and batched status polls
+        self.confirmations = ConfirmationTracker(self.client, self.ws_url)
+        self.payout_ledger_path = payout_ledger_path
+        self._payout_batcher: Optional[PayoutBatcher] = None
+        self.history_dir = history_dir
+        self.history_sync_interval = history_sync_interval
+        self.history: Optional[WalletHistory] = None
+        
+        # Cached balance; readers never wait on the RPC while it is fresh
+        self.balance_ttl = balance_ttl
+        self.watch_balance = watch_balance
+        self._balance: Optional[float] = None
+        self._balance_at = 0.0  # time.monotonic() of the last update
+        self._balance_live = False  # True while accountSubscribe pushes every change
+        self._balance_updated = asyncio.Event()
+        self._balance_refresh: Optional[asyncio.Task] = None
+        self._balance_task: Optional[asyncio.Task] = None
         
     async def initialize(self):
         """Initialize or load wallet"""
@@ -34,6 +90,21 @@ class PaymentModule:
         else:
             # Create new wallet
             await self.create_wallet()
+        
+        self.client.start()
+        if self.history_sync_interval > 0 and self.history is None:
+            try:
+                self.history = WalletHistory(
+                    self.client,
+                    str(self.pubkey),
+                    db_path=os.path.join(self.history_dir, f"{self.pubkey}.db") if self.history_dir else None,
+                    sync_interval=self.history_sync_interval
+                )
+                self.history.start()
+            except Exception as e:
+                logger.warning(f"Transaction history index disabled: {e}")
+        if self.watch_balance and self._balance_task is None:
+            self._balance_task = asyncio.create_task(self._watch_balance(), name="balance-watch")
             
     async def create_wallet(self):
         """Create a new Solana wallet"""
@@ -76,21 +147,91 @@ class PaymentModule:
             raise
             
     async def get_balance(self) -> float:
-        """Get wallet balance in SOL"""
+        """Get wallet balance in SOL (cached; refreshed from the RPC only when stale)"""
+        if self._balance is not None and (
+                self._balance_live or time.monotonic() - self._balance_at < self.balance_ttl):
+            return self._balance
+        return await self.refresh_balance()
+        
+    async def refresh_balance(self) -> float:
+        """
+        Fetch the balance from the RPC and update the cache
+        
+        Concurrent callers share one request. On failure the last known
+        balance is returned (0.0 if there is none).
+        """
+        if self._balance_refresh is None or self._balance_refresh.done():
+            self._balance_refresh = asyncio.create_task(self._fetch_balance())
         try:
-            response = await self.client.get_balance(self.pubkey, commitment=Confirmed)
-            balance_lamports = response.value
-            balance_sol = balance_lamports / 1e9  # Convert lamports to SOL
-            
-            logger.info(f"Balance: {balance_sol} SOL")
-            return balance_sol
-            
+            return await asyncio.shield(self._balance_refresh)
         except Exception as e:
             logger.error(f"Failed to get balance: {e}")
-            return 0.0
+            return self._balance if self._balance is not None else 0.0
+            
+    async def _fetch_balance(self) -> float:
+        response = await self.client.get_balance(self.pubkey, commitment=Confirmed)
+        return self._set_balance(response.value)
+        
+    def _set_balance(self, lamports: int) -> float:
+        balance_sol = lamports / 1e9  # Convert lamports to SOL
+        if balance_sol != self._balance:
+            logger.info(f"Balance: {balance_sol} SOL")
+        self._balance = balance_sol
+        self._balance_at = time.monotonic()
+        # Wake everyone waiting for a change, then arm a fresh event
+        self._balance_updated.set()
+        self._balance_updated = asyncio.Event()
+        return balance_sol
+        
+    async def _watch_balance(self):
+        """Keep the cached balance current: accountSubscribe, polling while it is unavailable"""
+        loop = asyncio.get_running_loop()
+        backoff = 1
+        while True:
+            try:
+                await self._subscribe_balance()
+                backoff = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Balance subscription unavailable ({self.ws_url}): {e}")
+            finally:
+                self._balance_live = False
+            
+            # Poll until the next subscription attempt
+            retry_at = loop.time() + backoff
+            while True:
+                await self.refresh_balance()
+                remaining = retry_at - loop.time()
+                if remaining <= 0:
+                    break
+                await asyncio.sleep(min(self.balance_ttl, remaining))
+            backoff = min(backoff * 2, BALANCE_RESUBSCRIBE_MAX_SECONDS)
+            
+    async def _subscribe_balance(self):
+        """Apply accountSubscribe notifications to the cache until the connection drops"""
+        from solana.rpc.websocket_api import connect
+        
+        async with connect(self.ws_url) as websocket:
+            await websocket.account_subscribe(self.pubkey, commitment=Confirmed)
+            await websocket.recv()  # Subscription id
+            # Notifications only carry changes: read the current value once
+            await self.refresh_balance()
+            self._balance_live = True
+            logger.debug("Wallet balance subscription active")
+            async for messages in websocket:
+                for message in messages:
+                    value = getattr(getattr(message, 'result', None), 'value', None)
+                    if value is not None and hasattr(value, 'lamports'):
+                        self._set_balance(value.lamports)
             
     async def get_recent_transactions(self, limit: int = 10) -> List[Dict]:
-        """Get recent transactions for this wallet"""
+        """Get recent transactions for this wallet (from the local index once it has synced)"""
+        if self.history and self.history.last_sync is not None:
+            return [
+                {**tx, 'confirmation_status': 'confirmed'}
+                for tx in self.history.get_page(page=1, page_size=limit)['transactions']
+            ]
         try:
             response = await self.client.get_signatures_for_address(
                 self.pubkey,
@@ -123,25 +264,33 @@ class PaymentModule:
         Returns:
             True if payment received, False otherwise
         """
-        import asyncio
-        start_time = asyncio.get_event_loop().time()
-        initial_balance = await self.get_balance()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        initial_balance = await self.refresh_balance()
         
         logger.info(f"Waiting for payment of {expected_amount} SOL...")
         
         while True:
-            current_time = asyncio.get_event_loop().time()
-            if current_time - start_time > timeout:
-                logger.warning(f"Payment timeout after {timeout}s")
-                return False
-                
             current_balance = await self.get_balance()
             
             if current_balance >= initial_balance + expected_amount:
                 logger.info(f"Payment received: {current_balance - initial_balance} SOL")
                 return True
                 
-            await asyncio.sleep(5)  # Check every 5 seconds
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning(f"Payment timeout after {timeout}s")
+                return False
+                
+            # Woken by the next balance update; re-check at least once per TTL
+            try:
+                await asyncio.wait_for(self._balance_updated.wait(), timeout=min(remaining, self.balance_ttl))
+            except asyncio.TimeoutError:
+                pass
+            
+    def get_rpc_stats(self) -> List[Dict]:
+        """Per-endpoint RPC statistics (health, EWMA latency, requests, errors)"""
+        return self.client.get_stats()
             
     def get_wallet_address(self) -> str:
         """Get wallet public address as string"""
@@ -201,6 +350,8 @@ class PaymentModule:
             
             # Wait for confirmation
             await self._wait_for_confirmation(signature)
+            if not self._balance_live:
+                self._balance_at = 0.0  # Next read refetches instead of serving the pre-send balance
             
             return signature
             
@@ -208,25 +359,28 @@ class PaymentModule:
             logger.error(f"Failed to send payment: {e}")
             return None
     
-    async def _wait_for_confirmation(self, signature: str, max_retries: int = 30):
-        """Wait for transaction confirmation"""
-        for i in range(max_retries):
-            try:
-                response = await self.client.get_signature_statuses([signature])
-                if response.value and response.value[0]:
-                    status = response.value[0]
-                    if status.confirmation_status:
-                        logger.info(f"Transaction confirmed: {signature}")
-                        return True
-                        
-                await asyncio.sleep(2)
-                
-            except Exception as e:
-                logger.warning(f"Error checking confirmation: {e}")
-                await asyncio.sleep(2)
+    async def send_payments(self, payouts: List[Dict]) -> Dict[str, Dict]:
+        """
+        Pay many recipients with as few transactions as possible
         
-        logger.warning(f"Transaction confirmation timeout: {signature}")
-        return False
+        Args:
+            payouts: Dicts with 'recipient', 'amount_sol' and an optional stable
+                'payout_id' (e.g. the job id) that makes retries idempotent
+            
+        Returns:
+            Ledger entry per payout id (recipient, lamports, status, signature)
+        """
+        if self._payout_batcher is None:
+            self._payout_batcher = PayoutBatcher(self, PayoutLedger(self.payout_ledger_path))
+        batch = [Payout.create(p['recipient'], p['amount_sol'], p.get('payout_id')) for p in payouts]
+        results = await self._payout_batcher.pay(batch)
+        if not self._balance_live:
+            self._balance_at = 0.0  # Next read refetches instead of serving the pre-send balance
+        return results
+    
+    async def _wait_for_confirmation(self, signature: str, timeout: float = 60.0) -> bool:
+        """Wait for transaction confirmation"""
+        return await self.confirmations.wait(signature, timeout=timeout)
     
     async def request_airdrop(self, amount_sol: float = 1.0) -> bool:
         """
@@ -263,7 +417,7 @@ class PaymentModule:
             # Wait for confirmation
             await self._wait_for_confirmation(signature)
             
-            new_balance = await self.get_balance()
+            new_balance = await self.refresh_balance()
             logger.info(f"Airdrop successful! New balance: {new_balance} SOL")
             
             return True
@@ -276,6 +430,10 @@ class PaymentModule:
     
     async def get_transaction_details(self, signature: str) -> Optional[Dict]:
         """Get details of a specific transaction"""
+        if self.history:
+            indexed = self.history.get_transaction(signature)
+            if indexed:
+                return indexed
         try:
             response = await self.client.get_transaction(
                 signature,
@@ -301,6 +459,17 @@ class PaymentModule:
             return None
         
     async def close(self):
-        """Close the RPC client"""
+        """Stop background tasks and close the RPC clients"""
+        if self._balance_task:
+            self._balance_task.cancel()
+            try:
+                await self._balance_task
+            except asyncio.CancelledError:
+                pass
+            self._balance_task = None
+        if self.history:
+            await self.history.stop()
+            self.history = None
+        await self.confirmations.stop()
         await self.client.close()
 
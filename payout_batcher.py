@@ -0,0 +1,280 @@
+# payout_batcher.py
+"""
+Batched multi-recipient SOL payouts
+
+Settling many providers one transfer at a time costs a transaction fee, a
+blockhash fetch and a confirmation wait per recipient. PayoutBatcher packs
+as many transfer instructions as fit into each v0 transaction (the 1232-byte
+packet limit, about 20 transfers), signs every batch against one recent
+blockhash, sends the batches concurrently and waits for all confirmations
+together.
+
+Each payout has a stable id (e.g. the job id) and its status is kept in a
+JSON ledger (~/.node3-agent/payouts.json):
+
+    pending -> sent (signature, blockhash expiry) -> confirmed | failed
+
+Re-running a payout list is safe: confirmed payouts are skipped, and a sent
+payout is only retried once its transaction can no longer land (blockhash
+expired without confirmation).
+
+    python payout_batcher.py payouts.csv [--wallet marketplace_wallet.json]
+
+where each CSV line is `recipient,amount_sol[,payout_id]`.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+from solders.hash import Hash
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.system_program import TransferParams, transfer
+from solders.transaction import VersionedTransaction
+from solana.rpc.commitment import Confirmed
+from solana.rpc.core import RPCException
+from solana.rpc.types import TxOpts
+from loguru import logger
+
+DEFAULT_LEDGER_PATH = Path.home() / '.node3-agent' / 'payouts.json'
+PACKET_DATA_SIZE = 1232  # Maximum serialized transaction size
+MAX_CONCURRENT_BATCHES = 4
+CONFIRMATION_TIMEOUT = 90  # A blockhash stays valid for ~150 blocks (60-90s)
+
+
+@dataclass
+class Payout:
+    """One transfer to a recipient"""
+    recipient: str
+    lamports: int
+    payout_id: str
+
+    @classmethod
+    def create(cls, recipient: str, amount_sol: float, payout_id: Optional[str] = None) -> 'Payout':
+        # round(): int() would truncate e.g. 0.3 SOL to 299999999 lamports
+        return cls(recipient, round(amount_sol * 1e9), payout_id or uuid.uuid4().hex)
+
+
+class PayoutLedger:
+    """Per-payout status on disk, rewritten atomically after every change"""
+
+    def __init__(self, path: Path = DEFAULT_LEDGER_PATH):
+        self.path = Path(path)
+        try:
+            self.entries: Dict[str, Dict] = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable payout ledger {self.path}: {e}")
+            self.entries = {}
+
+    def get(self, payout_id: str) -> Optional[Dict]:
+        return self.entries.get(payout_id)
+
+    def update(self, payouts: List[Payout], status: str, **fields):
+        """Set the status (and extra fields) of several payouts in one write"""
+        now = time.time()
+        for payout in payouts:
+            entry = self.entries.setdefault(payout.payout_id, {
+                'recipient': payout.recipient,
+                'lamports': payout.lamports,
+                'created_at': now
+            })
+            entry.update(fields, status=status, updated_at=now)
+        self._save()
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(self.entries, indent=2))
+            tmp.replace(self.path)
+        except OSError as e:
+            logger.warning(f"Could not save payout ledger to {self.path}: {e}")
+
+
+class PayoutBatcher:
+    """Packs transfers into as few transactions as fit and sends them concurrently"""
+
+    def __init__(self,
+                 payment_module,
+                 ledger: Optional[PayoutLedger] = None,
+                 max_concurrent_batches: int = MAX_CONCURRENT_BATCHES):
+        """
+        Initialize batcher
+
+        Args:
+            payment_module: Initialized PaymentModule (wallet, RPC client, confirmations)
+            ledger: Payout status store (default: ~/.node3-agent/payouts.json)
+            max_concurrent_batches: Transactions in flight at once
+        """
+        self.payments = payment_module
+        self.ledger = ledger or PayoutLedger()
+        self.max_concurrent_batches = max_concurrent_batches
+
+    def _compile(self, payouts: List[Payout], blockhash: Hash) -> VersionedTransaction:
+        instructions = [
+            transfer(TransferParams(
+                from_pubkey=self.payments.pubkey,
+                to_pubkey=Pubkey.from_string(payout.recipient),
+                lamports=payout.lamports
+            ))
+            for payout in payouts
+        ]
+        message = MessageV0.try_compile(
+            payer=self.payments.pubkey,
+            instructions=instructions,
+            address_lookup_table_accounts=[],
+            recent_blockhash=blockhash,
+        )
+        return VersionedTransaction(message, [self.payments.keypair])
+
+    def pack(self, payouts: List[Payout]) -> List[List[Payout]]:
+        """Split payouts into batches whose signed transaction fits in one packet"""
+        placeholder = Hash.default()  # Size does not depend on the blockhash
+        batches: List[List[Payout]] = []
+        batch: List[Payout] = []
+        for payout in payouts:
+            if batch and len(bytes(self._compile(batch + [payout], placeholder))) > PACKET_DATA_SIZE:
+                batches.append(batch)
+                batch = []
+            batch.append(payout)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def _outstanding(self, payouts: List[Payout]) -> List[Payout]:
+        """Payouts that still need a transaction (skips confirmed and possibly landing ones)"""
+        outstanding, in_flight = [], {}
+        for payout in payouts:
+            entry = self.ledger.get(payout.payout_id)
+            if entry and entry['status'] == 'confirmed':
+                continue
+            if entry and entry['status'] == 'sent':
+                in_flight.setdefault(entry['signature'], []).append(payout)
+                continue
+            outstanding.append(payout)
+        if not in_flight:
+            return outstanding
+
+        # Sent by an earlier run: wait for it unless its blockhash has expired
+        height = (await self.payments.client.get_block_height(Confirmed)).value
+        for signature, group in in_flight.items():
+            entry = self.ledger.get(group[0].payout_id)
+            if height <= entry.get('last_valid_block_height', 0):
+                if await self.payments.confirmations.wait(signature, timeout=CONFIRMATION_TIMEOUT):
+                    self.ledger.update(group, 'confirmed')
+                else:
+                    logger.warning(f"Payout transaction {signature} still unconfirmed - not resending yet")
+            elif await self._landed(signature):
+                self.ledger.update(group, 'confirmed')
+            else:
+                outstanding.extend(group)  # Expired without landing: can never land now
+        return outstanding
+
+    async def _landed(self, signature: str) -> bool:
+        """Whether a transaction succeeded on chain, however long ago"""
+        response = await self.payments.client.get_signature_statuses(
+            [Signature.from_string(signature)], search_transaction_history=True
+        )
+        status = response.value[0] if response.value else None
+        return status is not None and status.err is None
+
+    async def pay(self, payouts: List[Payout]) -> Dict[str, Dict]:
+        """
+        Send payouts in batched transactions and wait for confirmation
+
+        Args:
+            payouts: Transfers to make; payout_id makes retries idempotent
+
+        Returns:
+            Ledger entry per payout_id (status, signature, error)
+        """
+        todo = await self._outstanding(payouts)
+        if todo:
+            self.ledger.update(todo, 'pending')
+            batches = self.pack(todo)
+            latest = (await self.payments.client.get_latest_blockhash(commitment=Confirmed)).value
+            logger.info(f"Paying {len(todo)} recipients in {len(batches)} transactions")
+
+            # Only the sends are limited: every batch is signed with the one blockhash,
+            # so all of them must go out while it is valid, not after earlier confirmations
+            semaphore = asyncio.Semaphore(self.max_concurrent_batches)
+
+            async def send_and_confirm(batch: List[Payout]):
+                async with semaphore:
+                    signature = await self._send_batch(batch, latest.blockhash, latest.last_valid_block_height)
+                if signature:
+                    await self._confirm_batch(batch, signature)
+
+            await asyncio.gather(*(send_and_confirm(batch) for batch in batches))
+
+        return {payout.payout_id: self.ledger.get(payout.payout_id) for payout in payouts}
+
+    async def _send_batch(self, batch: List[Payout], blockhash: Hash, last_valid_block_height: int) -> Optional[str]:
+        """Sign and send one batch; returns its signature unless preflight rejected it"""
+        tx = self._compile(batch, blockhash)
+        signature = str(tx.signatures[0])
+        # Recorded before sending so a crash mid-send cannot lead to paying twice
+        self.ledger.update(batch, 'sent', signature=signature, last_valid_block_height=last_valid_block_height)
+        try:
+            opts = TxOpts(skip_preflight=False, preflight_commitment=Confirmed)
+            await self.payments.client.send_transaction(tx, opts)
+        except RPCException as e:
+            # Rejected in preflight (e.g. insufficient funds): the transaction never landed
+            logger.error(f"Payout batch of {len(batch)} failed: {e}")
+            self.ledger.update(batch, 'failed', error=str(e))
+            return None
+        except Exception as e:
+            # Timeout or transport error: a node may still have accepted it. It stays
+            # 'sent', so the next run waits for its blockhash to expire before resending
+            logger.error(f"Payout batch {signature} may not have been sent: {e}")
+            self.ledger.update(batch, 'sent', error=str(e))
+        return signature
+
+    async def _confirm_batch(self, batch: List[Payout], signature: str):
+        if await self.payments.confirmations.wait(signature, timeout=CONFIRMATION_TIMEOUT):
+            self.ledger.update(batch, 'confirmed', error=None)
+        else:
+            # Failed on chain, or unconfirmed at expiry; the next run re-checks 'sent' payouts
+            logger.warning(f"Payout batch {signature} not confirmed")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command-line entry point: pay a CSV of recipients"""
+    import argparse
+    import csv
+    from payment_module import PaymentModule
+
+    parser = argparse.ArgumentParser(description="Send batched SOL payouts")
+    parser.add_argument('payouts', type=Path, help="CSV lines: recipient,amount_sol[,payout_id]")
+    parser.add_argument('--wallet', default='./wallet.json', help="Paying wallet")
+    parser.add_argument('--rpc-url', default='https://api.devnet.solana.com')
+    parser.add_argument('--ledger', type=Path, default=DEFAULT_LEDGER_PATH, help="Payout status file")
+    args = parser.parse_args(argv)
+
+    with open(args.payouts, newline='') as f:
+        payouts = [
+            Payout.create(row[0].strip(), float(row[1]), row[2].strip() if len(row) > 2 else None)
+            for row in csv.reader(f) if row and not row[0].startswith('#')
+        ]
+
+    async def run():
+        payments = PaymentModule(rpc_url=args.rpc_url, wallet_path=args.wallet, watch_balance=False)
+        await payments.initialize()
+        try:
+            return await PayoutBatcher(payments, PayoutLedger(args.ledger)).pay(payouts)
+        finally:
+            await payments.close()
+
+    for payout_id, entry in asyncio.run(run()).items():
+        print(f"{payout_id}  {entry['recipient']}  {entry['lamports'] / 1e9} SOL  {entry['status']}")
+
+
+if __name__ == '__main__':
+    main()
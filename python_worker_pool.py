@@ -0,0 +1,241 @@
+# python_worker_pool.py
+"""
+Prefork pool for native `python -c` jobs
+
+Short inline-code jobs spend most of their time starting python3 and
+importing the same modules. The pool keeps a warm template interpreter
+(python_worker_template.py) that has already imported the configured
+modules (numpy, torch, ...). Each job is forked from it and runs in its own
+child process with its own session, working directory, environment and
+rlimits, exactly like a regular native subprocess.
+
+spawn() returns a process object with the same surface the executor uses
+from asyncio subprocesses (stdout/stderr readers, wait(), kill()), so the
+rest of the job path is unchanged.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+
+from python_worker_template import HEADER
+
+TEMPLATE_SCRIPT = Path(__file__).with_name("python_worker_template.py")
+
+
+class PreforkedProcess:
+    """A job running in a child of the template (asyncio.subprocess.Process look-alike)"""
+
+    def __init__(self,
+                 pid: int,
+                 stdout: asyncio.StreamReader,
+                 stderr: asyncio.StreamReader,
+                 status_reader: asyncio.StreamReader,
+                 status_writer: asyncio.StreamWriter):
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode: Optional[int] = None
+        self._status_reader = status_reader
+        self._status_writer = status_writer
+
+    async def wait(self) -> int:
+        """Wait for the job to exit and return its exit code"""
+        if self.returncode is None:
+            line = await self._status_reader.readline()
+            try:
+                self.returncode = json.loads(line)['exit_code']
+            except (ValueError, KeyError):
+                # Template died before reporting - treat like a killed process
+                self.returncode = -signal.SIGKILL
+            self._status_writer.close()
+        return self.returncode
+
+    def kill(self):
+        """Kill the job and anything it started"""
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class PythonWorkerPool:
+    """Warm template interpreter that forks native inline-code jobs"""
+
+    def __init__(self, preload_modules: Optional[List[str]] = None, python: str = "python3"):
+        """
+        Initialize worker pool
+
+        Args:
+            preload_modules: Modules imported once in the template (e.g. ['numpy', 'torch'])
+            python: Interpreter used for the template (same one native jobs use)
+        """
+        self.preload_modules = preload_modules or []
+        self.python = python
+        self._socket_dir = Path(tempfile.mkdtemp(prefix="node3_prefork_"))
+        self.socket_path = self._socket_dir / "template.sock"
+        self._template: Optional[asyncio.subprocess.Process] = None
+        self._start_lock = asyncio.Lock()
+        self.jobs_forked = 0
+        self.restarts = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._template is not None and self._template.returncode is None
+
+    async def start(self) -> bool:
+        """Start the template and wait until its modules are imported"""
+        async with self._start_lock:
+            if self.is_running:
+                return True
+            if self._template is not None:
+                self.restarts += 1
+                logger.warning("Python worker template exited - restarting")
+            self.socket_path.unlink(missing_ok=True)
+
+            try:
+                self._template = await asyncio.create_subprocess_exec(
+                    self.python, str(TEMPLATE_SCRIPT), str(self.socket_path), *self.preload_modules,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    cwd=str(self._socket_dir)
+                )
+                # Importing torch can take a while on a cold disk
+                line = await asyncio.wait_for(self._template.stdout.readline(), timeout=120)
+                info = json.loads(line)
+            except Exception as e:
+                logger.warning(f"Python worker template failed to start: {e}")
+                await self._stop_template()
+                return False
+
+            for module, error in info.get('failed', {}).items():
+                logger.warning(f"Python worker template could not preload {module}: {error}")
+            logger.info(
+                f"Python worker template ready in {info.get('startup_seconds', 0):.2f}s "
+                f"(preloaded: {', '.join(info.get('preloaded', [])) or 'none'})"
+            )
+            return True
+
+    async def spawn(self,
+                    code: str,
+                    env: Dict[str, str],
+                    cwd: Path,
+                    memory_limit_mb: int,
+                    cpu_seconds: int,
+                    cgroup_procs: Optional[str] = None) -> Optional[PreforkedProcess]:
+        """
+        Fork a job from the template
+
+        Args:
+            code: Python source to run (as with python3 -c)
+            env: Complete job environment
+            cwd: Job working directory
+            memory_limit_mb: Address space limit (RLIMIT_AS)
+            cpu_seconds: CPU time limit (RLIMIT_CPU)
+            cgroup_procs: cgroup.procs file the child joins instead of applying rlimits
+
+        Returns:
+            Running process, or None if the template is unavailable (caller
+            falls back to a regular subprocess)
+        """
+        if not self.is_running and not await self.start():
+            return None
+
+        request = json.dumps({
+            'code': code,
+            'env': env,
+            'cwd': str(cwd),
+            'memory_limit_mb': memory_limit_mb,
+            'cpu_seconds': cpu_seconds,
+            'cgroup_procs': cgroup_procs
+        }).encode()
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        try:
+            sock, pid = await asyncio.to_thread(self._submit, request, stdout_w, stderr_w)
+        except Exception as e:
+            logger.warning(f"Could not fork job from Python worker template: {e}")
+            for fd in (stdout_r, stderr_r):
+                os.close(fd)
+            return None
+        finally:
+            # The child holds its own copies of the write ends
+            os.close(stdout_w)
+            os.close(stderr_w)
+
+        status_reader, status_writer = await asyncio.open_unix_connection(sock=sock)
+        self.jobs_forked += 1
+        return PreforkedProcess(
+            pid,
+            await self._pipe_reader(stdout_r),
+            await self._pipe_reader(stderr_r),
+            status_reader,
+            status_writer
+        )
+
+    def _submit(self, request: bytes, stdout_w: int, stderr_w: int):
+        """Send a fork request (blocking) and return the connection and child pid"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(10)
+            sock.connect(str(self.socket_path))
+            socket.send_fds(sock, [HEADER.pack(len(request))], [stdout_w, stderr_w])
+            sock.sendall(request)
+
+            # Read the pid line byte by byte so the exit status stays in the socket
+            line = b''
+            while not line.endswith(b'\n'):
+                chunk = sock.recv(1)
+                if not chunk:
+                    raise ConnectionError("template closed the connection")
+                line += chunk
+            reply = json.loads(line)
+            if 'pid' not in reply:
+                raise RuntimeError(reply.get('error', 'fork failed'))
+            sock.settimeout(None)
+            sock.setblocking(False)
+            return sock, reply['pid']
+        except BaseException:
+            sock.close()
+            raise
+
+    @staticmethod
+    async def _pipe_reader(fd: int) -> asyncio.StreamReader:
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, 'rb', 0))
+        return reader
+
+    def get_stats(self) -> Dict:
+        """Pool statistics"""
+        return {
+            'running': self.is_running,
+            'preload_modules': self.preload_modules,
+            'jobs_forked': self.jobs_forked,
+            'restarts': self.restarts
+        }
+
+    async def _stop_template(self):
+        if self._template and self._template.returncode is None:
+            # Closing stdin tells the template to exit; running jobs keep going
+            self._template.stdin.close()
+            try:
+                await asyncio.wait_for(self._template.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                self._template.kill()
+                await self._template.wait()
+
+    async def close(self):
+        """Stop the template process"""
+        await self._stop_template()
+        self.socket_path.unlink(missing_ok=True)
+        try:
+            self._socket_dir.rmdir()
+        except OSError:
+            pass
@@ -0,0 +1,263 @@
+# python_worker_template.py
+"""
+Warm Python template process for native inline-code jobs
+
+Started by PythonWorkerPool, not imported by the agent. The template imports
+the preload modules once and then serves fork requests on a Unix socket:
+each job runs in a fresh child forked from this already-warm interpreter, so
+it starts in milliseconds instead of paying interpreter startup and imports.
+
+Standard library only - it runs under the job interpreter (python3), which
+may not have the agent's dependencies installed.
+
+Protocol (one connection per job):
+    agent -> template: 8-byte big-endian length with the job's stdout/stderr
+                       pipe fds attached (SCM_RIGHTS), then a JSON request
+                       {code, env, cwd, memory_limit_mb, cpu_seconds,
+                       cgroup_procs}
+    template -> agent: {"pid": <child pid>}\\n once forked
+                       {"exit_code": <code>}\\n when the child exits
+                       (negative signal number if it was killed)
+
+The template never initializes CUDA, so children can still select their GPU
+through CUDA_VISIBLE_DEVICES.
+"""
+
+import atexit
+import gc
+import importlib
+import importlib.util
+import json
+import os
+import resource
+import selectors
+import signal
+import socket
+import struct
+import sys
+import time
+import traceback
+
+HEADER = struct.Struct('>Q')
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+PATH_SHIM = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'native_shim', 'sitecustomize.py')
+
+
+def _load_path_shim():
+    """Load the /input,/output remapping shim (installed per child from its env)"""
+    try:
+        spec = importlib.util.spec_from_file_location('node3_path_shim', PATH_SHIM)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    except Exception:
+        return None
+
+
+path_shim = None
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise EOFError("connection closed")
+        data += chunk
+    return data
+
+
+def _join_cgroup(procs_file) -> bool:
+    if not procs_file:
+        return False
+    try:
+        with open(procs_file, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    except OSError:
+        return False
+
+
+def _run_child(request: dict, stdout_fd: int, stderr_fd: int, close_fds):
+    """Body of the forked job process - never returns"""
+    code = 1
+    namespace = {'__name__': '__main__', '__builtins__': __builtins__}
+    try:
+        # Own session/process group so the agent can kill the whole job
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for fd in close_fds:
+            os.close(fd)
+
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        for fd in (devnull, stdout_fd, stderr_fd):
+            os.close(fd)
+
+        # Same resource limits as a regular native job: its cgroup, or rlimits
+        if not _join_cgroup(request.get('cgroup_procs')):
+            memory_bytes = request['memory_limit_mb'] * 1024 * 1024
+            for limit, value in ((resource.RLIMIT_AS, memory_bytes), (resource.RLIMIT_CPU, request['cpu_seconds'])):
+                try:
+                    resource.setrlimit(limit, (value, value))
+                except (ValueError, OSError):
+                    pass  # Not all systems support this
+
+        os.environ.clear()
+        os.environ.update(request['env'])
+        # A fresh interpreter would have picked this up from PYTHONPATH
+        if path_shim and os.environ.get('NODE3_PATH_MAP'):
+            path_shim.install(json.loads(os.environ['NODE3_PATH_MAP']))
+        os.chdir(request['cwd'])
+        # Behave like `python3 -c`: cwd first on sys.path, no script argv
+        sys.path[0] = ''
+        sys.argv = ['-c']
+
+        try:
+            exec(compile(request['code'], '<string>', 'exec'), namespace)
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+    finally:
+        try:
+            # Shut down like a normal interpreter exit: atexit handlers, then
+            # finalize the job's objects (flushes files it never closed)
+            atexit._run_exitfuncs()
+            namespace.clear()
+            gc.collect()
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+class Template:
+    """Single-threaded fork server (forking from a threaded process is unsafe)"""
+
+    def __init__(self, socket_path: str):
+        self.selector = selectors.DefaultSelector()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        self.listener.listen(64)
+        self.children = {}  # pid -> connection waiting for the exit status
+
+        self.wakeup_r, self.wakeup_w = os.pipe()
+        os.set_blocking(self.wakeup_r, False)
+        os.set_blocking(self.wakeup_w, False)
+        signal.set_wakeup_fd(self.wakeup_w)
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+
+        self.selector.register(self.listener, selectors.EVENT_READ, 'accept')
+        self.selector.register(self.wakeup_r, selectors.EVENT_READ, 'sigchld')
+        # The agent holds our stdin; EOF means it is gone
+        self.selector.register(sys.stdin.fileno(), selectors.EVENT_READ, 'parent')
+
+    def serve(self):
+        while True:
+            for key, _ in self.selector.select():
+                if key.data == 'accept':
+                    conn, _ = self.listener.accept()
+                    self._handle(conn)
+                elif key.data == 'sigchld':
+                    try:
+                        os.read(self.wakeup_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    self._reap()
+                elif not os.read(sys.stdin.fileno(), 4096):
+                    return
+
+    def _handle(self, conn: socket.socket):
+        fds = []
+        try:
+            conn.settimeout(10)
+            header, fds, _flags, _addr = socket.recv_fds(conn, HEADER.size, 2)
+            if len(header) != HEADER.size or len(fds) != 2:
+                raise ValueError("malformed request header")
+            (length,) = HEADER.unpack(header)
+            if length > MAX_REQUEST_BYTES:
+                raise ValueError("request too large")
+            request = json.loads(_recv_exact(conn, length))
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                _run_child(request, fds[0], fds[1],
+                           [conn.fileno(), self.listener.fileno(), self.wakeup_r, self.wakeup_w]
+                           + [c.fileno() for c in self.children.values()])
+
+            self.children[pid] = conn
+            conn.sendall(json.dumps({'pid': pid}).encode() + b'\n')
+        except Exception as e:
+            try:
+                conn.sendall(json.dumps({'error': str(e)}).encode() + b'\n')
+            except OSError:
+                pass
+            conn.close()
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def _reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            conn = self.children.pop(pid, None)
+            if conn is None:
+                continue
+            if os.WIFSIGNALED(status):
+                exit_code = -os.WTERMSIG(status)
+            else:
+                exit_code = os.WEXITSTATUS(status)
+            try:
+                conn.sendall(json.dumps({'exit_code': exit_code}).encode() + b'\n')
+            except OSError:
+                pass  # Agent stopped waiting (job killed or timed out)
+            conn.close()
+
+
+def main():
+    global path_shim
+    path_shim = _load_path_shim()
+    socket_path = sys.argv[1]
+    modules = [m for m in sys.argv[2:] if m]
+
+    start = time.time()
+    preloaded, failed = [], {}
+    for module in modules:
+        try:
+            importlib.import_module(module)
+            preloaded.append(module)
+        except Exception as e:
+            failed[module] = str(e)
+
+    template = Template(socket_path)
+    print(json.dumps({
+        'ready': True,
+        'preloaded': preloaded,
+        'failed': failed,
+        'startup_seconds': round(time.time() - start, 3)
+    }), flush=True)
+    template.serve()
+
+
+if __name__ == '__main__':
+    main()
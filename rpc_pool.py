@@ -0,0 +1,246 @@
+# rpc_pool.py
+"""
+Solana RPC endpoint pool
+
+RpcPool stands in for a single solana AsyncClient (same method names) and
+spreads calls over several endpoints:
+
+    routing   - healthy endpoints ordered by EWMA latency; the fastest gets
+                the traffic, unhealthy ones are a last resort
+    hedging   - idempotent reads that have not answered within about twice
+                the expected latency are also sent to the next endpoint;
+                the first answer wins and the slower request is cancelled
+    failover  - transport errors, timeouts and rate limits (HTTP 429) move
+                the call to the next endpoint; errors returned by a node
+                (RPCException, e.g. a failed preflight) are raised as-is
+    health    - a background getSlot per endpoint refreshes latency and
+                marks endpoints that fail repeatedly or lag behind the
+                others as unhealthy until they recover
+
+Transactions are never hedged, only failed over: resending the same signed
+transaction to another node is deduplicated by its signature.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Confirmed
+from solana.rpc.core import RPCException
+from loguru import logger
+
+HEDGED_METHODS = frozenset({
+    'get_balance', 'get_block_height', 'get_latest_blockhash', 'get_signature_statuses',
+    'get_signatures_for_address', 'get_slot', 'get_transaction'
+})
+EWMA_ALPHA = 0.3
+HEDGE_MIN_DELAY = 0.15  # Seconds before a read is hedged to the next endpoint
+HEDGE_LATENCY_FACTOR = 2.0
+MAX_CONSECUTIVE_FAILURES = 3
+MAX_SLOT_LAG = 150  # Slots behind the best endpoint before it counts as unhealthy
+
+
+class RpcEndpoint:
+    """One RPC node with its client and running statistics"""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.client = AsyncClient(url, timeout=timeout)
+        self.latency: Optional[float] = None  # EWMA of successful call durations (s)
+        self.healthy = True
+        self.failures = 0  # Consecutive
+        self.requests = 0
+        self.errors = 0
+        self.hedge_wins = 0
+        self.slot: Optional[int] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def display_url(self) -> str:
+        """URL without query string (provider API keys usually live there)"""
+        parts = urlsplit(self.url)
+        return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+    def record_latency(self, seconds: float):
+        self.latency = seconds if self.latency is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.latency
+
+    def record_success(self, seconds: float):
+        self.record_latency(seconds)
+        self.failures = 0
+        self.healthy = True
+
+    def record_failure(self, error: Exception):
+        self.errors += 1
+        self.failures += 1
+        self.last_error = str(error) or type(error).__name__
+        if self.failures >= MAX_CONSECUTIVE_FAILURES and self.healthy:
+            self.healthy = False
+            logger.warning(f"RPC endpoint {self.display_url} marked unhealthy: {self.last_error}")
+
+    def get_stats(self) -> Dict:
+        return {
+            'url': self.display_url,
+            'healthy': self.healthy,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'requests': self.requests,
+            'errors': self.errors,
+            'hedge_wins': self.hedge_wins,
+            'slot': self.slot,
+            'last_error': self.last_error
+        }
+
+
+class RpcPool:
+    """Latency-routed, hedged and failing-over calls over several RPC endpoints"""
+
+    def __init__(self,
+                 urls: List[str],
+                 health_interval: float = 30.0,
+                 timeout: float = 10.0):
+        """
+        Initialize pool
+
+        Args:
+            urls: RPC endpoints (the first is preferred until latencies are known)
+            health_interval: Seconds between background health checks
+            timeout: Per-request timeout in seconds
+        """
+        if not urls:
+            raise ValueError("RpcPool needs at least one endpoint")
+        self.endpoints = [RpcEndpoint(url, timeout=timeout) for url in dict.fromkeys(urls)]
+        self.health_interval = health_interval
+        self._health_task: Optional[asyncio.Task] = None
+
+    def __getattr__(self, name: str):
+        # Any other AsyncClient method is routed through the pool
+        if name.startswith('_') or not callable(getattr(AsyncClient, name, None)):
+            raise AttributeError(name)
+
+        async def method(*args, **kwargs):
+            return await self.call(name, *args, **kwargs)
+        return method
+
+    def ranked(self) -> List[RpcEndpoint]:
+        """Healthy endpoints fastest first (unmeasured ones first), then unhealthy ones"""
+        return sorted(self.endpoints, key=lambda e: (not e.healthy, e.latency or 0.0))
+
+    async def call(self, method: str, *args, **kwargs):
+        """Call an AsyncClient method on the best endpoint(s)"""
+        endpoints = self.ranked()
+        if method in HEDGED_METHODS and len(endpoints) > 1:
+            return await self._hedged(endpoints, method, args, kwargs)
+        return await self._failover(endpoints, method, args, kwargs)
+
+    async def _attempt(self, endpoint: RpcEndpoint, method: str, args, kwargs):
+        endpoint.requests += 1
+        start = time.perf_counter()
+        try:
+            result = await getattr(endpoint.client, method)(*args, **kwargs)
+        except RPCException:
+            endpoint.record_success(time.perf_counter() - start)  # The node answered
+            raise
+        except asyncio.CancelledError:
+            # Lost a hedge: it took at least this long, so it ranks behind the winner
+            endpoint.record_latency(time.perf_counter() - start)
+            raise
+        except Exception as e:
+            endpoint.record_failure(e)
+            raise
+        endpoint.record_success(time.perf_counter() - start)
+        return result
+
+    async def _failover(self, endpoints: List[RpcEndpoint], method: str, args, kwargs):
+        last_error: Optional[Exception] = None
+        for endpoint in endpoints:
+            try:
+                return await self._attempt(endpoint, method, args, kwargs)
+            except RPCException:
+                raise
+            except Exception as e:
+                last_error = e
+                logger.debug(f"RPC {method} failed on {endpoint.display_url}: {e}")
+        raise last_error
+
+    async def _hedged(self, endpoints: List[RpcEndpoint], method: str, args, kwargs):
+        best = endpoints[0]
+        delay = max(HEDGE_MIN_DELAY, HEDGE_LATENCY_FACTOR * (best.latency or 0.0))
+        waiting = list(endpoints)
+        running: Dict[asyncio.Task, RpcEndpoint] = {}
+        last_error: Optional[Exception] = None
+
+        def launch():
+            endpoint = waiting.pop(0)
+            task = asyncio.create_task(self._attempt(endpoint, method, args, kwargs))
+            running[task] = endpoint
+
+        launch()
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running, timeout=delay if waiting else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    launch()  # Slow answer: hedge to the next endpoint
+                    continue
+                for task in done:
+                    endpoint = running.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if endpoint is not best:
+                            endpoint.hedge_wins += 1
+                        return task.result()
+                    if isinstance(error, RPCException):
+                        raise error
+                    last_error = error
+                    logger.debug(f"RPC {method} failed on {endpoint.display_url}: {error}")
+                    if waiting:
+                        launch()  # Fail over right away
+            raise last_error
+        finally:
+            for task in running:
+                task.cancel()
+
+    def start(self):
+        """Start background health checks"""
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop(), name="rpc-health")
+
+    async def _health_loop(self):
+        while True:
+            await self.check_health()
+            await asyncio.sleep(self.health_interval)
+
+    async def check_health(self):
+        """Probe every endpoint once (getSlot); mark failing or lagging ones unhealthy"""
+        async def probe(endpoint: RpcEndpoint):
+            try:
+                endpoint.slot = (await self._attempt(endpoint, 'get_slot', (Confirmed,), {})).value
+            except Exception:
+                endpoint.slot = None
+
+        await asyncio.gather(*(probe(endpoint) for endpoint in self.endpoints))
+        slots = [e.slot for e in self.endpoints if e.slot is not None]
+        if not slots:
+            return
+        newest = max(slots)
+        for endpoint in self.endpoints:
+            if endpoint.slot is not None and newest - endpoint.slot > MAX_SLOT_LAG:
+                if endpoint.healthy:
+                    logger.warning(f"RPC endpoint {endpoint.display_url} is {newest - endpoint.slot} slots behind")
+                endpoint.healthy = False
+
+    def get_stats(self) -> List[Dict]:
+        """Per-endpoint statistics, preferred endpoint first"""
+        return [endpoint.get_stats() for endpoint in self.ranked()]
+
+    async def close(self):
+        """Stop health checks and close every client"""
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await asyncio.gather(*(endpoint.client.close() for endpoint in self.endpoints), return_exceptions=True)
@@ -35,6 +35,7 @@ setup(
     entry_points={
         "console_scripts": [
             "node3-agent=main:main_entry",
+            "node3-benchmark=gpu_benchmark:main",
         ],
     },
     python_requires=">=3.10",
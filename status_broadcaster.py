@@ -0,0 +1,187 @@
+# status_broadcaster.py
+"""
+Shared dashboard status stream
+
+One producer task builds the agent status on a fixed cadence (GPU metrics,
+jobs, wallet balance), serializes it once and hands the same string to every
+WebSocket subscriber, so N open dashboard tabs cost one status build instead
+of N RPC/NVML round trips.
+
+Messages (JSON text):
+
+    {"type": "snapshot", "seq": n, "data": {...}}    full status; first message
+                                                      for each subscriber
+    {"type": "delta", "seq": n, "changes": {...}}    only what changed since n-1
+
+Deltas follow JSON merge-patch for objects; lists of the same length are
+patched item by item ({} for unchanged items). When a list changes length a
+snapshot is sent instead. Each subscriber has a bounded queue; a client that
+falls that far behind is dropped and reconnects for a fresh snapshot.
+"""
+
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, Optional, Set
+from loguru import logger
+
+SUBSCRIBER_QUEUE_SIZE = 8
+UNCHANGED = object()
+FULL = object()  # Structure changed - a delta cannot express it
+
+
+def status_delta(old, new):
+    """
+    Changes turning old into new
+
+    Returns:
+        UNCHANGED, FULL (send a snapshot instead) or the patch
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = {}
+        for key, value in new.items():
+            if key not in old:
+                changes[key] = value
+                continue
+            change = status_delta(old[key], value)
+            if change is FULL:
+                return FULL
+            if change is not UNCHANGED:
+                changes[key] = change
+        for key in old.keys() - new.keys():
+            changes[key] = None
+        return changes or UNCHANGED
+    if isinstance(old, list) and isinstance(new, list):
+        if len(old) != len(new):
+            return FULL
+        items, changed = [], False
+        for old_item, new_item in zip(old, new):
+            if isinstance(old_item, dict) and isinstance(new_item, dict):
+                change = status_delta(old_item, new_item)
+                if change is FULL:
+                    return FULL
+                items.append({} if change is UNCHANGED else change)
+                changed = changed or change is not UNCHANGED
+            else:
+                items.append(new_item)
+                changed = changed or old_item != new_item
+        return items if changed else UNCHANGED
+    return UNCHANGED if old == new else new
+
+
+class StatusBroadcaster:
+    """Builds the status once per interval and fans it out to all subscribers"""
+
+    def __init__(self,
+                 build_status: Callable[[], Awaitable[Dict]],
+                 interval: float = 2.0,
+                 queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        """
+        Initialize broadcaster
+
+        Args:
+            build_status: Coroutine function returning the current status dict
+            interval: Seconds between status builds
+            queue_size: Messages buffered per subscriber before it is dropped
+        """
+        self.build_status = build_status
+        self.interval = interval
+        self.queue_size = queue_size
+        self.latest: Optional[Dict] = None  # Last published status (None while nobody listens)
+        self.seq = 0
+        self.dropped_clients = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._needs_snapshot: Set[asyncio.Queue] = set()
+        self._snapshot_message: Optional[str] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="status-broadcaster")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for queue in list(self._subscribers):
+            self._end(queue)
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Register a client; its queue yields message strings, then None when dropped
+
+        The first message is always a snapshot.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        if self.latest is not None:
+            queue.put_nowait(self._snapshot())
+        else:
+            self._needs_snapshot.add(queue)
+        self._wake.set()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        self._needs_snapshot.discard(queue)
+
+    def _snapshot(self) -> str:
+        """Serialized full status (built at most once per published status)"""
+        if self._snapshot_message is None:
+            self._snapshot_message = json.dumps({'type': 'snapshot', 'seq': self.seq, 'data': self.latest}, default=str)
+        return self._snapshot_message
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def _run(self):
+        while True:
+            if not self._subscribers:
+                # Nobody is watching: stop building, and never serve a stale snapshot
+                self.latest = None
+                self._snapshot_message = None
+                self._wake.clear()
+                await self._wake.wait()
+            try:
+                status = await self.build_status()
+            except Exception as e:
+                logger.warning(f"Could not build dashboard status: {e}")
+            else:
+                self._publish(status)
+            await asyncio.sleep(self.interval)
+
+    def _publish(self, status: Dict):
+        # Subscribers only wait for a snapshot while there is none, i.e. previous is None
+        previous = self.latest
+        change = FULL if previous is None else status_delta(previous, status)
+        if change is UNCHANGED:
+            return
+        self.latest = status
+        self.seq += 1
+        self._snapshot_message = None
+        if change is FULL:
+            message = self._snapshot()
+        else:
+            message = json.dumps({'type': 'delta', 'seq': self.seq, 'changes': change}, default=str)
+
+        for queue in list(self._subscribers):
+            outgoing = self._snapshot() if queue in self._needs_snapshot else message
+            try:
+                queue.put_nowait(outgoing)
+            except asyncio.QueueFull:
+                self.dropped_clients += 1
+                logger.debug("Dropping slow dashboard WebSocket client")
+                self._end(queue)
+        self._needs_snapshot.clear()
+
+    def _end(self, queue: asyncio.Queue):
+        """Unsubscribe and tell the client's sender to close"""
+        self.unsubscribe(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
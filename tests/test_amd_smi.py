@@ -0,0 +1,42 @@
+# tests/test_amd_smi.py
+
+from pathlib import Path
+import amd_smi
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+def load(name):
+    return amd_smi.loads((FIXTURES / name).read_text())
+
+def test_parse_devices():
+    """Test AMD enumeration from rocm-smi JSON"""
+    devices = amd_smi.parse_devices(load("rocm_smi_devices.json"))
+    assert [d['card'] for d in devices] == ['card0', 'card1']
+    assert devices[0]['name'] == "AMD Instinct MI210"
+    assert devices[0]['total_memory'] == 68702699520
+    assert devices[1]['uuid'] == "0x1a2b3c4d5e6f7081"
+    assert devices[0]['driver_version'] == "6.3.6"
+
+def test_parse_metrics():
+    """Test live metrics from rocm-smi JSON"""
+    busy, idle = amd_smi.parse_metrics(load("rocm_smi_metrics.json"))
+    assert busy['gpu_utilization'] == 97
+    assert busy['memory_used'] == 25769803776
+    assert busy['memory_utilization'] == 37
+    assert busy['temperature'] == 41.0
+    assert busy['power_usage'] == 212.0
+    assert idle['gpu_utilization'] == 0
+
+def test_parse_metrics_newer_rocm():
+    """Test junction temperature, socket power and percentage-only memory (MI300)"""
+    (card,) = amd_smi.parse_metrics(load("rocm_smi_metrics_mi300.txt"))
+    assert card['temperature'] == 48.0
+    assert card['power_usage'] == 165.0
+    assert card['memory_utilization'] == 6
+    assert card['memory_used'] is None
+
+def test_card_order():
+    """Test cards sort numerically and the system section is skipped"""
+    data = {f"card{i}": {} for i in (10, 2, 0)}
+    data['system'] = {}
+    assert amd_smi.card_keys(data) == ['card0', 'card2', 'card10']
@@ -0,0 +1,43 @@
+# tests/test_confirmation_tracker.py
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("solders")
+
+from confirmation_tracker import ConfirmationTracker
+
+SIGNATURE = "5" * 88
+
+
+def _tracker() -> ConfirmationTracker:
+    tracker = ConfirmationTracker(client=None, ws_url="ws://unused")
+    tracker._start = lambda: None  # Resolved by hand below, no PubSub or polling
+    return tracker
+
+
+def test_timeout_of_one_waiter_does_not_cancel_the_others():
+    async def run():
+        tracker = _tracker()
+        short = asyncio.create_task(tracker.wait(SIGNATURE, timeout=0.05))
+        long = asyncio.create_task(tracker.wait(SIGNATURE, timeout=5))
+        await asyncio.sleep(0.1)
+        assert tracker.pending_count == 1  # Still tracked for the remaining waiter
+        tracker._resolve(SIGNATURE, True, 'pushed')
+        return await asyncio.gather(short, long, return_exceptions=True)
+
+    assert asyncio.run(run()) == [False, True]
+
+
+def test_last_waiter_timing_out_stops_tracking():
+    async def run():
+        tracker = _tracker()
+        results = await asyncio.gather(
+            tracker.wait(SIGNATURE, timeout=0.05),
+            tracker.wait(SIGNATURE, timeout=0.1),
+            return_exceptions=True
+        )
+        return results, tracker.pending_count, tracker._waiters
+
+    assert asyncio.run(run()) == ([False, False], 0, {})
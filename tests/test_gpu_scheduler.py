@@ -0,0 +1,96 @@
+# tests/test_gpu_scheduler.py
+
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from gpu_detector import GPUType
+from gpu_scheduler import GPUScheduler
+
+GB = 1024 ** 3
+
+
+class FakeDetector:
+    """GPUDetector stand-in with fixed devices and optional live free memory"""
+
+    def __init__(self, gpus: List[SimpleNamespace], live_free: Optional[Dict[int, int]] = None):
+        self.gpus = gpus
+        self.live_free = live_free or {}
+
+    def get_gpu_utilization(self, position: int) -> Optional[Dict]:
+        if position in self.live_free:
+            return {'memory_free': self.live_free[position]}
+        return None
+
+
+def _gpu(index: int, total_gb: float, gpu_type: GPUType = GPUType.NVIDIA) -> SimpleNamespace:
+    return SimpleNamespace(index=index, name=f"{gpu_type.value}{index}", gpu_type=gpu_type, total_memory=int(total_gb * GB))
+
+
+def _scheduler(*gpus, live_free=None, **kwargs) -> GPUScheduler:
+    return GPUScheduler(FakeDetector(list(gpus), live_free), memory_headroom=0, **kwargs)
+
+
+def test_small_jobs_pack_onto_fullest_card():
+    scheduler = _scheduler(_gpu(0, 24), _gpu(1, 24))
+    assert scheduler.allocate('a', 4 * GB) == 0
+    # Best fit: the card that already holds a job has the least room left that still fits
+    assert scheduler.allocate('b', 4 * GB) == 0
+    assert scheduler.allocate('c', 4 * GB) == 0
+
+
+def test_large_jobs_spread_to_emptiest_card():
+    scheduler = _scheduler(_gpu(0, 24), _gpu(1, 24))
+    assert scheduler.allocate('small', 4 * GB) == 0
+    assert scheduler.allocate('large', 16 * GB) == 1
+
+
+def test_reservations_bound_placement_until_released():
+    scheduler = _scheduler(_gpu(0, 16))
+    assert scheduler.allocate('a', 10 * GB) == 0
+    assert scheduler.allocate('b', 10 * GB) is None
+    scheduler.release('a')
+    assert scheduler.allocate('b', 10 * GB) == 0
+    assert scheduler.get_stats()[0]['reserved_memory'] == 10 * GB
+
+
+def test_live_free_memory_caps_booked_memory():
+    # Another process uses most of the card even though nothing is reserved
+    scheduler = _scheduler(_gpu(0, 24), live_free={0: 2 * GB})
+    assert scheduler.allocate('a', 4 * GB) is None
+    assert scheduler.allocate('b', 1 * GB) == 0
+
+
+def test_headroom_and_can_ever_fit():
+    scheduler = GPUScheduler(FakeDetector([_gpu(0, 8)]), memory_headroom=1 * GB)
+    assert scheduler.can_ever_fit(7 * GB)
+    assert not scheduler.can_ever_fit(7 * GB + 1)
+    assert scheduler.allocate('a', 7 * GB + 1) is None
+
+
+def test_max_jobs_per_gpu():
+    scheduler = _scheduler(_gpu(0, 24), max_jobs_per_gpu=1)
+    assert scheduler.allocate('a', 1 * GB) == 0
+    assert scheduler.allocate('b', 1 * GB) is None
+
+
+def test_allocate_is_idempotent_per_job():
+    scheduler = _scheduler(_gpu(0, 24), _gpu(1, 24))
+    assert scheduler.allocate('a', 20 * GB) == scheduler.allocate('a', 20 * GB)
+    assert scheduler.get_stats()[0]['jobs'] + scheduler.get_stats()[1]['jobs'] == ['a']
+
+
+def test_same_index_on_different_vendors_are_separate_devices():
+    scheduler = _scheduler(_gpu(0, 8, GPUType.NVIDIA), _gpu(0, 8, GPUType.AMD))
+    assert len(scheduler.slots) == 2
+    assert scheduler.allocate('a', 6 * GB) == 0
+    assert scheduler.allocate('b', 6 * GB) == 0
+
+    vendors = {scheduler.assigned_slot(job).gpu_type for job in ('a', 'b')}
+    assert vendors == {GPUType.NVIDIA, GPUType.AMD}
+    env = {job: scheduler.visible_devices_env(job) for job in ('a', 'b')}
+    assert sorted('CUDA_VISIBLE_DEVICES' in e for e in env.values()) == [False, True]
+    assert any(e.get('ROCR_VISIBLE_DEVICES') == '0' for e in env.values())
+
+
+def test_visible_devices_env_unknown_job():
+    assert _scheduler(_gpu(0, 8)).visible_devices_env('missing') == {}
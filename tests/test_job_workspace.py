@@ -0,0 +1,23 @@
+# tests/test_job_workspace.py
+
+import pytest
+
+from job_workspace import JobWorkspace, is_valid_job_id
+
+
+@pytest.mark.parametrize("job_id", ["job-1", "3f2b9c1e-77aa-4d1e-9a52-0c6f1d2e8b11", "run_2.v1"])
+def test_valid_job_ids(job_id):
+    assert is_valid_job_id(job_id)
+
+
+@pytest.mark.parametrize("job_id", [
+    "", ".", "..", "../etc", "/etc/passwd", "a/b", "a\\b", "job 1", "x" * 129, None, 42
+])
+def test_invalid_job_ids(job_id):
+    assert not is_valid_job_id(job_id)
+
+
+def test_for_job_stays_inside_work_dir(tmp_path):
+    assert JobWorkspace.for_job("job-1", tmp_path).root == tmp_path / "job-1"
+    with pytest.raises(ValueError):
+        JobWorkspace.for_job("../outside", tmp_path)
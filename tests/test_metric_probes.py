@@ -0,0 +1,32 @@
+# tests/test_metric_probes.py
+
+import asyncio
+import sys
+
+from metric_probes import IoregTemperatureParser, SubprocessProbe, read_lines
+
+
+def _lines(data: bytes, max_line: int):
+    async def collect():
+        stream = asyncio.StreamReader()
+        stream.feed_data(data)
+        stream.feed_eof()
+        return [line async for line in read_lines(stream, max_line)]
+    return asyncio.run(collect())
+
+
+def test_read_lines_splits_and_keeps_last_partial_line():
+    assert _lines(b"a\nbb\nccc", 100) == [b"a\n", b"bb\n", b"ccc"]
+
+
+def test_read_lines_truncates_overlong_lines_and_continues():
+    data = b"x" * 300_000 + b"\nafter\n"
+    lines = _lines(data, 1000)
+    assert lines == [b"x" * 1000, b"after\n"]
+
+
+def test_probe_survives_lines_longer_than_stream_limit():
+    # ioreg -l -w 0 prints property lines far beyond asyncio's 64 KiB default
+    script = 'print("x" * 200000); print(\'"Temperature" = 61\')'
+    probe = SubprocessProbe('ioreg', [sys.executable, '-c', script], IoregTemperatureParser, timeout=30)
+    assert asyncio.run(probe.run_once()) == {'temperature': 61.0}
@@ -0,0 +1,27 @@
+# tests/test_metrics_history.py
+
+import time
+from metrics_history import MetricsHistory
+
+
+def test_pick_tier_by_age_of_start():
+    history = MetricsHistory(raw_interval=1.0, raw_seconds=3600, minute_capacity=24 * 60)
+    now = 1_000_000.0
+    assert history._pick_tier(now - 600, now) == 'raw'
+    assert history._pick_tier(now - 3600, now) == 'raw'
+    assert history._pick_tier(now - 2 * 3600, now) == 'minute'
+    assert history._pick_tier(now - 24 * 3600, now) == 'minute'
+    assert history._pick_tier(now - 2 * 24 * 3600, now) == 'hour'
+
+
+def test_short_window_older_than_raw_retention_uses_minutes():
+    # A 5-minute window two hours ago is short, but raw samples that old are gone
+    history = MetricsHistory(raw_interval=10.0, raw_seconds=3600, minute_capacity=24 * 60)
+    now = time.time()
+    for t in range(int(now) - 3 * 3600, int(now), 10):
+        history.record('gpu0', {'gpu_utilization': 50.0}, timestamp=float(t))
+
+    result = history.query('gpu0', start=now - 2 * 3600, end=now - 2 * 3600 + 300)
+    assert result['resolution'] == 'minute'
+    assert result['timestamps']
+    assert all(v == 50.0 for v in result['series']['gpu_utilization'])
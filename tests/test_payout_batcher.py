@@ -0,0 +1,109 @@
+# tests/test_payout_batcher.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("solders")
+
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.signature import Signature
+
+from payout_batcher import PACKET_DATA_SIZE, Payout, PayoutBatcher, PayoutLedger
+
+
+class FakeClient:
+    def __init__(self, block_height: int = 1000, landed=()):
+        self.block_height = block_height
+        self.landed = set(landed)
+
+    async def get_block_height(self, commitment=None):
+        return SimpleNamespace(value=self.block_height)
+
+    async def get_signature_statuses(self, signatures, search_transaction_history=False):
+        return SimpleNamespace(value=[
+            SimpleNamespace(err=None) if str(s) in self.landed else None for s in signatures
+        ])
+
+
+class FakeConfirmations:
+    def __init__(self, confirmed=()):
+        self.confirmed = set(confirmed)
+        self.waited = []
+
+    async def wait(self, signature, timeout=60.0):
+        self.waited.append(signature)
+        return signature in self.confirmed
+
+
+def _batcher(tmp_path, client=None, confirmations=None) -> PayoutBatcher:
+    keypair = Keypair()
+    payments = SimpleNamespace(
+        keypair=keypair,
+        pubkey=keypair.pubkey(),
+        client=client or FakeClient(),
+        confirmations=confirmations or FakeConfirmations()
+    )
+    return PayoutBatcher(payments, PayoutLedger(tmp_path / "payouts.json"))
+
+
+def _payouts(count: int):
+    return [Payout.create(str(Keypair().pubkey()), 0.001, f"job-{i}") for i in range(count)]
+
+
+def test_pack_fills_packets_in_order(tmp_path):
+    batcher = _batcher(tmp_path)
+    payouts = _payouts(60)
+    batches = batcher.pack(payouts)
+
+    assert len(batches) > 1
+    assert [p for batch in batches for p in batch] == payouts
+    for batch in batches:
+        assert len(bytes(batcher._compile(batch, Hash.default()))) <= PACKET_DATA_SIZE
+    for batch, following in zip(batches, batches[1:]):
+        # Each full batch had no room for the next payout
+        assert len(bytes(batcher._compile(batch + following[:1], Hash.default()))) > PACKET_DATA_SIZE
+
+
+def test_pack_single_payout(tmp_path):
+    payouts = _payouts(1)
+    assert _batcher(tmp_path).pack(payouts) == [payouts]
+
+
+def test_outstanding_skips_confirmed_and_keeps_new(tmp_path):
+    batcher = _batcher(tmp_path)
+    done, failed, new = _payouts(3)
+    batcher.ledger.update([done], 'confirmed')
+    batcher.ledger.update([failed], 'failed', error='insufficient funds')
+
+    assert asyncio.run(batcher._outstanding([done, failed, new])) == [failed, new]
+
+
+def test_outstanding_waits_for_unexpired_sent_batches(tmp_path):
+    landing, stuck = str(Signature.new_unique()), str(Signature.new_unique())
+    confirmations = FakeConfirmations(confirmed={landing})
+    batcher = _batcher(tmp_path, client=FakeClient(block_height=1000), confirmations=confirmations)
+    a, b = _payouts(2)
+    batcher.ledger.update([a], 'sent', signature=landing, last_valid_block_height=1100)
+    batcher.ledger.update([b], 'sent', signature=stuck, last_valid_block_height=1100)
+
+    # Neither is resent while its blockhash is still valid
+    assert asyncio.run(batcher._outstanding([a, b])) == []
+    assert sorted(confirmations.waited) == sorted([landing, stuck])
+    assert batcher.ledger.get(a.payout_id)['status'] == 'confirmed'
+    assert batcher.ledger.get(b.payout_id)['status'] == 'sent'
+
+
+def test_outstanding_resends_expired_batches_that_never_landed(tmp_path):
+    landed, lost = str(Signature.new_unique()), str(Signature.new_unique())
+    confirmations = FakeConfirmations()
+    batcher = _batcher(tmp_path, client=FakeClient(block_height=2000, landed={landed}), confirmations=confirmations)
+    a, b, c = _payouts(3)
+    batcher.ledger.update([a], 'sent', signature=landed, last_valid_block_height=1100)
+    batcher.ledger.update([b, c], 'sent', signature=lost, last_valid_block_height=1100)
+
+    assert asyncio.run(batcher._outstanding([a, b, c])) == [b, c]
+    assert confirmations.waited == []
+    assert batcher.ledger.get(a.payout_id)['status'] == 'confirmed'
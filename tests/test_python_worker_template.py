@@ -0,0 +1,52 @@
+# tests/test_python_worker_template.py
+
+import os
+import sys
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason="Forked workers need POSIX")
+
+from python_worker_template import _run_child
+
+
+def _run(code: str, cwd: str) -> int:
+    """Run code the way the template does and return its exit status"""
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(stdout_r)
+        os.close(stderr_r)
+        _run_child({
+            'code': code,
+            'env': {'PATH': os.environ.get('PATH', '')},
+            'cwd': cwd,
+            'memory_limit_mb': 4096,
+            'cpu_seconds': 60,
+            'cgroup_procs': None
+        }, stdout_w, stderr_w, [])
+    os.close(stdout_w)
+    os.close(stderr_w)
+    _, status = os.waitpid(pid, 0)
+    os.close(stdout_r)
+    os.close(stderr_r)
+    return os.waitstatus_to_exitcode(status)
+
+
+def test_unclosed_file_is_flushed(tmp_path):
+    """Like `python3 -c`, files the job never closed are flushed at exit"""
+    out = tmp_path / 'out.txt'
+    code = f"def g(): pass\nf = open({str(out)!r}, 'w')\nf.write('hello')\n"
+    assert _run(code, str(tmp_path)) == 0
+    assert out.read_text() == 'hello'
+
+
+def test_atexit_handlers_run(tmp_path):
+    out = tmp_path / 'atexit.txt'
+    code = f"import atexit\natexit.register(lambda: open({str(out)!r}, 'w').write('done'))\n"
+    assert _run(code, str(tmp_path)) == 0
+    assert out.read_text() == 'done'
+
+
+def test_exit_code(tmp_path):
+    assert _run("import sys\nsys.exit(3)\n", str(tmp_path)) == 3
@@ -0,0 +1,48 @@
+# tests/test_status_broadcaster.py
+
+import asyncio
+import json
+
+from status_broadcaster import FULL, UNCHANGED, StatusBroadcaster, status_delta
+
+
+def test_status_delta_unchanged():
+    status = {'gpus': [{'util': 10}], 'jobs': {'active': 1}}
+    assert status_delta(status, json.loads(json.dumps(status))) is UNCHANGED
+
+
+def test_status_delta_merge_patch_for_objects():
+    old = {'wallet': {'balance': 1.0, 'address': 'abc'}, 'stale': 1}
+    new = {'wallet': {'balance': 2.0, 'address': 'abc'}, 'added': True}
+    assert status_delta(old, new) == {'wallet': {'balance': 2.0}, 'added': True, 'stale': None}
+
+
+def test_status_delta_patches_same_length_lists_per_item():
+    old = {'gpus': [{'util': 10, 'temp': 50}, {'util': 20, 'temp': 60}], 'tags': ['a', 'b']}
+    new = {'gpus': [{'util': 10, 'temp': 50}, {'util': 30, 'temp': 60}], 'tags': ['a', 'c']}
+    assert status_delta(old, new) == {'gpus': [{}, {'util': 30}], 'tags': ['a', 'c']}
+
+
+def test_status_delta_list_length_change_needs_snapshot():
+    assert status_delta({'jobs': [{'id': 1}]}, {'jobs': [{'id': 1}, {'id': 2}]}) is FULL
+    assert status_delta({'a': {'b': [1]}}, {'a': {'b': [1, 2]}}) is FULL
+
+
+def test_status_delta_scalar_and_type_changes():
+    assert status_delta(1, 2) == 2
+    assert status_delta({'a': 1}, {'a': {'b': 2}}) == {'a': {'b': 2}}
+    assert status_delta({'a': None}, {'a': None}) is UNCHANGED
+
+
+def test_publish_sends_snapshot_then_deltas():
+    async def run():
+        broadcaster = StatusBroadcaster(build_status=None)
+        queue = broadcaster.subscribe()
+        broadcaster._publish({'cpu': 1, 'gpus': [{'util': 5}]})
+        broadcaster._publish({'cpu': 1, 'gpus': [{'util': 5}]})  # Unchanged: nothing sent
+        broadcaster._publish({'cpu': 2, 'gpus': [{'util': 5}]})
+        return [json.loads(queue.get_nowait()) for _ in range(queue.qsize())]
+
+    snapshot, delta = asyncio.run(run())
+    assert snapshot == {'type': 'snapshot', 'seq': 1, 'data': {'cpu': 1, 'gpus': [{'util': 5}]}}
+    assert delta == {'type': 'delta', 'seq': 2, 'changes': {'cpu': 2}}
@@ -0,0 +1,84 @@
+# tests/test_wallet_history.py
+
+import pytest
+
+pytest.importorskip("solders")
+
+from wallet_history import WalletHistory, extract_transfers, memo_mentions
+
+WALLET = "Wa11et1111111111111111111111111111111111111"
+OTHER = "0ther11111111111111111111111111111111111111"
+
+
+def _transfer(source, destination, lamports, kind='transfer', program='system'):
+    return {
+        'program': program,
+        'parsed': {'type': kind, 'info': {'source': source, 'destination': destination, 'lamports': lamports}}
+    }
+
+
+def test_extract_transfers_directions_and_inner_instructions():
+    tx = {
+        'transaction': {'message': {'instructions': [
+            _transfer(OTHER, WALLET, 1_000),
+            _transfer(WALLET, OTHER, 2_000),
+            _transfer(OTHER, OTHER, 3_000),  # Not ours
+            {'program': 'spl-memo', 'parsed': 'job-1'}
+        ]}},
+        'meta': {'innerInstructions': [
+            {'instructions': [_transfer(WALLET, WALLET, 4_000, kind='transferWithSeed')]}
+        ]}
+    }
+    assert extract_transfers(tx, WALLET) == [
+        {'source': OTHER, 'destination': WALLET, 'lamports': 1_000, 'direction': 'in'},
+        {'source': WALLET, 'destination': OTHER, 'lamports': 2_000, 'direction': 'out'},
+        {'source': WALLET, 'destination': WALLET, 'lamports': 4_000, 'direction': 'self'}
+    ]
+
+
+def test_extract_transfers_ignores_other_programs_and_missing_meta():
+    tx = {
+        'transaction': {'message': {'instructions': [
+            _transfer(OTHER, WALLET, 1_000, program='spl-token'),
+            _transfer(OTHER, WALLET, 1_000, kind='createAccount')
+        ]}},
+        'meta': None
+    }
+    assert extract_transfers(tx, WALLET) == []
+
+
+@pytest.mark.parametrize("memo, expected", [
+    ("[5] job-1", True),
+    ("[6] job-12", False),
+    ("[7] xjob-1", False),
+    ("[16] payment for job-1", True),
+    ("[5] other; [5] job-1", True),
+    (None, False)
+])
+def test_memo_mentions_whole_job_id(memo, expected):
+    assert memo_mentions(memo, "job-1") is expected
+
+
+def test_memo_mentions_ignores_length_prefix():
+    assert not memo_mentions("[5] hello", "5")
+
+
+def test_match_job_payments_by_memo_does_not_match_longer_id(tmp_path):
+    history = WalletHistory(client=None, wallet=WALLET, db_path=tmp_path / "history.db")
+    for slot, (signature, memo) in enumerate([("sig12", "[6] job-12"), ("sig1", "[5] job-1")]):
+        history.db.execute(
+            "INSERT INTO signatures (signature, slot, block_time, err, memo, parsed) VALUES (?, ?, ?, NULL, ?, 1)",
+            (signature, slot, 1_700_000_000 + slot, memo)
+        )
+        history.db.execute(
+            "INSERT INTO transfers (signature, position, source, destination, lamports, direction) "
+            "VALUES (?, 0, ?, ?, ?, 'in')",
+            (signature, OTHER, WALLET, 1_000_000)
+        )
+    history.db.commit()
+
+    matches = history.match_job_payments([{'job_id': 'job-1'}, {'job_id': 'job-12'}])
+    assert matches['job-1']['signature'] == 'sig1'
+    assert matches['job-12']['signature'] == 'sig12'
+    assert matches['job-1']['matched_by'] == 'memo'
+    history.db.close()
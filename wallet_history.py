@@ -0,0 +1,469 @@
+# wallet_history.py
+"""
+Local index of the wallet's transaction history
+
+Signatures and the SOL transfers they contain are kept in SQLite
+(~/.node3-agent/wallet_history/<address>.db) so the dashboard can page through
+history, total earnings and match payments to jobs without touching the
+RPC. A background sync keeps the index current with getSignaturesForAddress
+cursors:
+
+    forward   - `until` the newest indexed signature, paging with `before`
+                until the gap is closed (new activity)
+    backfill  - `before` the oldest indexed signature, one page per sync
+                until the start of the wallet's history is reached
+    details   - getTransaction (jsonParsed) for a bounded number of
+                not yet parsed signatures per sync
+
+System-program transfers (top-level and inner instructions) to or from
+the wallet are recorded; other instructions are ignored.
+"""
+
+import asyncio
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solana.rpc.commitment import Confirmed
+from loguru import logger
+
+DEFAULT_HISTORY_DIR = Path.home() / '.node3-agent' / 'wallet_history'
+SIGNATURE_PAGE_SIZE = 1000  # getSignaturesForAddress maximum
+DETAILS_PER_SYNC = 50
+PAYMENT_MATCH_WINDOW = 24 * 3600  # Seconds after job completion a payment may arrive
+PAYMENT_MATCH_EARLY = 300  # Seconds a payment may precede the recorded completion
+MEMO_LENGTH_PREFIX = re.compile(r'(^|; )\[\d+\] ')  # getSignaturesForAddress: "[len] memo; [len] memo"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    signature TEXT PRIMARY KEY,
+    slot INTEGER NOT NULL,
+    block_time INTEGER,
+    err TEXT,
+    memo TEXT,
+    fee INTEGER,
+    parsed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS signatures_slot ON signatures (slot DESC);
+CREATE TABLE IF NOT EXISTS transfers (
+    signature TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    source TEXT,
+    destination TEXT,
+    lamports INTEGER NOT NULL,
+    direction TEXT NOT NULL,
+    PRIMARY KEY (signature, position)
+);
+CREATE TABLE IF NOT EXISTS job_payments (
+    job_id TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    matched_by TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def extract_transfers(tx: Dict, wallet: str) -> List[Dict]:
+    """
+    SOL transfers to or from wallet in one transaction
+
+    Args:
+        tx: The 'transaction' entry of a jsonParsed getTransaction result
+            (its 'transaction' and 'meta')
+        wallet: Wallet address (base58)
+
+    Returns:
+        Dicts with source, destination, lamports and direction ('in', 'out'
+        or 'self'), in instruction order
+    """
+    instructions = list(tx.get('transaction', {}).get('message', {}).get('instructions', []))
+    for inner in (tx.get('meta') or {}).get('innerInstructions') or []:
+        instructions.extend(inner.get('instructions', []))
+
+    transfers = []
+    for instruction in instructions:
+        parsed = instruction.get('parsed')
+        if instruction.get('program') != 'system' or not isinstance(parsed, dict):
+            continue
+        if parsed.get('type') not in ('transfer', 'transferWithSeed'):
+            continue
+        info = parsed.get('info', {})
+        source, destination = info.get('source'), info.get('destination')
+        if wallet not in (source, destination):
+            continue
+        if source == destination:
+            direction = 'self'
+        else:
+            direction = 'in' if destination == wallet else 'out'
+        transfers.append({
+            'source': source,
+            'destination': destination,
+            'lamports': int(info.get('lamports', 0)),
+            'direction': direction
+        })
+    return transfers
+
+
+def memo_mentions(memo: Optional[str], job_id: str) -> bool:
+    """
+    Whether a transaction memo names a job as a whole token
+
+    'job-1' matches 'job-1' and 'paid job-1, thanks' but not 'job-12'.
+
+    Args:
+        memo: Memo as returned by getSignaturesForAddress (each memo prefixed
+            with its length, e.g. "[5] job-1")
+        job_id: Job identifier
+    """
+    if not memo:
+        return False
+    text = MEMO_LENGTH_PREFIX.sub(r'\1', memo)
+    return re.search(rf'(?<![\w-]){re.escape(job_id)}(?![\w-])', text) is not None
+
+
+class WalletHistory:
+    """SQLite index of the wallet's signatures and transfers, synced in the background"""
+
+    def __init__(self,
+                 client,
+                 wallet: str,
+                 db_path: Optional[Path] = None,
+                 sync_interval: float = 60.0):
+        """
+        Initialize history index
+
+        Args:
+            client: solana AsyncClient (or RpcPool) used for syncing
+            wallet: Wallet address (base58) whose history is indexed
+            db_path: SQLite database file (default: one per wallet in ~/.node3-agent/wallet_history)
+            sync_interval: Seconds between background syncs
+        """
+        self.client = client
+        self.wallet = wallet
+        self.sync_interval = sync_interval
+        self.last_sync: Optional[float] = None
+        self._sync_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        db_path = Path(db_path) if db_path else DEFAULT_HISTORY_DIR / f"{wallet}.db"
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(db_path))
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        if self._state('wallet') != wallet:
+            # A different wallet: the index belongs to the old one
+            self.db.executescript(
+                "DELETE FROM signatures; DELETE FROM transfers; DELETE FROM job_payments; DELETE FROM sync_state;"
+            )
+            self._set_state('wallet', wallet)
+        self.db.commit()
+
+    def _state(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_state(self, key: str, value: Optional[str]):
+        self.db.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def start(self):
+        """Start background syncing"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="wallet-history")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.db.close()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"Wallet history sync failed: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def sync(self):
+        """Index new signatures, one page of older ones, and pending transfer details"""
+        async with self._sync_lock:
+            await self._sync_forward()
+            if self._state('backfill_done') != '1':
+                await self._sync_backfill()
+            await self._sync_details()
+            self.last_sync = time.time()
+
+    async def _fetch_signatures(self, before: Optional[str] = None, until: Optional[str] = None) -> List:
+        response = await self.client.get_signatures_for_address(
+            Pubkey.from_string(self.wallet),
+            before=Signature.from_string(before) if before else None,
+            until=Signature.from_string(until) if until else None,
+            limit=SIGNATURE_PAGE_SIZE,
+            commitment=Confirmed
+        )
+        return response.value or []
+
+    def _store_signatures(self, entries: List):
+        self.db.executemany(
+            "INSERT OR IGNORE INTO signatures (signature, slot, block_time, err, memo) VALUES (?, ?, ?, ?, ?)",
+            [
+                (str(e.signature), e.slot, e.block_time, str(e.err) if e.err is not None else None, e.memo)
+                for e in entries
+            ]
+        )
+
+    async def _sync_forward(self):
+        newest = self._state('newest')
+        pages, before = [], None
+        while True:
+            page = await self._fetch_signatures(before=before, until=newest)
+            pages.extend(page)
+            # First sync: one page here, older history comes from the backfill
+            if len(page) < SIGNATURE_PAGE_SIZE or newest is None:
+                break
+            before = str(page[-1].signature)
+        if not pages:
+            return
+        # The cursor moves only once the whole gap is stored
+        self._store_signatures(pages)
+        self._set_state('newest', str(pages[0].signature))
+        if newest is None:
+            self._set_state('oldest', str(pages[-1].signature))
+            if len(pages) < SIGNATURE_PAGE_SIZE:
+                self._set_state('backfill_done', '1')  # The whole history fit
+        self.db.commit()
+        logger.debug(f"Indexed {len(pages)} new wallet signatures")
+
+    async def _sync_backfill(self):
+        oldest = self._state('oldest')
+        if oldest is None:
+            return  # No history yet
+        page = await self._fetch_signatures(before=oldest)
+        self._store_signatures(page)
+        if page:
+            self._set_state('oldest', str(page[-1].signature))
+        if len(page) < SIGNATURE_PAGE_SIZE:
+            self._set_state('backfill_done', '1')
+        self.db.commit()
+
+    async def _sync_details(self):
+        rows = self.db.execute(
+            "SELECT signature FROM signatures WHERE parsed = 0 ORDER BY slot DESC LIMIT ?", (DETAILS_PER_SYNC,)
+        ).fetchall()
+        for row in rows:
+            signature = row['signature']
+            response = await self.client.get_transaction(
+                Signature.from_string(signature),
+                encoding="jsonParsed",
+                commitment=Confirmed,
+                max_supported_transaction_version=0
+            )
+            if response.value is None:
+                continue  # Not available from this node yet; retried next sync
+            tx = json.loads(response.value.to_json())
+            meta = tx.get('transaction', {}).get('meta') or {}
+            transfers = extract_transfers(tx.get('transaction', {}), self.wallet)
+            self.db.executemany(
+                "INSERT OR REPLACE INTO transfers (signature, position, source, destination, lamports, direction) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (signature, position, t['source'], t['destination'], t['lamports'], t['direction'])
+                    for position, t in enumerate(transfers)
+                ]
+            )
+            self.db.execute(
+                "UPDATE signatures SET parsed = 1, fee = ?, block_time = COALESCE(block_time, ?) WHERE signature = ?",
+                (meta.get('fee'), tx.get('blockTime'), signature)
+            )
+            self.db.commit()
+
+    def get_page(self, page: int = 1, page_size: int = 50, direction: Optional[str] = None) -> Dict:
+        """
+        One page of history, newest first
+
+        Args:
+            page: 1-based page number
+            page_size: Signatures per page (max 500)
+            direction: Only signatures with a transfer in this direction ('in' or 'out')
+
+        Returns:
+            Dict with 'transactions' (signature, slot, block_time, status, fee,
+            memo, transfers) and 'total'
+        """
+        page_size = max(1, min(page_size, 500))
+        where, params = "", []
+        if direction:
+            where = "WHERE signature IN (SELECT signature FROM transfers WHERE direction = ?)"
+            params.append(direction)
+        total = self.db.execute(f"SELECT COUNT(*) FROM signatures {where}", params).fetchone()[0]
+        rows = self.db.execute(
+            f"SELECT * FROM signatures {where} ORDER BY slot DESC, signature LIMIT ? OFFSET ?",
+            params + [page_size, (max(page, 1) - 1) * page_size]
+        ).fetchall()
+
+        transfers: Dict[str, List[Dict]] = {}
+        signatures = [row['signature'] for row in rows]
+        if signatures:
+            placeholders = ",".join("?" * len(signatures))
+            for t in self.db.execute(
+                f"SELECT * FROM transfers WHERE signature IN ({placeholders}) ORDER BY position", signatures
+            ):
+                transfers.setdefault(t['signature'], []).append({
+                    'source': t['source'],
+                    'destination': t['destination'],
+                    'amount': t['lamports'] / 1e9,
+                    'direction': t['direction']
+                })
+        return {
+            'page': page,
+            'page_size': page_size,
+            'total': total,
+            'transactions': [self._transaction(row, transfers.get(row['signature'], [])) for row in rows]
+        }
+
+    def get_transaction(self, signature: str) -> Optional[Dict]:
+        """Indexed details of one signature (None if not indexed or not parsed yet)"""
+        row = self.db.execute("SELECT * FROM signatures WHERE signature = ? AND parsed = 1", (signature,)).fetchone()
+        return self._transaction(row, []) if row else None
+
+    @staticmethod
+    def _transaction(row: sqlite3.Row, transfers: List[Dict]) -> Dict:
+        return {
+            'signature': row['signature'],
+            'slot': row['slot'],
+            'block_time': row['block_time'],
+            'fee': row['fee'] or 0,
+            'status': 'success' if row['err'] is None else 'failed',
+            'memo': row['memo'],
+            'transfers': transfers
+        }
+
+    def get_earnings(self, since: Optional[float] = None) -> Dict:
+        """
+        Totals over successful transfers (SOL)
+
+        Args:
+            since: Only count transactions at or after this unix time
+
+        Returns:
+            Dict with received, sent, fees, payments (incoming transfer count)
+            and today's received amount
+        """
+        clause, params = "s.err IS NULL", []
+        if since is not None:
+            clause += " AND s.block_time >= ?"
+            params.append(since)
+        sums = {
+            row['direction']: (row['lamports'], row['count'])
+            for row in self.db.execute(
+                f"SELECT t.direction, SUM(t.lamports) AS lamports, COUNT(*) AS count FROM transfers t "
+                f"JOIN signatures s ON s.signature = t.signature WHERE {clause} GROUP BY t.direction",
+                params
+            )
+        }
+        fees = self.db.execute(
+            "SELECT COALESCE(SUM(fee), 0) FROM signatures s WHERE fee IS NOT NULL AND s.signature IN "
+            f"(SELECT signature FROM transfers WHERE direction = 'out') AND {clause}",
+            params
+        ).fetchone()[0]
+        midnight = time.mktime(time.localtime()[:3] + (0, 0, 0, 0, 0, -1))
+        today = self.db.execute(
+            "SELECT COALESCE(SUM(t.lamports), 0) FROM transfers t JOIN signatures s ON s.signature = t.signature "
+            "WHERE t.direction = 'in' AND s.err IS NULL AND s.block_time >= ?",
+            (midnight,)
+        ).fetchone()[0]
+        return {
+            'received': (sums.get('in', (0, 0))[0] or 0) / 1e9,
+            'sent': (sums.get('out', (0, 0))[0] or 0) / 1e9,
+            'fees': fees / 1e9,
+            'payments': sums.get('in', (0, 0))[1],
+            'today_received': today / 1e9,
+            'last_sync': self.last_sync,
+            'backfill_complete': self._state('backfill_done') == '1'
+        }
+
+    def match_job_payments(self, jobs: List[Dict]) -> Dict[str, Optional[Dict]]:
+        """
+        Incoming payment for each job
+
+        A transfer whose memo names the job wins; otherwise the earliest
+        unclaimed incoming transfer of exactly the reward amount arriving
+        shortly before or within a day after completion. Matches are stored,
+        so each transfer pays at most one job.
+
+        Args:
+            jobs: Dicts with job_id, reward (SOL) and completed_at (unix time or None)
+
+        Returns:
+            job_id -> {'signature', 'amount', 'block_time', 'matched_by'} or None
+        """
+        matches: Dict[str, Optional[Dict]] = {}
+        for row in self.db.execute(
+            "SELECT p.job_id, p.signature, p.matched_by, t.lamports, s.block_time FROM job_payments p "
+            "JOIN transfers t ON t.signature = p.signature AND t.position = p.position "
+            "JOIN signatures s ON s.signature = p.signature"
+        ):
+            matches[row['job_id']] = {
+                'signature': row['signature'],
+                'amount': row['lamports'] / 1e9,
+                'block_time': row['block_time'],
+                'matched_by': row['matched_by']
+            }
+
+        incoming = "t.direction = 'in' AND s.err IS NULL AND NOT EXISTS " \
+                   "(SELECT 1 FROM job_payments p WHERE p.signature = t.signature AND p.position = t.position)"
+        for job in sorted(jobs, key=lambda j: j.get('completed_at') or 0):
+            job_id = job['job_id']
+            if job_id in matches:
+                continue
+            # instr() narrows the candidates; memo_mentions() rejects partial ids (job-1 in job-12)
+            row = next((
+                candidate for candidate in self.db.execute(
+                    "SELECT t.signature, t.position, t.lamports, s.block_time, s.memo FROM transfers t "
+                    f"JOIN signatures s ON s.signature = t.signature WHERE {incoming} AND instr(s.memo, ?) > 0 "
+                    "ORDER BY s.slot",
+                    (job_id,)
+                )
+                if memo_mentions(candidate['memo'], job_id)
+            ), None)
+            matched_by = 'memo'
+            if row is None and job.get('completed_at') and job.get('reward'):
+                matched_by = 'amount'
+                row = self.db.execute(
+                    "SELECT t.signature, t.position, t.lamports, s.block_time FROM transfers t "
+                    f"JOIN signatures s ON s.signature = t.signature WHERE {incoming} AND t.lamports = ? "
+                    "AND s.block_time BETWEEN ? AND ? ORDER BY s.slot LIMIT 1",
+                    (
+                        round(job['reward'] * 1e9),
+                        job['completed_at'] - PAYMENT_MATCH_EARLY,
+                        job['completed_at'] + PAYMENT_MATCH_WINDOW
+                    )
+                ).fetchone()
+            if row is None:
+                matches[job_id] = None
+                continue
+            self.db.execute(
+                "INSERT INTO job_payments (job_id, signature, position, matched_by) VALUES (?, ?, ?, ?)",
+                (job_id, row['signature'], row['position'], matched_by)
+            )
+            matches[job_id] = {
+                'signature': row['signature'],
+                'amount': row['lamports'] / 1e9,
+                'block_time': row['block_time'],
+                'matched_by': matched_by
+            }
+        self.db.commit()
+        return matches